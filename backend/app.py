@@ -1,31 +1,181 @@
-from flask import Flask, request, jsonify, stream_with_context, Response, send_from_directory
+from flask import (Flask, request, jsonify, stream_with_context, Response, send_from_directory,
+                   copy_current_request_context, g)
 from flask_cors import CORS
 from database_manager import DatabaseManager
 from sql_agent import SQLAgent
+from keyset_pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from request_executor import RequestExecutor, ExecutorBusyError, RequestTimeoutError
+from replica_set import validate_replicas
+import bulk_register
+import instance_discovery
+import health_monitor
+from health_monitor import HealthMonitor
+from archive_export import ARCHIVE_MIMETYPES, DEFAULT_WORKERS as DEFAULT_EXPORT_WORKERS
+import slow_query_log
+from slow_query_log import SlowQueryLog
+import result_encoding
+import metrics
+import sql_util
 import json
 import os
 import traceback
 import csv
+import functools
+import io
+import threading
+import time
+import uuid
+from collections import OrderedDict
 
 
 app = Flask(__name__)
 CORS(app)
-db_manager = DatabaseManager()
+# 慢查询日志：执行SQL和自定义SQL导出中超过阈值（秒）的语句记录在本地SQLite文件中，阈值为0时不记录
+slow_queries = SlowQueryLog(
+    os.environ.get('SLOW_QUERY_LOG', './slow_queries.db'),
+    threshold=float(os.environ.get('SLOW_QUERY_THRESHOLD', slow_query_log.DEFAULT_THRESHOLD)),
+    max_entries=int(os.environ.get('SLOW_QUERY_MAX_ENTRIES', slow_query_log.DEFAULT_MAX_ENTRIES)),
+    # SQL原文中的字面量可能包含敏感数据，默认只保存指纹
+    store_sql=os.environ.get('SLOW_QUERY_LOG_SQL', '').lower() in ('1', 'true', 'yes')
+)
+db_manager = DatabaseManager(slow_queries=slow_queries)
 sql_agent = SQLAgent()
 
+# 后台定期并行探测所有数据库，GET /api/databases 直接返回最近一次的结果；HEALTH_CHECK_INTERVAL为0时不探测
+health = HealthMonitor(
+    db_manager.list_databases,
+    db_manager.probe_database,
+    interval=float(os.environ.get('HEALTH_CHECK_INTERVAL', health_monitor.DEFAULT_INTERVAL)),
+    timeout=float(os.environ.get('HEALTH_CHECK_TIMEOUT', health_monitor.DEFAULT_TIMEOUT)),
+    workers=int(os.environ.get('HEALTH_CHECK_WORKERS', health_monitor.DEFAULT_WORKERS))
+)
+health.start()
+
 # 静态文件目录设置
 frontend_dist_path = os.path.join(os.path.dirname(__file__), 'dist')
 
+# 流式执行的硬性上限，客户端只能在此范围内设置更小的值
+STREAM_MAX_ROWS = int(os.environ.get('STREAM_MAX_ROWS', 5000000))
+STREAM_MAX_BYTES = int(os.environ.get('STREAM_MAX_BYTES', 1024 * 1024 * 1024))
+
+# 导出进度记录（export_id -> 进度信息），按登记顺序淘汰
+EXPORT_PROGRESS_LIMIT = 100
+export_progress = OrderedDict()
+export_progress_lock = threading.Lock()
+
+# 服务模式：development 使用Flask开发服务器，production 使用waitress多线程WSGI服务器
+SERVER_MODE = os.environ.get('SERVER_MODE', 'development')
+SERVER_PORT = int(os.environ.get('PORT', 5050))
+SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 32))
+
+# 数据库操作和AI聊天分别在独立的有界线程池中执行，一类请求变慢不会占满另一类请求的处理线程
+db_executor = RequestExecutor(
+    "db",
+    max_workers=int(os.environ.get('DB_EXECUTOR_WORKERS', 16)),
+    max_queue=int(os.environ.get('DB_EXECUTOR_QUEUE', 64)),
+    timeout=float(os.environ.get('DB_REQUEST_TIMEOUT', 60))
+)
+# 导入可能持续数小时，且分批提交时中途终止会留下部分导入的数据，默认不设超时（0）
+import_executor = RequestExecutor(
+    "import",
+    max_workers=int(os.environ.get('IMPORT_EXECUTOR_WORKERS', 4)),
+    max_queue=int(os.environ.get('IMPORT_EXECUTOR_QUEUE', 8)),
+    timeout=float(os.environ.get('IMPORT_REQUEST_TIMEOUT', 0))
+)
+# 批量添加数据库连接配置的超时时间（秒）
+BULK_REGISTER_TIMEOUT = float(os.environ.get('BULK_REGISTER_TIMEOUT', 300))
+chat_executor = RequestExecutor(
+    "chat",
+    max_workers=int(os.environ.get('CHAT_EXECUTOR_WORKERS', 4)),
+    max_queue=int(os.environ.get('CHAT_EXECUTOR_QUEUE', 16)),
+    timeout=float(os.environ.get('CHAT_REQUEST_TIMEOUT', 300))
+)
+
+# 连接数和执行器状态在导出指标时读取
+metrics.DB_CONNECTIONS.set_callback(lambda: metrics.pool_connections(db_manager.get_pool_stats()))
+
+def _executor_samples():
+    samples = []
+    for executor in (db_executor, import_executor, chat_executor):
+        stats = executor.get_stats()
+        samples.append(((executor.name, "running"), stats["running"]))
+        samples.append(((executor.name, "queued"), stats["queued"]))
+    return samples
+
+metrics.EXECUTOR_REQUESTS.set_callback(_executor_samples)
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request_metrics(response):
+    """按路由模板（而不是实际路径）记录请求数和耗时，流式响应在发送结束时记录字节数"""
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    started = g.get('request_started')
+    if started is not None:
+        metrics.HTTP_REQUEST_SECONDS.observe(request.method, route, value=time.perf_counter() - started)
+    metrics.HTTP_REQUESTS.inc(request.method, route, str(response.status_code))
+    if response.is_streamed and not response.direct_passthrough:
+        response.response = metrics.count_bytes(response.response, route)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """以Prometheus文本格式导出运行指标"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+def _request_timeout(limit: float) -> float:
+    """本次请求的超时时间：客户端可以通过X-Request-Timeout请求头设置比limit更短的超时"""
+    try:
+        timeout = float(request.headers.get('X-Request-Timeout', 0))
+    except ValueError:
+        return limit
+    if timeout <= 0:
+        return limit
+    return min(timeout, limit) if limit > 0 else timeout
+
+def call_bounded(executor: RequestExecutor, func, *args, timeout: float = None, **kwargs):
+    """
+    在有界线程池中执行func（需要请求上下文），排队已满返回503，超时返回504
+
+    timeout为空时使用执行器的默认超时
+    """
+    limit = executor.timeout if timeout is None else timeout
+    try:
+        return executor.call(copy_current_request_context(func), *args,
+                             timeout=_request_timeout(limit), **kwargs)
+    except ExecutorBusyError:
+        return jsonify({
+            "success": False,
+            "error": "Server is busy, please try again later"
+        }), 503
+    except RequestTimeoutError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 504
+
+def run_in_executor(executor: RequestExecutor):
+    """视图装饰器：在有界线程池中执行视图函数。返回流式响应的视图不能使用"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            return call_bounded(executor, view, *args, **kwargs)
+        return wrapper
+    return decorator
+
 @app.route('/api/databases', methods=['GET'])
 def list_databases():
-    """获取所有数据库连接配置"""
-    databases = db_manager.list_databases()
+    """获取所有数据库连接配置，health 为后台健康检查最近一次的结果"""
+    databases = [dict(db, health=health.status(db.get('name'))) for db in db_manager.list_databases()]
     return jsonify({
         "success": True,
         "data": databases
     })
 
 @app.route('/api/databases', methods=['POST'])
+@run_in_executor(db_executor)
 def add_database():
     """添加新的数据库连接配置"""
     data = request.get_json()
@@ -39,6 +189,13 @@ def add_database():
                 "error": f"Missing required field: {field}"
             }), 400
 
+    replica_error = validate_replicas(data)
+    if replica_error:
+        return jsonify({
+            "success": False,
+            "error": replica_error
+        }), 400
+
             # 检查MySQL服务器中是否存在指定的数据库，如果不存在则自动创建
     if not db_manager.create_database(data):
 
@@ -60,6 +217,7 @@ def add_database():
     success = db_manager.add_database(data)
     
     if success:
+        health.trigger()
         return jsonify({
             "success": True,
             "message": "Database added successfully"
@@ -70,7 +228,42 @@ def add_database():
             "error": "Database with this name already exists"
         }), 400
 
+@app.route('/api/databases/batch', methods=['POST'])
+def add_databases():
+    """批量添加数据库连接配置：并行创建数据库并测试连接，验证成功的条目一次性保存"""
+    data = request.get_json(silent=True)
+    entries = data.get('databases') if isinstance(data, dict) else None
+    if not isinstance(entries, list) or not entries:
+        return jsonify({
+            "success": False,
+            "error": "databases must be a non-empty list"
+        }), 400
+    if len(entries) > bulk_register.MAX_ENTRIES:
+        return jsonify({
+            "success": False,
+            "error": f"At most {bulk_register.MAX_ENTRIES} databases per request"
+        }), 400
+
+    workers = _capped_limit(data.get('workers', bulk_register.DEFAULT_WORKERS), bulk_register.MAX_WORKERS)
+    per_host = _capped_limit(data.get('per_host', bulk_register.DEFAULT_PER_HOST), workers)
+    # 最多1000个条目、每个连接超时10秒，单独设置比普通数据库请求更长的超时
+    return call_bounded(db_executor, _add_databases_response, entries, workers, per_host,
+                        timeout=BULK_REGISTER_TIMEOUT)
+
+def _add_databases_response(entries, workers, per_host):
+    results = db_manager.add_databases(entries, workers, per_host)
+    added = sum(1 for result in results if result["success"])
+    if added:
+        health.trigger()
+    return jsonify({
+        "success": True,
+        "added": added,
+        "failed": len(results) - added,
+        "results": results
+    })
+
 @app.route('/api/databases/<name>', methods=['PUT'])
+@run_in_executor(db_executor)
 def update_database(name):
     """更新数据库连接配置"""
     data = request.get_json()
@@ -83,6 +276,13 @@ def update_database(name):
                 "success": False,
                 "error": f"Missing required field: {field}"
             }), 400
+
+    replica_error = validate_replicas(data)
+    if replica_error:
+        return jsonify({
+            "success": False,
+            "error": replica_error
+        }), 400
     
     # 测试连接
     if not db_manager.test_connection(data):
@@ -95,6 +295,7 @@ def update_database(name):
     success = db_manager.update_database(name, data)
     
     if success:
+        health.trigger()
         return jsonify({
             "success": True,
             "message": "Database updated successfully"
@@ -122,6 +323,7 @@ def remove_database(name):
         }), 404
 
 @app.route('/api/databases/<name>/test', methods=['POST'])
+@run_in_executor(db_executor)
 def test_database_connection(name):
     """测试数据库连接"""
     db_config = db_manager.get_database(name)
@@ -146,6 +348,7 @@ def test_database_connection(name):
         }), 500
 
 @app.route('/api/databases/test', methods=['POST'])
+@run_in_executor(db_executor)
 def test_database_connection_v2():
     """测试数据库连接"""
     db_config = request.get_json()
@@ -172,7 +375,82 @@ def test_database_connection_v2():
             "error": "Failed to connect to database"
         }), 500
 
+@app.route('/api/health', methods=['GET'])
+def get_health():
+    """获取所有数据库最近一次的健康检查结果"""
+    return jsonify({
+        "success": True,
+        "data": {db.get('name'): health.status(db.get('name')) for db in db_manager.list_databases()},
+        "stats": health.get_stats()
+    })
+
+@app.route('/api/health/<name>', methods=['GET'])
+def get_database_health(name):
+    """获取数据库的健康检查结果和探测记录"""
+    if not db_manager.get_database(name):
+        return jsonify({
+            "success": False,
+            "error": "Database not found"
+        }), 404
+
+    return jsonify({
+        "success": True,
+        "data": dict(health.status(name), history=health.get_history(name) or [])
+    })
+
+@app.route('/api/health/check', methods=['POST'])
+def check_health():
+    """立即探测数据库（请求体中的 names，未提供时探测全部），最多等待探测超时时间"""
+    data = request.get_json(silent=True) or {}
+    names = data.get('names')
+    if names is not None and not isinstance(names, list):
+        return jsonify({
+            "success": False,
+            "error": "names must be a list"
+        }), 400
+
+    return jsonify({
+        "success": True,
+        "data": health.check(names)
+    })
+
+@app.route('/api/pools', methods=['GET'])
+def get_pool_stats():
+    """获取连接池统计信息（借出、空闲、等待、新建次数等）"""
+    name = request.args.get('name')
+    if name and not db_manager.get_database(name):
+        return jsonify({
+            "success": False,
+            "error": "Database not found"
+        }), 404
+
+    return jsonify({
+        "success": True,
+        "data": db_manager.get_pool_stats(name)
+    })
+
+@app.route('/api/databases/<name>/replicas', methods=['GET'])
+def get_replica_status(name):
+    """获取只读副本的健康状态和读操作分配情况"""
+    result = db_manager.get_replica_status(name)
+    if not result["success"]:
+        return jsonify(result), 404
+    return jsonify(result)
+
+@app.route('/api/executors', methods=['GET'])
+def get_executor_stats():
+    """获取请求线程池统计信息（执行中、排队、拒绝、超时次数等）"""
+    return jsonify({
+        "success": True,
+        "data": {
+            "db": db_executor.get_stats(),
+            "import": import_executor.get_stats(),
+            "chat": chat_executor.get_stats()
+        }
+    })
+
 @app.route('/api/databases/<name>/tables', methods=['GET'])
+@run_in_executor(db_executor)
 def get_tables(name):
     """获取数据库中的所有表"""
     tables = db_manager.get_tables(name)
@@ -183,6 +461,7 @@ def get_tables(name):
     })
 
 @app.route('/api/databases/<name>/tables/<table_name>', methods=['GET'])
+@run_in_executor(db_executor)
 def get_table_structure(name, table_name):
     """获取表结构信息"""
     structure = db_manager.get_table_structure(name, table_name)
@@ -199,6 +478,7 @@ def get_table_structure(name, table_name):
     })
 
 @app.route('/api/databases/<database>/tables/<table>/structure', methods=['GET'])
+@run_in_executor(db_executor)
 def get_table_structure_extended(database, table):
     """获取表的完整结构信息，包括建表语句和索引"""
     table_info = db_manager.get_table_info(database, table)
@@ -214,10 +494,37 @@ def get_table_structure_extended(database, table):
         "data": table_info
     })
 
+@app.route('/api/databases/<name>/tables/<table_name>/rows', methods=['GET'])
+@run_in_executor(db_executor)
+def browse_table(name, table_name):
+    """按键集（Seek）方式分页浏览表数据，通过续页令牌获取下一页"""
+    result = db_manager.browse_table(
+        name, table_name,
+        sort=request.args.get('sort'),
+        page_size=_capped_limit(request.args.get('page_size', DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE),
+        token=request.args.get('token')
+    )
+
+    if not result["success"]:
+        return jsonify({
+            "success": False,
+            "error": result["error"]
+        }), 400
+
+    return jsonify({
+        "success": True,
+        "data": result
+    })
+
 @app.route('/api/databases/<name>/tables/structure', methods=['GET'])
+@run_in_executor(db_executor)
 def get_all_tables_structure(name):
     """获取数据库中所有表的结构信息"""
-    result = db_manager.get_all_tables_structure(name)
+    # ddl=false时不返回建表语句；tables=a,b只返回指定的表，建表语句也只为这些表读取
+    include_ddl = request.args.get('ddl', 'true').lower() not in ('false', '0', 'no')
+    tables = request.args.get('tables')
+    table_names = [table.strip() for table in tables.split(',') if table.strip()] if tables else None
+    result = db_manager.get_all_tables_structure(name, include_ddl, table_names)
     
     if not result["success"]:
         return jsonify({
@@ -230,6 +537,128 @@ def get_all_tables_structure(name):
         "data": result["data"]
     })
 
+@app.route('/api/databases/<name>/tables/search', methods=['GET'])
+@run_in_executor(db_executor)
+def search_tables(name):
+    """按与问题的相关度筛选表（本地索引，AI生成SQL时使用同样的结果）"""
+    question = request.args.get('q', '')
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "error": "limit must be an integer"
+        }), 400
+    result = db_manager.rank_tables(name, question, max(1, min(limit, 100)))
+
+    if not result["success"]:
+        return jsonify({
+            "success": False,
+            "error": result["error"]
+        }), 500
+
+    return jsonify({
+        "success": True,
+        "data": result["data"]
+    })
+
+@app.route('/api/databases/<name>/metadata/refresh', methods=['POST'])
+def refresh_metadata(name):
+    """使数据库（或指定表）缓存的元数据失效，下次请求时重新从服务器读取"""
+    data = request.get_json(silent=True) or {}
+    result = db_manager.refresh_metadata(name, data.get('table'))
+
+    if not result["success"]:
+        return jsonify({
+            "success": False,
+            "error": result["error"]
+        }), 404
+
+    return jsonify({
+        "success": True,
+        "invalidated": result["invalidated"]
+    })
+
+@app.route('/api/metadata/stats', methods=['GET'])
+def get_metadata_cache_stats():
+    """获取元数据缓存统计信息（条目数、命中、未命中、淘汰次数等）"""
+    return jsonify({
+        "success": True,
+        "data": db_manager.get_metadata_cache_stats()
+    })
+
+@app.route('/api/result-cache/stats', methods=['GET'])
+def get_result_cache_stats():
+    """获取查询结果缓存统计信息（条目数、占用字节数、命中、未命中、淘汰次数等）"""
+    return jsonify({
+        "success": True,
+        "data": db_manager.get_result_cache_stats()
+    })
+
+# 慢查询列表每次最多返回的条数
+SLOW_QUERY_MAX_LIMIT = 1000
+
+@app.route('/api/slow-queries/top', methods=['GET'])
+def get_top_slow_queries():
+    """按语句指纹汇总慢查询，返回总耗时最长（by=total_time）或出现次数最多（by=count）的语句"""
+    order = request.args.get('by', slow_query_log.ORDER_TOTAL_TIME)
+    if order not in (slow_query_log.ORDER_TOTAL_TIME, slow_query_log.ORDER_COUNT):
+        return jsonify({
+            "success": False,
+            "error": f"Unsupported order: {order}"
+        }), 400
+    try:
+        since = float(request.args['since']) if request.args.get('since') else None
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "error": "since must be a unix timestamp"
+        }), 400
+
+    return jsonify({
+        "success": True,
+        "data": slow_queries.top(order, _capped_limit(request.args.get('limit', 20), SLOW_QUERY_MAX_LIMIT),
+                                 request.args.get('database'), since)
+    })
+
+@app.route('/api/slow-queries', methods=['GET'])
+def get_slow_queries():
+    """获取最近的慢查询记录"""
+    return jsonify({
+        "success": True,
+        "data": slow_queries.recent(_capped_limit(request.args.get('limit', 50), SLOW_QUERY_MAX_LIMIT),
+                                    request.args.get('database')),
+        "stats": slow_queries.get_stats()
+    })
+
+@app.route('/api/slow-queries/<int:entry_id>', methods=['GET'])
+def get_slow_query(entry_id):
+    """获取一条慢查询记录及其执行计划（EXPLAIN FORMAT=JSON）"""
+    entry = slow_queries.get(entry_id)
+    if not entry:
+        return jsonify({
+            "success": False,
+            "error": "Slow query not found"
+        }), 404
+
+    if entry["explain"]:
+        try:
+            entry["explain"] = json.loads(entry["explain"])
+        except ValueError:
+            pass
+    return jsonify({
+        "success": True,
+        "data": entry
+    })
+
+@app.route('/api/slow-queries', methods=['DELETE'])
+def clear_slow_queries():
+    """清空慢查询记录"""
+    return jsonify({
+        "success": True,
+        "deleted": slow_queries.clear()
+    })
+
 @app.route('/api/databases/<name>/execute', methods=['POST'])
 def execute_sql(name):
     """执行SQL语句"""
@@ -241,8 +670,30 @@ def execute_sql(name):
             "error": "Missing required field: sql"
         }), 400
     
-    result = db_manager.execute_sql(name, data['sql'])
+    if data.get('stream'):
+        # 流式响应由WSGI线程逐块发送，不在线程池中执行
+        return stream_execute_sql(name, data)
+
+    # 结果格式：请求中的format优先，否则按Accept请求头协商
+    try:
+        encoding = result_encoding.negotiate(data.get('format'), request.accept_mimetypes)
+    except result_encoding.EncodingError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 406
+
+    return call_bounded(db_executor, _execute_sql_response, name, data['sql'], data.get('cache', True) is not False,
+                        encoding)
+
+def _execute_sql_response(name, sql_statement, use_cache, encoding=result_encoding.JSON):
+    """执行SQL并构建响应，查询结果按协商的格式编码，其余响应始终为JSON"""
+    result = db_manager.execute_sql(name, sql_statement, use_cache)
     
+    if result["success"] and encoding != result_encoding.JSON and result["type"] == "SELECT":
+        body, mimetype = result_encoding.encode(result, encoding)
+        return Response(body, mimetype=mimetype)
+
     if result["success"]:
         return jsonify({
             "success": True,
@@ -254,8 +705,114 @@ def execute_sql(name):
             "error": result["error"]
         }), 400
 
+def _capped_limit(value, hard_limit: int) -> int:
+    """客户端指定的上限不能超过服务端的硬性上限"""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return hard_limit
+    return hard_limit if value <= 0 else min(value, hard_limit)
+
+def stream_execute_sql(name, data):
+    """
+    流式执行查询，以NDJSON格式逐块返回结果
+
+    第一行为 {"columns": [...]}，之后每行是一行数据（JSON数组），
+    最后一行为 {"row_count": n, "truncated": bool, "error": ...}。
+    达到行数/字节上限或客户端断开时，服务器端查询会被终止。
+    """
+    max_rows = _capped_limit(data.get('max_rows'), STREAM_MAX_ROWS)
+    max_bytes = _capped_limit(data.get('max_bytes'), STREAM_MAX_BYTES)
+    chunk_size = _capped_limit(data.get('chunk_size'), 10000)
+
+    result = db_manager.stream_sql(name, data['sql'], chunk_size)
+    if not result["success"]:
+        return jsonify({
+            "success": False,
+            "error": result["error"]
+        }), 400
+
+    stream = result["stream"]
+    encoder = json.JSONEncoder(default=app.json.default, ensure_ascii=app.json.ensure_ascii,
+                               separators=(',', ':'))
+
+    def generate():
+        row_count = 0
+        byte_count = 0
+        truncated = False
+        error = None
+
+        header = (encoder.encode({"columns": stream.columns}) + "\n").encode('utf-8')
+        byte_count += len(header)
+        yield header
+
+        try:
+            for chunk in stream:
+                lines = []
+                for row in chunk:
+                    line = (encoder.encode(row) + "\n").encode('utf-8')
+                    if row_count >= max_rows or byte_count + len(line) > max_bytes:
+                        truncated = True
+                        break
+                    lines.append(line)
+                    row_count += 1
+                    byte_count += len(line)
+                if lines:
+                    yield b"".join(lines)
+                if truncated:
+                    break
+        except Exception as e:
+            print(f"Error streaming SQL results: {e}")
+            error = str(e)
+        finally:
+            # 提前结束时会终止服务器端查询并丢弃连接
+            stream.close()
+            metrics.DB_ROWS.inc(name, "returned", amount=row_count)
+
+        yield (encoder.encode({
+            "row_count": row_count,
+            "truncated": truncated,
+            "error": error
+        }) + "\n").encode('utf-8')
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    # 客户端断开时生成器可能从未开始执行，确保连接总能归还
+    response.call_on_close(stream.close)
+    return response
+
+class _UploadReader(io.RawIOBase):
+    """把任意支持read()的上传流适配为io.RawIOBase"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        return size
+
+def open_upload_text(file_storage, encoding: str = 'utf-8') -> io.TextIOWrapper:
+    """把上传文件包装为增量解码的文本流，按需读取而不是一次性read().decode()"""
+    # Python 3.11之前的SpooledTemporaryFile不是io.IOBase，不能直接交给TextIOWrapper
+    buffer = io.BufferedReader(_UploadReader(file_storage.stream), buffer_size=64 * 1024)
+    # newline=''：保留原始换行符，由csv模块处理引号内的换行
+    return io.TextIOWrapper(buffer, encoding=encoding, newline='')
+
+def _commit_every(value):
+    """解析分段提交的语句数，未提供或不是正整数时返回None（整个导入在一个事务中执行）"""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
 # 修改：从SQL内容导入数据的接口（支持批量语句和事务）
 @app.route('/api/databases/<name>/import/sql', methods=['POST'])
+@run_in_executor(import_executor)
 def import_sql(name):
     """通过JSON中的SQL内容导入数据到数据库表（支持批量执行和事务）"""
     try:
@@ -270,11 +827,12 @@ def import_sql(name):
 
         sql_content = request.json['sql']
         
-        # 将SQL内容分割成语句（以分号为分隔符）
-        sql_statements = [stmt.strip() for stmt in sql_content.split(';') if stmt.strip()]
+        # 将SQL内容分割成语句（识别引号、注释和DELIMITER命令）
+        sql_statements = sql_util.split_sql(sql_content)
         
         # 执行批量SQL语句 - 使用新的函数，不再调用execute_sql
-        result = db_manager.execute_batch_sql_no_execute_sql(name, sql_statements)
+        result = db_manager.execute_batch_sql_no_execute_sql(
+            name, sql_statements, _commit_every(request.json.get('commit_every')))
         
         return jsonify(result), 200
 
@@ -284,6 +842,7 @@ def import_sql(name):
 
 # 新增：从SQL文件导入数据的接口（支持批量语句和事务）
 @app.route('/api/databases/<name>/import/sql/file', methods=['POST'])
+@run_in_executor(import_executor)
 def import_sql_file(name):
     """通过上传的SQL文件导入数据到数据库表（支持批量执行和事务）"""
     # 检查是否有文件上传
@@ -309,24 +868,25 @@ def import_sql_file(name):
         }), 400
     
     try:
-        # 读取SQL文件内容
-        sql_content = sql_file.read().decode('utf-8')
-        
-        # 将SQL内容按分号分割成语句列表（简单处理，不支持复杂语法）
-        sql_statements = [stmt.strip() for stmt in sql_content.split(';') if stmt.strip()]
+        # 以增量解码的文本流读取SQL文件，语句逐条切分（识别引号、注释和DELIMITER命令），不把整个文件读入内存
+        sql_statements = sql_util.split_sql_stream(open_upload_text(sql_file))
         
         # 执行批量SQL语句 - 使用新的函数，不再调用execute_sql
-        result = db_manager.execute_batch_sql_no_execute_sql(name, sql_statements)
+        result = db_manager.execute_batch_sql_no_execute_sql(
+            name, sql_statements, _commit_every(request.form.get('commit_every')))
         
         if result["success"]:
             return jsonify({
                 "success": True,
-                "message": f"Successfully imported SQL file. {len(sql_statements)} statements executed."
+                "message": f"Successfully imported SQL file. {result['statement_count']} statements executed.",
+                "statement_count": result["statement_count"],
+                "packet_count": result["packet_count"]
             })
         else:
             return jsonify({
                 "success": False,
-                "error": result["error"]
+                "error": result["error"],
+                "committed_statements": result.get("committed_statements", 0)
             }), 400
             
     except Exception as e:
@@ -338,6 +898,7 @@ def import_sql_file(name):
 
 # 新增：从CSV文件导入数据的接口
 @app.route('/api/databases/<name>/import/csv', methods=['POST'])
+@run_in_executor(import_executor)
 def import_csv_file(name):
     """通过上传的CSV文件导入数据到数据库表"""
     # 检查是否有文件上传
@@ -428,13 +989,10 @@ def import_csv_file(name):
             }), 400
             
         # 处理CSV数据并插入到数据库中
-        csv_file.seek(0)  # 重新定位文件开头
+        csv_file.stream.seek(0)  # 重新定位文件开头
         
-        # 创建一个简单的处理函数来插入数据
-        import io
-        content = csv_file.read().decode('utf-8')
-        csv_data = io.StringIO(content)
-        reader = csv.reader(csv_data, delimiter=',')
+        # 以增量解码的文本流包装上传文件，csv.reader按需逐行读取，内存占用与文件大小无关
+        reader = csv.reader(open_upload_text(csv_file), delimiter=',')
         
         # 获取表结构用于验证列数和类型
         table_structure = db_manager.get_table_structure(name, table_name)
@@ -445,12 +1003,17 @@ def import_csv_file(name):
             }), 400
         
         # 处理数据插入（使用增强版批量导入功能）
-        result = db_manager.import_csv_to_table(name, table_name, reader, field_mapping)
+        # 导入策略（可选）：auto/executemany/load_data
+        strategy = data.get('strategy', 'auto')
+        result = db_manager.import_csv_to_table(name, table_name, reader, field_mapping, strategy)
         
         if result["success"]:
             return jsonify({
                 "success": True,
-                "message": f"Successfully imported CSV file to {table_name}. {result['rows_imported']} rows inserted."
+                "message": f"Successfully imported CSV file to {table_name}. {result['rows_imported']} rows inserted.",
+                "strategy": result["strategy"],
+                "elapsed_seconds": result["elapsed_seconds"],
+                "rows_per_second": result["rows_per_second"]
             })
         else:
             return jsonify({
@@ -468,6 +1031,7 @@ def import_csv_file(name):
 
 
 @app.route('/api/chat', methods=['POST'])
+@run_in_executor(chat_executor)
 def chat_with_database():
     """AI聊天接口，根据数据库名和问题返回SQL查询结果"""
     data = request.get_json()
@@ -525,6 +1089,7 @@ def chat_with_database():
 
 # 新增的API端点：获取LM Studio模型列表
 @app.route('/api/models', methods=['GET'])
+@run_in_executor(chat_executor)
 def get_models():
     """获取本地支持的并且被激活的LM Studio模型"""
     try:
@@ -547,6 +1112,7 @@ def not_found(error):
         }), 404
 
 @app.route('/api/databases/names', methods=['POST'])
+@run_in_executor(db_executor)
 def get_instance_databases():
     """获取指定数据库实例中的所有数据库列表"""
     db_config = request.get_json()
@@ -573,6 +1139,57 @@ def get_instance_databases():
         "data": result["data"]
     })
 
+@app.route('/api/instances/databases', methods=['POST'])
+def discover_instances():
+    """
+    并行获取多个实例上的数据库列表（包括表数量和数据大小），以NDJSON格式按实例完成的先后顺序返回
+
+    每个实例一行 {"index": n, "host": ..., "port": ..., "success": bool, ...}，
+    最后一行为 {"done": true, "count": n, "failed": n}
+    """
+    data = request.get_json(silent=True) or {}
+    instances = data.get('instances')
+    if not isinstance(instances, list) or not instances:
+        return jsonify({
+            "success": False,
+            "error": "instances must be a non-empty list"
+        }), 400
+    if len(instances) > instance_discovery.MAX_INSTANCES:
+        return jsonify({
+            "success": False,
+            "error": f"At most {instance_discovery.MAX_INSTANCES} instances per request"
+        }), 400
+    for i, instance in enumerate(instances):
+        error = instance_discovery.validate_instance(instance)
+        if error:
+            return jsonify({
+                "success": False,
+                "error": f"instances[{i}]: {error}"
+            }), 400
+
+    results = db_manager.discover_instances(instances, use_cache=not data.get('refresh'))
+
+    def generate():
+        failed = 0
+        for index, result in results:
+            instance = instances[index]
+            failed += not result["success"]
+            line = dict(result, index=index, host=instance['host'], port=int(instance.get('port', 3306)))
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+        yield json.dumps({"done": True, "count": len(instances), "failed": failed}) + "\n"
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.call_on_close(results.close)
+    return response
+
+@app.route('/api/instances/cache/stats', methods=['GET'])
+def get_discovery_cache_stats():
+    """获取实例发现结果缓存的统计信息"""
+    return jsonify({
+        "success": True,
+        "data": db_manager.get_discovery_cache_stats()
+    })
+
 @app.route('/api/databases/<name>/export', methods=['POST'])
 def export_database_data(name):
     """导出数据库数据为INSERT SQL或CSV格式"""
@@ -585,15 +1202,9 @@ def export_database_data(name):
             "error": "Missing required field: format"
         }), 400
 
-    # 验证必要参数
-    if 'sql' not in data:
-        return jsonify({
-            "success": False,
-            "error": "Missing required field: sql"
-        }), 400
-    
     format_type = data['format']
-    sql = data['sql']
+    # 未提供sql时逐表导出整个数据库
+    sql = data.get('sql')
     table_name = None if 'table_name' not in data else data['table_name']
 
     # 支持的格式类型
@@ -607,21 +1218,49 @@ def export_database_data(name):
 
     
     try:
-        result = db_manager.export_sql_data(name, sql, format_type, table_name)
+        if sql is None:
+            result = db_manager.export_database_data(name, format_type)
+        else:
+            result = db_manager.export_sql_data(name, sql, format_type, table_name)
         if not result["success"]:
             return jsonify({
                 "success": False,
                 "error": result["error"]
             }), 500
         
-        # 返回导出的内容
-        return Response(
-            result["content"],
+        # 流式返回导出的内容，进度可通过 X-Export-Id 查询
+        export_id = uuid.uuid4().hex
+        progress = _register_export_progress(export_id, name)
+        stream = result["stream"]
+
+        def generate():
+            try:
+                for piece in result["content"]:
+                    data = piece.encode('utf-8')
+                    progress["bytes"] += len(data)
+                    if stream is not None:
+                        progress["rows"] = stream.row_count
+                    yield data
+            except Exception as e:
+                print(f"Error streaming export: {e}")
+                progress["error"] = str(e)
+            finally:
+                progress["done"] = True
+                progress["cancelled"] = bool(stream is not None and stream.cancelled)
+                metrics.DB_ROWS.inc(name, "exported", amount=progress["rows"])
+
+        response = Response(
+            stream_with_context(generate()),
             mimetype='text/plain',
             headers={
-                'Content-Disposition': f'attachment; filename="export.{format_type}.sql"' if format_type == 'insert_sql' else f'attachment; filename="export.csv"'
+                'Content-Disposition': f'attachment; filename="export.{format_type}.sql"' if format_type == 'insert_sql' else f'attachment; filename="export.csv"',
+                'X-Export-Id': export_id
             }
         )
+        if stream is not None:
+            # 客户端断开时生成器可能从未开始执行，确保连接总能归还
+            response.call_on_close(stream.close)
+        return response
         
     except Exception as e:
         return jsonify({
@@ -629,6 +1268,110 @@ def export_database_data(name):
             "error": f"Export failed: {str(e)}"
         }), 500
 
+@app.route('/api/databases/<name>/export/archive', methods=['POST'])
+def export_database_archive(name):
+    """并行导出整个数据库（或指定表），以zip/tar归档流式返回，每张表一个文件"""
+    data = request.get_json(silent=True) or {}
+    format_type = data.get('format', 'insert_sql')
+    archive_format = data.get('archive', 'zip')
+    table_names = data.get('tables')
+    if table_names is not None and (not isinstance(table_names, list)
+                                    or not all(isinstance(table, str) for table in table_names)):
+        return jsonify({
+            "success": False,
+            "error": "tables must be a list of table names"
+        }), 400
+    try:
+        workers = int(data.get('workers', DEFAULT_EXPORT_WORKERS))
+    except (TypeError, ValueError):
+        return jsonify({
+            "success": False,
+            "error": "workers must be an integer"
+        }), 400
+    # 只接受JSON布尔值：bool("false") 为True，会让客户端无法关闭需要全局读锁的一致性快照
+    consistent = data.get('consistent', True)
+    if not isinstance(consistent, bool):
+        return jsonify({
+            "success": False,
+            "error": "consistent must be a boolean"
+        }), 400
+
+    result = db_manager.export_database_archive(name, format_type, archive_format, table_names, workers,
+                                                consistent=consistent)
+    if not result["success"]:
+        return jsonify({
+            "success": False,
+            "error": result["error"]
+        }), 404 if result["error"] == "Database not found" else 400
+
+    export = result["export"]
+    export_id = uuid.uuid4().hex
+    progress = _register_export_progress(export_id, name)
+
+    def generate():
+        try:
+            for piece in export:
+                progress["bytes"] = export.bytes
+                progress["rows"] = export.rows
+                yield piece
+        except Exception as e:
+            print(f"Error streaming export archive: {e}")
+            progress["error"] = str(e)
+        finally:
+            export.close()
+            progress["rows"] = export.rows
+            progress["done"] = True
+            progress["cancelled"] = len(export.results) < len(export.tables)
+            metrics.DB_ROWS.inc(name, "exported", amount=export.rows)
+
+    response = Response(
+        generate(),
+        mimetype=ARCHIVE_MIMETYPES[archive_format],
+        headers={
+            'Content-Disposition': f'attachment; filename="{name}.{archive_format}"',
+            'X-Export-Id': export_id,
+            'X-Export-Snapshot': result["snapshot"]
+        }
+    )
+    # 客户端断开时生成器可能从未开始执行，确保连接总能归还
+    response.call_on_close(export.close)
+    return response
+
+def _register_export_progress(export_id: str, db_name: str) -> dict:
+    """登记一次导出的进度信息，只保留最近 EXPORT_PROGRESS_LIMIT 条"""
+    progress = {
+        "database": db_name,
+        "rows": 0,
+        "bytes": 0,
+        "done": False,
+        "cancelled": False,
+        "error": None,
+        "started_at": time.time()
+    }
+    with export_progress_lock:
+        export_progress[export_id] = progress
+        while len(export_progress) > EXPORT_PROGRESS_LIMIT:
+            export_progress.popitem(last=False)
+    return progress
+
+@app.route('/api/exports/<export_id>', methods=['GET'])
+def get_export_progress(export_id):
+    """查询导出进度（导出响应头 X-Export-Id 中的ID）"""
+    with export_progress_lock:
+        progress = export_progress.get(export_id)
+        progress = dict(progress) if progress else None
+
+    if not progress:
+        return jsonify({
+            "success": False,
+            "error": "Export not found"
+        }), 404
+
+    return jsonify({
+        "success": True,
+        "data": progress
+    })
+
 # 添加路由：提供前端静态文件
 @app.route('/<path:filename>')
 def serve_static_files(filename):
@@ -652,5 +1395,14 @@ def serve_index():
     """Serve the main index.html file"""
     return send_from_directory(frontend_dist_path, 'index.html')
 
+def serve():
+    """按SERVER_MODE启动服务"""
+    if SERVER_MODE == 'production':
+        from waitress import serve as waitress_serve
+        print(f"Serving on 0.0.0.0:{SERVER_PORT} with waitress ({SERVER_THREADS} threads)")
+        waitress_serve(app, host='0.0.0.0', port=SERVER_PORT, threads=SERVER_THREADS)
+    else:
+        app.run(debug=True, host='0.0.0.0', port=SERVER_PORT, threaded=True)
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5050)
+    serve()
@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""
+整库归档导出模块
+多个工作线程并行导出各表的数据，打包为zip或tar流按表完成的顺序边生成边返回：
+- 每个工作线程持有一个连接，从共享队列中领取下一张表（按估算大小从大到小），
+  把表数据编码到临时文件（小表留在内存中，大表写入磁盘）
+- 打包线程把完成的表依次写入归档，最后写入 manifest.json 记录每张表的行数和错误
+- 调用方迭代 ArchiveExport 得到归档的字节块；客户端读取变慢时打包线程会阻塞等待
+"""
+
+import io
+import json
+import queue
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from typing import Any, Callable, Dict, Iterator, List
+
+import export_encoder
+from keyset_pagination import quote_identifier
+from result_stream import DEFAULT_CHUNK_SIZE
+
+ARCHIVE_FORMATS = ("zip", "tar", "tar.gz")
+ARCHIVE_MIMETYPES = {"zip": "application/zip", "tar": "application/x-tar", "tar.gz": "application/gzip"}
+FILE_EXTENSIONS = {"csv": "csv", "insert_sql": "sql"}
+
+DEFAULT_WORKERS = 4
+MAX_WORKERS = 16
+# 单张表编码结果超过该字节数后写入磁盘临时文件
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+# 打包线程与响应之间最多缓冲的数据块数
+OUTPUT_QUEUE_SIZE = 64
+COPY_BUFFER_SIZE = 1024 * 1024
+# 取消导出后等待工作线程退出的最长秒数
+JOIN_TIMEOUT = 30
+# 建立共享快照时等待全局读锁的最长秒数，超时后退化为单连接快照
+SNAPSHOT_LOCK_TIMEOUT = 10
+
+# 快照模式：shared 所有工作线程共享同一个一致性快照；single 单个连接在一个快照内依次导出所有表；
+# per_table 每张表各自一致，表之间不保证一致
+SNAPSHOT_SHARED = "shared"
+SNAPSHOT_SINGLE = "single"
+SNAPSHOT_PER_TABLE = "per_table"
+
+START_SNAPSHOT_SQL = ("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ",
+                      "START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+
+_TABLE_SIZES_SQL = """
+    SELECT TABLE_NAME, COALESCE(DATA_LENGTH, 0)
+    FROM   information_schema.TABLES
+    WHERE  TABLE_SCHEMA = %s
+"""
+
+_WORKER_EXIT = object()
+
+
+class _Cancelled(Exception):
+    """导出已被取消"""
+
+
+def start_snapshot(cursor):
+    """在连接上开启只读的一致性快照事务"""
+    for sql in START_SNAPSHOT_SQL:
+        cursor.execute(sql)
+
+
+def order_by_size(cursor, database: str, tables: List[str]) -> List[str]:
+    """按information_schema中的估算数据量从大到小排列表，让最大的表最先开始导出"""
+    cursor.execute(_TABLE_SIZES_SQL, (database,))
+    sizes = {}
+    for name, size in cursor.fetchall():
+        if isinstance(name, (bytes, bytearray)):
+            name = name.decode('utf-8')
+        sizes[name] = int(size or 0)
+    return sorted(tables, key=lambda table: -sizes.get(table, 0))
+
+
+def archive_member_name(table_name: str, format_type: str) -> str:
+    """表在归档中的文件名"""
+    safe_name = table_name.replace("/", "_").replace("\\", "_")
+    return f"{safe_name}.{FILE_EXTENSIONS[format_type]}"
+
+
+class _QueueWriter:
+    """
+    把归档写入的数据放进有界队列，队列满时阻塞
+
+    导出取消后第一次写入抛出 _Cancelled 让打包线程退出，之后的写入（例如zipfile被回收时
+    补写的目录记录）直接丢弃
+    """
+
+    def __init__(self, output: queue.Queue, cancelled: threading.Event):
+        self._output = output
+        self._cancelled = cancelled
+        self._abandoned = False
+
+    def write(self, data) -> int:
+        if not data or self._abandoned:
+            return len(data)
+        data = bytes(data)
+        while True:
+            if self._cancelled.is_set():
+                self._abandoned = True
+                raise _Cancelled()
+            try:
+                self._output.put(data, timeout=0.5)
+                return len(data)
+            except queue.Full:
+                continue
+
+    def flush(self):
+        pass
+
+
+class _ZipArchive:
+    def __init__(self, fileobj):
+        self._zip = zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+
+    def add(self, name: str, fileobj, size: int):
+        info = zipfile.ZipInfo(name, time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        # 提前给出大小，zipfile据此决定是否使用ZIP64
+        info.file_size = size
+        with self._zip.open(info, "w") as entry:
+            shutil.copyfileobj(fileobj, entry, COPY_BUFFER_SIZE)
+
+    def close(self):
+        self._zip.close()
+
+
+class _TarArchive:
+    def __init__(self, fileobj, compressed: bool):
+        self._tar = tarfile.open(fileobj=fileobj, mode="w|gz" if compressed else "w|")
+
+    def add(self, name: str, fileobj, size: int):
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(time.time())
+        self._tar.addfile(info, fileobj)
+
+    def close(self):
+        self._tar.close()
+
+
+def _open_archive(fileobj, archive_format: str):
+    if archive_format == "zip":
+        return _ZipArchive(fileobj)
+    return _TarArchive(fileobj, compressed=archive_format == "tar.gz")
+
+
+class ArchiveExport:
+    """
+    并行导出多张表并打包为归档流
+
+    迭代对象得到归档的字节块。传入的连接在导出结束或取消时由 release 归还；
+    提前结束读取（包括客户端断开）时必须调用 close()，它会终止正在执行的查询并等待工作线程退出。
+
+    Args:
+        connections (list): 工作线程使用的连接，每个连接一个线程
+        tables (List[str]): 要导出的表，按领取顺序排列
+        format_type (str): csv 或 insert_sql
+        archive_format (str): zip、tar 或 tar.gz
+        release (Callable): release(connection, discard) 归还连接
+        cancel_query (Callable[[int], None]): 终止指定连接ID上正在执行的查询
+        snapshot (str): 快照模式，写入manifest.json
+        chunk_size (int): 每次fetchmany读取的行数
+    """
+
+    def __init__(self, connections: list, tables: List[str], format_type: str, archive_format: str,
+                 release: Callable, cancel_query: Callable[[int], None], snapshot: str,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.tables = list(tables)
+        self.format_type = format_type
+        self.archive_format = archive_format
+        self.snapshot = snapshot
+        self.chunk_size = chunk_size
+        self.rows = 0
+        self.bytes = 0
+        self.results = {}
+        self._connections = list(connections)
+        self._release = release
+        self._cancel_query = cancel_query
+        self._pending = queue.Queue()
+        for table in self.tables:
+            self._pending.put(table)
+        self._done = queue.Queue()
+        self._output = queue.Queue(maxsize=OUTPUT_QUEUE_SIZE)
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._started = False
+        self._closed = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        self._start()
+        try:
+            while True:
+                data = self._output.get()
+                if data is None:
+                    break
+                if isinstance(data, Exception):
+                    raise data
+                self.bytes += len(data)
+                yield data
+        finally:
+            self.close()
+
+    def _start(self):
+        with self._lock:
+            if self._started or self._closed:
+                raise RuntimeError("Archive export can only be iterated once")
+            self._started = True
+            for connection in self._connections:
+                self._threads.append(threading.Thread(target=self._work, args=(connection,),
+                                                      name="export-worker", daemon=True))
+            self._threads.append(threading.Thread(target=self._archive, name="export-archiver", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def close(self):
+        """取消尚未完成的导出并归还连接，可重复调用"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            started = self._started
+        self._cancelled.set()
+
+        if not started:
+            for connection in self._connections:
+                self._release(connection, False)
+            return
+
+        for thread in self._threads:
+            thread.join(JOIN_TIMEOUT)
+        # 清理已完成但没有写入归档的临时文件
+        while True:
+            try:
+                item = self._done.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _WORKER_EXIT and item["file"] is not None:
+                item["file"].close()
+
+    def _work(self, connection):
+        """工作线程：依次领取表并导出，连接出错时退出，剩余的表由其他线程继续处理"""
+        discard = False
+        try:
+            while not self._cancelled.is_set():
+                try:
+                    table = self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                result, broken = self._dump_table(connection, table)
+                self._done.put(result)
+                if broken:
+                    discard = True
+                    break
+        finally:
+            self._release(connection, discard)
+            self._done.put(_WORKER_EXIT)
+
+    def _chunks(self, cursor, result: Dict[str, Any]) -> Iterator[List[tuple]]:
+        """分块读取结果，同时累计表的行数和总行数；导出取消后抛出 _Cancelled"""
+        while True:
+            if self._cancelled.is_set():
+                raise _Cancelled()
+            chunk = cursor.fetchmany(self.chunk_size)
+            if not chunk:
+                return
+            result["rows"] += len(chunk)
+            with self._lock:
+                self.rows += len(chunk)
+            yield chunk
+
+    def _dump_table(self, connection, table: str):
+        """
+        把一张表的数据编码到临时文件
+
+        Returns:
+            tuple: (结果, 连接是否已不可用)
+        """
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        result = {"table": table, "file": None, "size": 0, "rows": 0, "error": None}
+        try:
+            if self.format_type != "csv":
+                cursor = connection.cursor()
+                cursor.execute("SELECT @@max_allowed_packet")
+                max_allowed_packet = int(cursor.fetchone()[0])
+                cursor.close()
+            cursor = connection.cursor(buffered=False)
+            cursor.execute(f"SELECT * FROM {quote_identifier(table)}")
+
+            chunks = self._chunks(cursor, result)
+            if self.format_type == "csv":
+                content = export_encoder.encode_csv(cursor.description, chunks)
+            else:
+                header_lines = ["-- MySQL dump", f"-- Table: {table}", ""]
+                content = export_encoder.encode_insert_sql(table, cursor.description, chunks, header_lines,
+                                                           max_allowed_packet)
+            for piece in content:
+                spool.write(piece.encode('utf-8'))
+            if self.format_type != "csv":
+                # CSV的每条记录已经以换行结尾
+                spool.write(b"\n")
+            cursor.close()
+
+            result["size"] = spool.tell()
+            result["file"] = spool
+            spool.seek(0)
+            return result, False
+
+        except Exception as e:
+            spool.close()
+            broken = False
+            try:
+                if connection.unread_result:
+                    # 结果集未读完：终止服务器端查询，连接不再复用
+                    self._cancel_query(connection.connection_id)
+                    broken = True
+                else:
+                    connection.ping()
+            except Exception:
+                broken = True
+            if isinstance(e, _Cancelled):
+                result["error"] = "Export cancelled"
+            else:
+                print(f"Error exporting table {table}: {e}")
+                result["error"] = str(e)
+            return result, broken
+
+    def _archive(self):
+        """打包线程：按完成顺序把各表写入归档，最后写入manifest.json"""
+        try:
+            archive = _open_archive(_QueueWriter(self._output, self._cancelled), self.archive_format)
+            remaining = len(self.tables)
+            alive = len(self._connections)
+            while remaining:
+                item = self._done.get()
+                if item is _WORKER_EXIT:
+                    alive -= 1
+                    if alive == 0:
+                        # 所有工作线程都已退出（连接出错或取消），剩余的表无法导出
+                        self._fail_pending()
+                    continue
+                remaining -= 1
+                self._add_result(archive, item)
+
+            manifest = json.dumps(self._manifest(), ensure_ascii=False, indent=2).encode('utf-8')
+            archive.add("manifest.json", io.BytesIO(manifest), len(manifest))
+            archive.close()
+            self._put_final(None)
+        except _Cancelled:
+            pass
+        except Exception as e:
+            print(f"Error building export archive: {e}")
+            self._put_final(e)
+
+    def _add_result(self, archive, item: Dict[str, Any]):
+        table = item["table"]
+        name = None
+        if item["file"] is not None:
+            name = archive_member_name(table, self.format_type)
+            try:
+                archive.add(name, item["file"], item["size"])
+            finally:
+                item["file"].close()
+        self.results[table] = {"file": name, "rows": item["rows"], "bytes": item["size"], "error": item["error"]}
+
+    def _fail_pending(self):
+        while True:
+            try:
+                table = self._pending.get_nowait()
+            except queue.Empty:
+                return
+            self._done.put({"table": table, "file": None, "size": 0, "rows": 0,
+                            "error": "No export connection available"})
+
+    def _manifest(self) -> Dict[str, Any]:
+        return {
+            "format": self.format_type,
+            "snapshot": self.snapshot,
+            "tables": [dict(self.results[table], table=table) for table in self.tables if table in self.results]
+        }
+
+    def _put_final(self, item):
+        """通知迭代方归档已结束（None）或出错（异常对象）"""
+        while not self._cancelled.is_set():
+            try:
+                self._output.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
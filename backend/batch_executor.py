@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+批量SQL执行模块
+把连续的SQL语句打包为多语句数据包一次发送，减少网络往返：
+- 连续的同表单行INSERT合并为一条多行INSERT
+- 其余语句以分号拼接，按 max_allowed_packet 控制每个数据包的大小
+- 可选每执行N条语句提交一次事务
+执行结果仍按原始语句逐条给出影响行数
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from mysql.connector import Error
+
+# 每个数据包最多占用max_allowed_packet的比例
+PACKET_USAGE = 0.5
+# 每个数据包的字节数上限，控制内存占用
+MAX_PACKET_BYTES = 16 * 1024 * 1024
+MIN_PACKET_BYTES = 64 * 1024
+
+# 可能返回多个结果集或需要客户端配合的语句，单独发送以保证结果与语句一一对应
+_STANDALONE = re.compile(r"\s*(?:CALL|LOAD)\b", re.IGNORECASE)
+
+# 单行INSERT：INSERT INTO 表 [(列, ...)] VALUES (值, ...)
+# 值中只允许字符串内出现括号，含函数调用等嵌套括号的语句不参与合并
+_ROW = r"""\((?:[^'"()]|'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")*\)"""
+_SINGLE_ROW_INSERT = re.compile(
+    r"\s*(INSERT\s+INTO\s+(?:`[^`]+`|\w+)(?:\s*\.\s*(?:`[^`]+`|\w+))?\s*(?:\([^()]*\)\s*)?VALUES\s*)"
+    r"(" + _ROW + r")\s*",
+    re.IGNORECASE | re.DOTALL
+)
+_COMMENT_MARKERS = ("--", "#", "/*")
+
+
+class BatchExecutionError(Exception):
+    """批量执行出错，带有出错语句的序号和已提交的语句数"""
+
+    def __init__(self, message: str, statement_number: int, committed_statements: int = 0):
+        super().__init__(message)
+        self.statement_number = statement_number
+        self.committed_statements = committed_statements
+
+
+def packet_byte_budget(max_allowed_packet: int) -> int:
+    """根据max_allowed_packet计算每个数据包允许的字节数"""
+    return max(MIN_PACKET_BYTES, min(int(max_allowed_packet * PACKET_USAGE), MAX_PACKET_BYTES))
+
+
+def _byte_length(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode('utf-8'))
+
+
+def parse_single_row_insert(sql_statement: str) -> Optional[Tuple[str, str]]:
+    """
+    识别可合并的单行INSERT语句
+
+    Returns:
+        Optional[Tuple[str, str]]: (VALUES之前的语句前缀, 值元组文本)，不可合并时返回None
+    """
+    if any(marker in sql_statement for marker in _COMMENT_MARKERS):
+        return None
+    match = _SINGLE_ROW_INSERT.fullmatch(sql_statement)
+    if not match:
+        return None
+    return match.group(1), match.group(2)
+
+
+class PacketPlanner:
+    """
+    把语句流规划为数据包
+
+    每个数据包是 (SQL文本, 对应的原始语句数) 列表：合并后的多行INSERT对应多条原始语句，
+    其余语句各对应一条。数据包的字节数不超过max_bytes（单条超长语句单独成包），
+    设置max_statements时数据包包含的原始语句数不超过该值。
+    """
+
+    def __init__(self, max_bytes: int, max_statements: int = None):
+        self.max_bytes = max_bytes
+        self.max_statements = max_statements
+        self._packet = []
+        self._bytes = 0
+        self._count = 0
+        # 正在合并的INSERT：[合并键, 语句前缀, 值元组列表]
+        self._merge = None
+
+    def add(self, sql_statement: str) -> List[List[Tuple[str, int]]]:
+        """加入一条语句，返回已经规划完成的数据包"""
+        done = []
+        if _STANDALONE.match(sql_statement):
+            done.extend(self.finish())
+            done.append([(sql_statement, 1)])
+            return done
+
+        insert = parse_single_row_insert(sql_statement)
+        if insert:
+            prefix, row = insert
+            key = ' '.join(prefix.split())
+            if self._merge and self._merge[0] == key and not self._full() \
+                    and self._fits(_byte_length(row) + 2):
+                self._merge[2].append(row)
+                self._bytes += _byte_length(row) + 2
+                self._count += 1
+                return done
+
+        self._close_merge()
+        size = _byte_length(sql_statement) + 2
+        if self._packet and (self._full() or not self._fits(size)):
+            done.extend(self._flush())
+
+        if insert:
+            self._merge = [key, prefix, [row]]
+        else:
+            self._packet.append((sql_statement, 1))
+        self._bytes += size
+        self._count += 1
+        return done
+
+    def finish(self) -> List[List[Tuple[str, int]]]:
+        """返回剩余的数据包"""
+        return self._flush()
+
+    def _fits(self, size: int) -> bool:
+        return self._bytes + size <= self.max_bytes
+
+    def _full(self) -> bool:
+        return bool(self.max_statements) and self._count >= self.max_statements
+
+    def _close_merge(self):
+        if self._merge:
+            _, prefix, rows = self._merge
+            self._packet.append((prefix + ', '.join(rows), len(rows)))
+            self._merge = None
+
+    def _flush(self) -> List[List[Tuple[str, int]]]:
+        self._close_merge()
+        if not self._packet:
+            return []
+        packet = self._packet
+        self._packet = []
+        self._bytes = 0
+        self._count = 0
+        return [packet]
+
+
+def join_packet(packet: List[Tuple[str, int]]) -> str:
+    """把数据包中的语句拼接为多语句SQL；以注释结尾的语句在分号前换行，避免分号被注释吞掉"""
+    return ';\n'.join([sql + '\n' if '--' in sql or '#' in sql else sql for sql, _ in packet])
+
+
+def execute_packet(cursor, packet: List[Tuple[str, int]], affected_rows: List[int]):
+    """
+    以多语句方式执行一个数据包，把每条原始语句的影响行数追加到affected_rows
+
+    查询语句记为0，合并的INSERT每条记为1。执行出错时affected_rows中只包含出错语句之前的结果。
+    """
+    index = 0
+    for result in cursor.execute(join_packet(packet), multi=True):
+        if result.with_rows:
+            result.fetchall()
+            rowcount = 0
+        else:
+            rowcount = result.rowcount
+
+        count = packet[index][1] if index < len(packet) else 1
+        if count == 1:
+            affected_rows.append(rowcount)
+        elif rowcount == count:
+            affected_rows.extend([1] * count)
+        else:
+            affected_rows.extend([rowcount] + [0] * (count - 1))
+        index += 1
+
+
+def execute_batches(connection, cursor, sql_statements: Iterable[str], max_bytes: int,
+                    commit_every: int = None) -> Dict[str, Any]:
+    """
+    规划并执行批量语句
+
+    Args:
+        connection: 数据库连接，用于分段提交
+        cursor: 游标
+        sql_statements (Iterable[str]): SQL语句列表或按需生成语句的迭代器
+        max_bytes (int): 每个数据包的字节数上限
+        commit_every (int): 每执行多少条语句提交一次，为空时由调用方在最后统一提交
+
+    Returns:
+        Dict[str, Any]: affected_rows、statement_count、packet_count
+
+    Raises:
+        BatchExecutionError: 语句执行出错
+    """
+    planner = PacketPlanner(max_bytes, commit_every)
+    affected_rows = []
+    statement_count = 0
+    packet_count = 0
+    committed = 0
+
+    def run(packets):
+        nonlocal statement_count, packet_count, committed
+        for packet in packets:
+            executed = len(affected_rows)
+            try:
+                execute_packet(cursor, packet, affected_rows)
+            except Error as e:
+                # 服务器按顺序执行数据包中的语句，出错语句之前的结果都已读取
+                failed = statement_count + len(affected_rows) - executed + 1
+                raise BatchExecutionError(str(e), failed, committed)
+            statement_count += sum(count for _, count in packet)
+            packet_count += 1
+            if commit_every and statement_count - committed >= commit_every:
+                connection.commit()
+                committed = statement_count
+
+    for sql_statement in sql_statements:
+        run(planner.add(sql_statement))
+    run(planner.finish())
+
+    return {
+        "affected_rows": affected_rows,
+        "statement_count": statement_count,
+        "packet_count": packet_count
+    }
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+查询结果编码基准测试
+对比原有的 jsonify 行数组响应与 result_encoding 的 columnar JSON、MessagePack、Arrow IPC
+编码的耗时、响应大小和峰值内存（未安装msgpack或pyarrow时跳过对应格式）
+
+用法:
+    python benchmarks/bench_result_encoding.py --rows 1000000
+    python benchmarks/bench_result_encoding.py --rows 100000 --formats json columnar
+"""
+
+import argparse
+import datetime
+import decimal
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify  # noqa: E402
+
+import result_encoding  # noqa: E402
+
+
+def generate_result(rows: int):
+    """生成一个与 execute_sql 返回格式相同的查询结果，列类型覆盖整数、字符串、DECIMAL、DATETIME、DATE和可空列"""
+    random.seed(42)
+    words = ["alpha", "beta", "gamma", "中文", "quote's", "semi;colon"]
+    base = datetime.datetime(2024, 1, 1)
+    results = []
+    for i in range(rows):
+        created = base + datetime.timedelta(seconds=random.randrange(365 * 86400))
+        results.append((
+            i + 1,
+            f"{random.choice(words)}-{i}",
+            decimal.Decimal(random.randrange(10 ** 8)) / 100,
+            random.random() * 1000,
+            created,
+            created.date(),
+            None if i % 5 == 0 else random.choice(words)
+        ))
+    return {
+        "success": True,
+        "type": "SELECT",
+        "columns": ["id", "name", "amount", "score", "created_at", "created_on", "note"],
+        "column_types": ["LONGLONG", "VAR_STRING", "NEWDECIMAL", "DOUBLE", "DATETIME", "DATE", "VAR_STRING"],
+        "results": results,
+        "row_count": rows,
+        "cache": {"status": "bypass"}
+    }
+
+
+def encode_legacy(app: Flask, result):
+    """原有方式：jsonify({"success": True, "data": result})"""
+    with app.app_context():
+        return jsonify({"success": True, "data": result}).get_data()
+
+
+def run(name: str, func, rows: int):
+    started = time.perf_counter()
+    body = func()
+    elapsed = time.perf_counter() - started
+
+    # 单独测量峰值内存，避免tracemalloc的开销影响耗时结果
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<10} time={elapsed:8.2f}s throughput={rows / elapsed:12.0f} rows/s "
+          f"size={len(body) / 1024 / 1024:8.1f} MB peak_memory={peak / 1024 / 1024:8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="结果行数")
+    parser.add_argument("--formats", nargs="+", default=list(result_encoding.FORMATS),
+                        choices=result_encoding.FORMATS, help="要测试的格式")
+    args = parser.parse_args()
+
+    result = generate_result(args.rows)
+    app = Flask(__name__)
+    print(f"rows={args.rows} columns={len(result['columns'])}")
+
+    for encoding in args.formats:
+        if encoding == result_encoding.JSON:
+            run("jsonify", lambda: encode_legacy(app, result), args.rows)
+            continue
+        try:
+            result_encoding.negotiate(encoding)
+        except result_encoding.EncodingError as e:
+            print(f"{encoding:<10} skipped: {e}")
+            continue
+        run(encoding, lambda: result_encoding.encode(result, encoding)[0], args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+SQL脚本切分基准测试
+对比原有的 str.split(';') 方式与 sql_util.split_sql_stream 的吞吐量和峰值内存
+
+用法:
+    python benchmarks/bench_sql_split.py --size-mb 100
+    python benchmarks/bench_sql_split.py --file dump.sql
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sql_util  # noqa: E402
+
+
+def generate_dump(path: str, size_mb: int, rows_per_insert: int = 100):
+    """生成一个类似mysqldump输出的SQL文件"""
+    random.seed(42)
+    target = size_mb * 1024 * 1024
+    words = ["alpha", "beta", "it''s", "semi;colon", "back\\\\slash", "中文", "quote\\'s"]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("-- MySQL dump\n/*!40101 SET NAMES utf8mb4 */;\n")
+        f.write("CREATE TABLE `t` (`id` int, `name` varchar(64), `note` text);\n")
+        row_id = 0
+        while f.tell() < target:
+            values = []
+            for _ in range(rows_per_insert):
+                row_id += 1
+                values.append(f"({row_id},'{random.choice(words)}','{random.choice(words)} {row_id}')")
+            f.write(f"INSERT INTO `t` VALUES {','.join(values)};\n")
+        f.write("DELIMITER $$\nCREATE PROCEDURE p() BEGIN SELECT 1; SELECT 2; END$$\nDELIMITER ;\n")
+
+
+def bench_legacy(path: str):
+    """原有方式：整个文件读入内存后按分号分割"""
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    return sum(1 for stmt in content.split(';') if stmt.strip())
+
+
+def bench_stream(path: str):
+    """sql_util.split_sql_stream：按块读取并逐条生成语句"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return sum(1 for _ in sql_util.split_sql_stream(f))
+
+
+def run(name: str, func, path: str):
+    size_mb = os.path.getsize(path) / 1024 / 1024
+
+    started = time.perf_counter()
+    count = func(path)
+    elapsed = time.perf_counter() - started
+
+    # 单独测量峰值内存，避免tracemalloc的开销影响吞吐量结果
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<10} statements={count:<10} time={elapsed:8.2f}s "
+          f"throughput={size_mb / elapsed:8.1f} MB/s peak_memory={peak / 1024 / 1024:8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", help="要切分的SQL文件，不指定时生成测试数据")
+    parser.add_argument("--size-mb", type=int, default=50, help="生成的测试文件大小（MB）")
+    args = parser.parse_args()
+
+    path = args.file
+    temp_path = None
+    if not path:
+        fd, temp_path = tempfile.mkstemp(suffix=".sql")
+        os.close(fd)
+        generate_dump(temp_path, args.size_mb)
+        path = temp_path
+
+    try:
+        print(f"file={path} size={os.path.getsize(path) / 1024 / 1024:.1f} MB")
+        run("split(';')", bench_legacy, path)
+        run("stream", bench_stream, path)
+    finally:
+        if temp_path:
+            os.remove(temp_path)
+
+
+if __name__ == "__main__":
+    main()
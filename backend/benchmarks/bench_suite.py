@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+"""
+热点路径基准测试套件
+在本地MySQL/MariaDB实例上创建临时数据库和合成数据，测量以下操作：
+- import_csv: import_csv_to_table 导入CSV
+- export_csv / export_insert_sql: export_sql_data 导出整张表
+- execute_scan: execute_sql 读取整张表
+- execute_point: execute_sql 按主键查询单行
+- schema_cold / schema_warm: get_all_tables_structure（元数据缓存失效后 / 命中缓存）
+
+每个操作记录吞吐量（rows/s、MB/s）、单次耗时的分位数（p50/p95/p99）和执行期间的峰值RSS，
+结果可以保存为JSON基线，之后的运行与基线比较，超出容差时以退出码1结束（可用于CI）。
+
+用法:
+    python benchmarks/bench_suite.py --user root --password secret --rows 200000 --tables 200
+    python benchmarks/bench_suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_suite.py --baseline benchmarks/baseline.json --tolerance 0.15
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mysql.connector  # noqa: E402
+
+from database_manager import DatabaseManager  # noqa: E402
+
+CONFIG_NAME = "bench"
+ROWS_TABLE = "bench_rows"
+
+# 比较基线时各指标的方向：True表示越大越好
+METRICS = {
+    "rows_per_s": True,
+    "mb_per_s": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "peak_rss_mb": False
+}
+
+
+def percentile(samples, fraction: float) -> float:
+    """最近秩法计算分位数"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _reset_peak_rss() -> bool:
+    """重置进程的峰值RSS（Linux的 /proc/self/clear_refs），不支持时返回False"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    """进程的峰值RSS（MB），优先读取可重置的VmHWM"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS的单位是字节，Linux是KB
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+class Suite:
+    """
+    基准测试的数据准备和各操作的测量
+
+    Args:
+        args: 命令行参数
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.server = {
+            "host": args.host,
+            "port": args.port,
+            "user": args.user,
+            "password": args.password
+        }
+        self.temp_dir = tempfile.mkdtemp(prefix="bench-suite-")
+        self.csv_path = os.path.join(self.temp_dir, "rows.csv")
+        config_path = os.path.join(self.temp_dir, "config.json")
+        with open(config_path, "w") as f:
+            json.dump({"databases": [dict(self.server, name=CONFIG_NAME, database=args.database)]}, f)
+        self.manager = DatabaseManager(config_path)
+        self.results = {}
+
+    def _server_execute(self, statements):
+        connection = mysql.connector.connect(**self.server)
+        try:
+            cursor = connection.cursor()
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.close()
+            connection.commit()
+        finally:
+            connection.close()
+
+    def server_version(self) -> str:
+        connection = mysql.connector.connect(**self.server)
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT VERSION()")
+            version = cursor.fetchone()[0]
+            cursor.close()
+            return version
+        finally:
+            connection.close()
+
+    def seed(self):
+        """创建临时数据库：一张数据表和 --tables 张用于结构读取的表，并生成待导入的CSV文件"""
+        database = self.args.database
+        statements = [
+            f"DROP DATABASE IF EXISTS `{database}`",
+            f"CREATE DATABASE `{database}` DEFAULT CHARACTER SET utf8mb4",
+            f"CREATE TABLE `{database}`.`{ROWS_TABLE}` ("
+            "`id` BIGINT NOT NULL PRIMARY KEY, `name` VARCHAR(64) NOT NULL, `amount` DECIMAL(12,2), "
+            "`score` DOUBLE, `created_at` DATETIME, `note` TEXT NULL, KEY `idx_created_at` (`created_at`))"
+        ]
+        for i in range(self.args.tables):
+            columns = ", ".join(f"`c{j}` {'INT' if j % 2 else 'VARCHAR(32)'} NULL COMMENT 'column {j}'"
+                                for j in range(self.args.columns))
+            statements.append(f"CREATE TABLE `{database}`.`bench_schema_{i}` ("
+                              f"`id` INT NOT NULL AUTO_INCREMENT PRIMARY KEY, {columns}, KEY `idx_c0` (`c0`))")
+        self._server_execute(statements)
+
+        random.seed(42)
+        words = ["alpha", "beta", "gamma", "中文", "quote's", "comma,value", 'say "hi"']
+        base = datetime.datetime(2024, 1, 1)
+        with open(self.csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "name", "amount", "score", "created_at", "note"])
+            for i in range(1, self.args.rows + 1):
+                created = base + datetime.timedelta(seconds=random.randrange(365 * 86400))
+                writer.writerow([i, f"{random.choice(words)}-{i}", f"{random.randrange(10 ** 8) / 100:.2f}",
+                                 random.random() * 1000, created.strftime("%Y-%m-%d %H:%M:%S"),
+                                 "" if i % 5 == 0 else random.choice(words) * 3])
+
+    def cleanup(self):
+        # 删除配置时会关闭对应的连接池
+        self.manager.remove_database(CONFIG_NAME)
+        if not self.args.keep:
+            self._server_execute([f"DROP DATABASE IF EXISTS `{self.args.database}`"])
+        for name in os.listdir(self.temp_dir):
+            os.remove(os.path.join(self.temp_dir, name))
+        os.rmdir(self.temp_dir)
+
+    def measure(self, name: str, func, iterations: int, prepare=None):
+        """
+        执行 iterations 次操作并记录结果
+
+        func 返回本次处理的 (行数, 字节数)；prepare 在每次执行之前调用，不计入耗时
+        """
+        durations = []
+        rows = 0
+        size = 0
+        resettable = _reset_peak_rss()
+        for _ in range(iterations):
+            if prepare:
+                prepare()
+            started = time.perf_counter()
+            count, nbytes = func()
+            durations.append(time.perf_counter() - started)
+            rows += count
+            size += nbytes
+        total = sum(durations)
+
+        result = {
+            "iterations": iterations,
+            "rows_per_s": round(rows / total, 1) if total and rows else None,
+            "mb_per_s": round(size / 1024 / 1024 / total, 2) if total and size else None,
+            "p50_ms": round(percentile(durations, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(durations, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(durations, 0.99) * 1000, 3),
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            # 不能重置峰值RSS的平台上记录的是进程启动以来的峰值
+            "rss_scope": "operation" if resettable else "process"
+        }
+        self.results[name] = result
+        print(f"{name:<18} iterations={iterations:<5} rows/s={result['rows_per_s'] or '-':<12} "
+              f"MB/s={result['mb_per_s'] or '-':<8} p50={result['p50_ms']:.1f}ms p95={result['p95_ms']:.1f}ms "
+              f"p99={result['p99_ms']:.1f}ms peak_rss={result['peak_rss_mb']:.1f}MB")
+
+    def run(self):
+        args = self.args
+        csv_size = os.path.getsize(self.csv_path)
+
+        def import_csv():
+            with open(self.csv_path, newline="", encoding="utf-8") as f:
+                result = self.manager.import_csv_to_table(CONFIG_NAME, ROWS_TABLE, csv.reader(f),
+                                                          strategy=args.import_strategy)
+            if not result["success"]:
+                raise RuntimeError(f"import_csv failed: {result['error']}")
+            return result["rows_imported"], csv_size
+
+        self.measure("import_csv", import_csv, args.iterations,
+                     prepare=lambda: self.manager.execute_sql(CONFIG_NAME, f"TRUNCATE TABLE `{ROWS_TABLE}`"))
+
+        def export(format_type):
+            def func():
+                result = self.manager.export_sql_data(CONFIG_NAME, f"SELECT * FROM `{ROWS_TABLE}`", format_type,
+                                                      ROWS_TABLE)
+                if not result["success"]:
+                    raise RuntimeError(f"export {format_type} failed: {result['error']}")
+                size = sum(len(piece.encode("utf-8")) for piece in result["content"])
+                return result["stream"].row_count, size
+            return func
+
+        self.measure("export_csv", export("csv"), args.iterations)
+        self.measure("export_insert_sql", export("insert_sql"), args.iterations)
+
+        def execute(sql):
+            def func():
+                result = self.manager.execute_sql(CONFIG_NAME, sql(), use_cache=False)
+                if not result["success"]:
+                    raise RuntimeError(f"execute_sql failed: {result['error']}")
+                return result["row_count"], 0
+            return func
+
+        self.measure("execute_scan", execute(lambda: f"SELECT * FROM `{ROWS_TABLE}`"), args.iterations)
+        self.measure("execute_point",
+                     execute(lambda: f"SELECT * FROM `{ROWS_TABLE}` WHERE `id` = {random.randint(1, args.rows)}"),
+                     args.samples)
+
+        def schema():
+            result = self.manager.get_all_tables_structure(CONFIG_NAME)
+            if not result["success"]:
+                raise RuntimeError(f"get_all_tables_structure failed: {result['error']}")
+            return len(result["data"]), 0
+
+        self.measure("schema_cold", schema, args.samples,
+                     prepare=lambda: self.manager.refresh_metadata(CONFIG_NAME))
+        self.measure("schema_warm", schema, args.samples)
+
+
+def compare(results, baseline, tolerance: float):
+    """
+    与基线比较，返回退化的指标列表
+
+    Returns:
+        List[str]: 每项为 "操作.指标: 基线 -> 本次 (变化比例)"
+    """
+    regressions = []
+    for name, metrics in baseline.get("results", {}).items():
+        current = results.get(name)
+        if current is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = metrics.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change < -tolerance if higher_is_better else change > tolerance
+            marker = "REGRESSION" if worse else "ok"
+            print(f"{name:<18} {metric:<12} {old:>12} -> {new:<12} {change:+7.1%} {marker}")
+            if worse:
+                regressions.append(f"{name}.{metric}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.environ.get("BENCH_MYSQL_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("BENCH_MYSQL_PORT", "3306")))
+    parser.add_argument("--user", default=os.environ.get("BENCH_MYSQL_USER", "root"))
+    parser.add_argument("--password", default=os.environ.get("BENCH_MYSQL_PASSWORD", ""))
+    parser.add_argument("--database", default="sql_connecter_bench", help="创建的临时数据库名（会先被删除）")
+    parser.add_argument("--keep", action="store_true", help="结束后保留临时数据库")
+    parser.add_argument("--rows", type=int, default=100000, help="数据表的行数")
+    parser.add_argument("--tables", type=int, default=100, help="用于结构读取的表数量")
+    parser.add_argument("--columns", type=int, default=20, help="结构读取表的列数")
+    parser.add_argument("--iterations", type=int, default=3, help="导入、导出、全表查询的执行次数")
+    parser.add_argument("--samples", type=int, default=200, help="单行查询和结构读取的执行次数")
+    parser.add_argument("--import-strategy", default="auto", choices=["auto", "executemany", "load_data"])
+    parser.add_argument("--output", help="把本次结果写入JSON文件")
+    parser.add_argument("--baseline", help="与该JSON基线比较，有指标退化时退出码为1")
+    parser.add_argument("--save-baseline", help="把本次结果保存为JSON基线")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="允许的退化比例")
+    args = parser.parse_args()
+
+    suite = Suite(args)
+    try:
+        report = {
+            "meta": {
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "server_version": suite.server_version(),
+                "rows": args.rows,
+                "tables": args.tables,
+                "columns": args.columns,
+                "iterations": args.iterations,
+                "samples": args.samples,
+                "import_strategy": args.import_strategy
+            },
+            "results": suite.results
+        }
+        print(f"server={report['meta']['server_version']} rows={args.rows} tables={args.tables}")
+        suite.seed()
+        suite.run()
+    finally:
+        suite.cleanup()
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+                f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("rows") != args.rows:
+            print(f"warning: baseline was recorded with rows={baseline.get('meta', {}).get('rows')}")
+        regressions = compare(suite.results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
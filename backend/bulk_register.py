@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+批量注册模块
+一次添加多个数据库连接配置（例如同一实例上的大量分库）：
+- 先在本地校验每个条目（必填字段、名称和端口的类型、只读副本设置、名称是否重复）
+- 通过校验的条目在有界线程池中并行验证：每个条目只建立一个连接，数据库不存在时创建，
+  再切换到该数据库确认账号有访问权限
+- 同一实例（host:port）上同时进行的验证数有上限，避免大量并发连接压垮单个实例
+- 所有验证成功的条目由调用方一次性写入配置文件
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from replica_set import validate_replicas
+
+REQUIRED_FIELDS = ('name', 'host', 'port', 'database', 'user', 'password')
+
+DEFAULT_WORKERS = 16            # 同时验证的条目数
+MAX_WORKERS = 64
+DEFAULT_PER_HOST = 4            # 同一实例上同时验证的条目数
+MAX_ENTRIES = 1000              # 每次请求最多的条目数
+DEFAULT_CONNECT_TIMEOUT = 10    # 验证时的连接超时（秒），条目中设置了connect_timeout时以条目为准
+
+
+def validate_entry(entry: Any, existing: Callable[[str], bool], seen: Set[str]) -> Optional[str]:
+    """
+    在本地校验一个条目
+
+    Args:
+        entry: 请求中的条目
+        existing (Callable[[str], bool]): 判断名称是否已经存在于配置中
+        seen (Set[str]): 本次请求中之前出现过的名称，校验通过后加入该名称
+
+    Returns:
+        Optional[str]: 错误信息，校验通过时为None
+    """
+    if not isinstance(entry, dict):
+        return "Entry must be an object"
+    for field in REQUIRED_FIELDS:
+        if field not in entry:
+            return f"Missing required field: {field}"
+    name = entry['name']
+    if not isinstance(name, str) or not name:
+        return "name must be a non-empty string"
+    try:
+        int(entry['port'])
+    except (TypeError, ValueError):
+        return "port must be an integer"
+    replica_error = validate_replicas(entry)
+    if replica_error:
+        return replica_error
+    if name in seen:
+        return "Duplicate name in request"
+    if existing(name):
+        return "Database with this name already exists"
+    seen.add(name)
+    return None
+
+
+def verify_all(entries: List[Dict[str, Any]], verify: Callable[[Dict[str, Any]], Dict[str, Any]],
+               workers: int = DEFAULT_WORKERS, per_host: int = DEFAULT_PER_HOST,
+               cancelled: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
+    """
+    并行验证条目，返回与entries顺序相同的结果
+
+    Args:
+        entries (List[Dict[str, Any]]): 已通过本地校验的条目
+        verify (Callable): 验证单个条目，成功时返回附加到结果中的字段，失败时抛出异常
+        workers (int): 线程数
+        per_host (int): 同一实例上同时验证的条目数
+        cancelled (threading.Event): 设置后尚未开始验证的条目直接失败，不再建立连接
+
+    Returns:
+        List[Dict[str, Any]]: 每个条目的 {"success": ..., "error": ...} 以及verify返回的字段
+    """
+    if not entries:
+        return []
+    host_limits = {}
+    for entry in entries:
+        host_limits.setdefault((entry.get('host'), int(entry.get('port', 3306))),
+                               threading.BoundedSemaphore(per_host))
+
+    def run(entry):
+        with host_limits[(entry.get('host'), int(entry.get('port', 3306)))]:
+            if cancelled is not None and cancelled.is_set():
+                return {"success": False, "error": "Request cancelled"}
+            try:
+                return dict(verify(entry), success=True)
+            except Exception as e:
+                return {"success": False, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(entries)), thread_name_prefix="bulk-register") as pool:
+        return list(pool.map(run, entries))
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+数据库配置存储模块
+管理 config.json 中的数据库连接配置：
+- 内存中按名称索引，查找配置不需要遍历列表，配置数量很多时也不受影响
+- 修改时先写入同目录下的临时文件，再通过重命名原子替换，进程崩溃不会留下不完整的配置文件
+- 修改在锁内完成；写入前检查文件是否被其他进程修改过，如有则先重新加载，不会覆盖其他进程的修改
+- 后台线程定期检查文件的修改时间和大小，文件被外部修改时自动重新加载
+
+同一配置文件在进程内只有一个 ConfigStore（通过 shared 获取），所有 DatabaseManager 共享同一份配置；
+配置变化（本进程的修改或重新加载）之后会通知订阅者，由订阅者关闭旧的连接池、清理缓存
+"""
+
+import json
+import os
+import tempfile
+import threading
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# 检查配置文件是否被外部修改的间隔（秒），为0时不检查
+DEFAULT_WATCH_INTERVAL = 2.0
+
+# 变化通知的参数：失效的旧配置列表（被删除或被修改的条目）
+ChangeListener = Callable[[List[Dict[str, Any]]], None]
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """文件的 (inode, 修改时间, 大小)，文件不存在时为None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class ConfigStore:
+    """
+    线程安全的数据库配置存储
+
+    Args:
+        path (str): 配置文件路径
+        watch_interval (float): 检查文件变化的间隔（秒），为0时不启动后台检查
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str, watch_interval: float = DEFAULT_WATCH_INTERVAL):
+        self.path = path
+        self.watch_interval = watch_interval
+        self._lock = threading.RLock()
+        # 名称 -> 配置，保持文件中的顺序
+        self._entries = {}
+        # config.json 中 databases 以外的字段，保存时原样写回
+        self._extra = {}
+        self._signature = None
+        self._listeners = []
+        self._watcher = None
+        self._stopped = threading.Event()
+        self.reloads = 0
+        self.writes = 0
+        self.reload()
+        if watch_interval > 0:
+            self._watcher = threading.Thread(target=self._watch, name="config-watcher", daemon=True)
+            self._watcher.start()
+
+    @classmethod
+    def shared(cls, path: str, watch_interval: float = DEFAULT_WATCH_INTERVAL) -> "ConfigStore":
+        """获取配置文件对应的进程内共享实例"""
+        key = os.path.abspath(path)
+        with cls._shared_lock:
+            store = cls._shared.get(key)
+            if store is None:
+                store = cls._shared[key] = cls(path, watch_interval)
+            return store
+
+    def subscribe(self, listener: ChangeListener):
+        """订阅配置变化；绑定方法按弱引用保存，订阅者被回收后自动取消"""
+        ref = weakref.WeakMethod(listener) if hasattr(listener, "__self__") else (lambda: listener)
+        with self._lock:
+            self._listeners.append(ref)
+
+    def _notify(self, stale: List[Dict[str, Any]]):
+        if not stale:
+            return
+        with self._lock:
+            listeners = [ref() for ref in self._listeners]
+            self._listeners = [ref for ref, listener in zip(self._listeners, listeners) if listener is not None]
+        for listener in listeners:
+            if listener is not None:
+                try:
+                    listener(stale)
+                except Exception as e:
+                    print(f"Error handling config change: {e}")
+
+    # ---- 读取 ----
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """按名称获取配置，不存在时返回None"""
+        return self._entries.get(name)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """所有配置（按文件中的顺序）"""
+        with self._lock:
+            return list(self._entries.values())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """与 config.json 结构相同的字典"""
+        with self._lock:
+            return dict(self._extra, databases=list(self._entries.values()))
+
+    # ---- 加载和保存 ----
+
+    def _read_file(self) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+        with open(self.path, 'r') as f:
+            config = json.load(f)
+        entries = {}
+        for db in config.get("databases", []):
+            name = db.get("name")
+            if name in entries:
+                print(f"Duplicate database name in config, keeping the first entry: {name}")
+                continue
+            entries[name] = db
+        extra = {key: value for key, value in config.items() if key != "databases"}
+        return entries, extra
+
+    def reload(self, force: bool = True) -> bool:
+        """
+        从文件重新加载配置
+
+        Args:
+            force (bool): 为False时只在文件发生变化后才加载
+
+        Returns:
+            bool: 是否重新加载
+        """
+        with self._lock:
+            signature = _file_signature(self.path)
+            if not force and signature == self._signature:
+                return False
+            old = self._entries
+            if signature is None:
+                entries, extra = {}, {}
+            else:
+                try:
+                    entries, extra = self._read_file()
+                except Exception as e:
+                    # 文件正在被外部编辑或内容有误时保留当前配置，文件再次变化后重试
+                    print(f"Error loading config: {e}")
+                    self._signature = signature
+                    return False
+            self._entries, self._extra, self._signature = entries, extra, signature
+            self.reloads += 1
+        # 被删除或内容变化的配置对应的连接池和缓存需要清理
+        self._notify([db for name, db in old.items() if entries.get(name) != db])
+        return True
+
+    def _write_file(self):
+        """写入临时文件后重命名替换配置文件，需在持有锁时调用"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix=".config-", suffix=".json", dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(dict(self._extra, databases=list(self._entries.values())), f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.path):
+                os.chmod(temp_path, os.stat(self.path).st_mode & 0o777)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+        self._signature = _file_signature(self.path)
+        self.writes += 1
+
+    def save(self):
+        """把当前配置写入文件"""
+        with self._lock, self._file_lock():
+            self._write_file()
+
+    def _file_lock(self):
+        """进程间的写锁，不支持flock的平台只使用进程内的锁"""
+        return _FileLock(os.path.dirname(os.path.abspath(self.path))) if fcntl else _NullLock()
+
+    def _mutate(self, change: Callable[[Dict[str, Dict[str, Any]]], Tuple[Any, List[Dict[str, Any]]]]):
+        """
+        在锁内修改配置并写入文件
+
+        change 接收名称到配置的字典（副本），原地修改后返回 (结果, 失效的旧配置列表)；
+        结果为False时不写入文件。写入之前如果文件已被其他进程修改，先重新加载
+        """
+        with self._lock, self._file_lock():
+            self.reload(force=False)
+            entries = dict(self._entries)
+            result, stale = change(entries)
+            if result is not False:
+                previous = self._entries
+                self._entries = entries
+                try:
+                    self._write_file()
+                except Exception:
+                    self._entries = previous
+                    raise
+        if result is not False:
+            self._notify(stale)
+        return result
+
+    # ---- 修改 ----
+
+    def add(self, db_config: Dict[str, Any]) -> bool:
+        """添加配置，名称已存在时返回False"""
+        def change(entries):
+            name = db_config.get("name")
+            if name in entries:
+                return False, []
+            entries[name] = db_config
+            return True, []
+        return self._mutate(change)
+
+    def add_many(self, db_configs: List[Dict[str, Any]]) -> List[bool]:
+        """添加多个配置，只写入一次文件；返回每个配置是否添加成功（名称已存在时为False）"""
+        def change(entries):
+            added = []
+            for db_config in db_configs:
+                name = db_config.get("name")
+                added.append(name not in entries)
+                if added[-1]:
+                    entries[name] = db_config
+            return (added if any(added) else False), []
+        return self._mutate(change) or [False] * len(db_configs)
+
+    def update(self, old_name: str, db_config: Dict[str, Any]) -> bool:
+        """
+        替换配置（可以改名），保持原来的位置
+
+        新配置没有name时沿用原来的名称；原配置不存在或新名称与其他配置重复时返回False
+        """
+        def change(entries):
+            old = entries.get(old_name)
+            name = db_config.setdefault("name", old_name)
+            if old is None or (name != old_name and name in entries):
+                return False, []
+            if name == old_name:
+                entries[name] = db_config
+            else:
+                items = [(name, db_config) if key == old_name else (key, value) for key, value in entries.items()]
+                entries.clear()
+                entries.update(items)
+            return True, [old]
+        return self._mutate(change)
+
+    def remove(self, name: str) -> bool:
+        """删除配置，不存在时返回False"""
+        def change(entries):
+            old = entries.pop(name, None)
+            if old is None:
+                return False, []
+            return True, [old]
+        return self._mutate(change)
+
+    # ---- 文件监视 ----
+
+    def _watch(self):
+        while not self._stopped.wait(self.watch_interval):
+            try:
+                if self.reload(force=False):
+                    print(f"Reloaded config from {self.path}")
+            except Exception as e:
+                print(f"Error watching config: {e}")
+
+    def close(self):
+        """停止后台检查"""
+        self._stopped.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"databases": len(self._entries), "reloads": self.reloads, "writes": self.writes,
+                "watch_interval": self.watch_interval}
+
+
+class _FileLock:
+    """配置文件所在目录上的flock：配置文件通过重命名替换，不能锁文件本身"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def __enter__(self):
+        self._fd = os.open(self.directory, os.O_RDONLY)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+        return False
+
+
+class _NullLock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+数据库连接池模块
+为每个配置的数据库维护一组可复用的MySQL连接，避免每次请求都重新进行TCP握手和认证
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+import mysql.connector
+from mysql.connector.errors import PoolError
+
+# 连接池默认参数（可在数据库配置中通过同名字段覆盖）
+DEFAULT_POOL_SIZE = 5
+DEFAULT_IDLE_TIMEOUT = 300          # 空闲连接超过该秒数后被关闭
+DEFAULT_CHECKOUT_TIMEOUT = 30       # 连接池耗尽时等待可用连接的最长秒数
+DEFAULT_HEALTH_CHECK_INTERVAL = 30  # 空闲超过该秒数的连接在借出前先ping一次
+DEFAULT_MIN_IDLE = 1                # 预热时保持的空闲连接数
+
+
+class PoolExhaustedError(PoolError):
+    """连接全部借出，在等待时间内没有可用的连接（与连接池已关闭区分）"""
+
+
+def connection_kwargs(db_config: Dict[str, Any]) -> Dict[str, Any]:
+    """根据数据库配置构建mysql.connector.connect所需的参数"""
+    kwargs = {
+        "host": db_config.get('host', 'localhost'),
+        "port": db_config.get('port', 3306),
+        "database": db_config.get('database', ''),
+        "user": db_config.get('user', ''),
+        "password": db_config.get('password', '')
+    }
+    if db_config.get('connect_timeout'):
+        kwargs["connection_timeout"] = db_config['connect_timeout']
+    return kwargs
+
+
+def pool_key(db_config: Dict[str, Any]) -> tuple:
+    """连接池的键：由配置项中决定连接身份的字段组成"""
+    return (
+        db_config.get('host', 'localhost'),
+        int(db_config.get('port', 3306)),
+        db_config.get('database', ''),
+        db_config.get('user', ''),
+        db_config.get('password', '')
+    )
+
+
+class _PoolEntry:
+    """连接池中的一个物理连接及其最后使用时间"""
+    __slots__ = ("cnx", "last_used")
+
+    def __init__(self, cnx):
+        self.cnx = cnx
+        self.last_used = time.monotonic()
+
+
+class PooledConnection:
+    """
+    借出的连接代理
+
+    除close()和is_connected()外，所有属性都委托给底层连接。
+    close()不会关闭物理连接，而是把它归还给连接池，因此原有的
+    "finally: connection.close()" 写法无需修改即可使用连接池。
+    """
+
+    def __init__(self, pool: "ConnectionPool", entry: _PoolEntry):
+        self._pool = pool
+        self._entry = entry
+        self._release_callbacks = []
+        # 与 begin_cancel 共用：取消开始之后归还的连接必须丢弃，不能被其他请求借出
+        self._lock = threading.Lock()
+        self._cancelling = False
+
+    def __getattr__(self, name):
+        entry = self.__dict__.get("_entry")
+        if entry is None:
+            raise PoolError("Connection has already been returned to the pool")
+        return getattr(entry.cnx, name)
+
+    def is_connected(self) -> bool:
+        # 借出时已经做过健康检查，这里不再向服务器发送ping
+        return self._entry is not None
+
+    def on_release(self, callback):
+        """登记归还连接之前需要执行的操作"""
+        self._release_callbacks.append(callback)
+
+    def begin_cancel(self) -> bool:
+        """
+        在其他线程中终止连接上正在执行的语句之前调用
+
+        Returns:
+            bool: 连接仍被借出时返回True，此后归还时丢弃物理连接；已归还时返回False，不能再终止
+        """
+        with self._lock:
+            if self._entry is None:
+                return False
+            self._cancelling = True
+            return True
+
+    def close(self, discard: bool = False):
+        """归还连接；discard为True时直接关闭物理连接"""
+        with self._lock:
+            entry, self._entry = self._entry, None
+            discard = discard or self._cancelling
+        if entry is not None:
+            for callback in self._release_callbacks:
+                callback()
+            self._release_callbacks = []
+            self._pool.release(entry, discard=discard)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(discard=exc_type is not None)
+
+
+class ConnectionPool:
+    """
+    单个数据库配置对应的线程安全连接池
+
+    Args:
+        connect_kwargs (dict): mysql.connector.connect 的参数
+        size (int): 最大连接数（借出 + 空闲）
+        idle_timeout (float): 空闲连接的最长保留秒数
+        checkout_timeout (float): 连接池耗尽时的最长等待秒数
+        health_check_interval (float): 空闲超过该秒数的连接在借出前先检查可用性
+    """
+
+    def __init__(self, connect_kwargs: Dict[str, Any], size: int = DEFAULT_POOL_SIZE,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 checkout_timeout: float = DEFAULT_CHECKOUT_TIMEOUT,
+                 health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL):
+        self.connect_kwargs = connect_kwargs
+        self.size = max(1, int(size))
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # 右端为最近归还的连接，左端为最旧的连接
+        self._in_use = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "creates": 0,
+            "closes": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "idle_expired": 0
+        }
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """借出一个连接，必要时新建；连接池耗尽时最多等待timeout秒"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        expired = []
+        entry = None
+        waited = False
+        wait_started = None
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("Connection pool has been closed")
+
+                self._reap_idle(expired)
+                if self._idle:
+                    entry = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use < self.size:
+                    self._in_use += 1
+                    break
+
+                # 连接池已满，等待其他请求归还连接
+                if not waited:
+                    waited = True
+                    wait_started = time.monotonic()
+                    self._stats["waits"] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    self._stats["wait_time"] += time.monotonic() - wait_started
+                    raise PoolExhaustedError(f"Timed out after {timeout}s waiting for a pooled connection")
+                self._cond.wait(remaining)
+
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["wait_time"] += time.monotonic() - wait_started
+
+        self._close_quietly(expired)
+
+        try:
+            if entry is not None and not self._is_healthy(entry):
+                self._close_quietly([entry])
+                entry = None
+            if entry is None:
+                entry = _PoolEntry(mysql.connector.connect(**self.connect_kwargs))
+                with self._cond:
+                    self._stats["creates"] += 1
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        return PooledConnection(self, entry)
+
+    def release(self, entry: _PoolEntry, discard: bool = False):
+        """归还连接：重置会话状态后放回空闲队列，无法复用时关闭"""
+        if not discard:
+            discard = not self._reset(entry.cnx)
+
+        to_close = []
+        with self._cond:
+            self._in_use -= 1
+            if discard or self._closed:
+                to_close.append(entry)
+            else:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+                self._reap_idle(to_close)
+            self._cond.notify()
+
+        self._close_quietly(to_close)
+
+    def prewarm(self, min_idle: int = DEFAULT_MIN_IDLE) -> int:
+        """
+        预先建立连接，直到空闲连接数达到min_idle（总连接数不超过连接池大小）
+
+        Returns:
+            int: 新建的连接数
+        """
+        created = 0
+        while True:
+            with self._cond:
+                if (self._closed or len(self._idle) >= min_idle
+                        or self._in_use + len(self._idle) >= self.size):
+                    return created
+                # 先占用一个名额，建立连接期间其他请求不会超出连接池大小
+                self._in_use += 1
+            try:
+                entry = _PoolEntry(mysql.connector.connect(**self.connect_kwargs))
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats["creates"] += 1
+            self.release(entry)
+            created += 1
+
+    def close(self):
+        """关闭连接池：立即关闭空闲连接，借出中的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            to_close = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        self._close_quietly(to_close)
+
+    @property
+    def in_use(self) -> int:
+        """当前借出的连接数"""
+        with self._cond:
+            return self._in_use
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取连接池统计信息"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self.size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "closed": self._closed
+            })
+        stats["wait_time"] = round(stats["wait_time"], 6)
+        return stats
+
+    def _reap_idle(self, expired: list):
+        """从空闲队列左端移除超时连接（需在持有锁时调用）"""
+        now = time.monotonic()
+        while self._idle and now - self._idle[0].last_used > self.idle_timeout:
+            expired.append(self._idle.popleft())
+            self._stats["idle_expired"] += 1
+
+    def _is_healthy(self, entry: _PoolEntry) -> bool:
+        """借出前的健康检查：仅对空闲较久的连接执行ping"""
+        if time.monotonic() - entry.last_used < self.health_check_interval:
+            return True
+        try:
+            if entry.cnx.is_connected():
+                return True
+        except Exception:
+            pass
+        with self._cond:
+            self._stats["health_check_failures"] += 1
+        return False
+
+    def _reset(self, cnx) -> bool:
+        """
+        重置会话状态，避免上一个使用者的会话泄漏给下一个使用者
+
+        COM_RESET_CONNECTION 会回滚事务，释放 LOCK TABLES 和 GET_LOCK 的锁，删除临时表，
+        清除用户变量并恢复会话变量（sql_mode、time_zone等）；当前数据库不在重置范围内，
+        之后重新选择配置的数据库（撤销 USE other_db）。服务器不支持重置（MySQL 5.7.3 之前）
+        或重置失败时返回False，由调用方丢弃连接
+        """
+        try:
+            if cnx.unread_result:
+                # 未读完的结果集只能通过读取全部剩余行来清理，代价不可控，直接丢弃连接
+                return False
+            if not cnx.cmd_reset_connection():
+                return False
+            database = self.connect_kwargs.get("database")
+            if database:
+                cnx.cmd_init_db(database)
+            return True
+        except Exception:
+            return False
+
+    def _close_quietly(self, entries):
+        for entry in entries:
+            try:
+                entry.cnx.close()
+            except Exception:
+                pass
+            with self._cond:
+                self._stats["closes"] += 1
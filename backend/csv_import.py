@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+CSV导入引擎
+提供两种导入策略：
+- executemany：参数化INSERT，由驱动改写为多行INSERT，批大小按max_allowed_packet自适应
+- load_data：LOAD DATA LOCAL INFILE，通过命名管道把CSV数据边解析边发送给服务器
+"""
+
+import bisect
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+STRATEGY_AUTO = "auto"
+STRATEGY_EXECUTEMANY = "executemany"
+STRATEGY_LOAD_DATA = "load_data"
+STRATEGIES = (STRATEGY_AUTO, STRATEGY_EXECUTEMANY, STRATEGY_LOAD_DATA)
+
+# executemany每批最多占用max_allowed_packet的比例（为SQL语法和转义留出余量）
+PACKET_USAGE = 0.5
+# 单批数据的字节数和行数上限，控制内存占用
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+MAX_BATCH_ROWS = 20000
+# 估算每个值在INSERT语句中的额外开销（引号、逗号、转义等）
+VALUE_OVERHEAD = 4
+
+# LOAD DATA写入命名管道时的缓冲行数
+LOAD_DATA_BUFFER_ROWS = 1000
+# LOAD DATA警告中的行号，如 "Data truncated for column 'v' at row 3"、"Row 3 doesn't contain data for all columns"
+_WARNING_ROW = re.compile(r"\bat row (\d+)|^Row (\d+)\b")
+
+
+class CSVImportError(Exception):
+    """导入过程中的数据错误，带有出错的行号范围"""
+
+    def __init__(self, message: str, first_row: int, last_row: int = None):
+        super().__init__(message)
+        self.first_row = first_row
+        self.last_row = first_row if last_row is None else last_row
+
+    def describe(self) -> str:
+        if self.first_row == self.last_row:
+            return f"Failed to process row {self.first_row}: {self}"
+        return f"Failed to import rows {self.first_row}-{self.last_row}: {self}"
+
+
+def resolve_targets(column_count: int, columns_info: List[str], field_mapping: dict) -> List[Tuple[int, str]]:
+    """
+    计算CSV列到数据库字段的映射
+
+    Args:
+        column_count (int): CSV列数（以标题行为准）
+        columns_info (List[str]): 表结构中的字段名（按顺序）
+        field_mapping (dict): 字段映射，格式为 {表字段名: 目标字段名}，按列位置匹配
+
+    Returns:
+        List[Tuple[int, str]]: (CSV列索引, 数据库字段名) 列表
+    """
+    targets = []
+    used = set()
+    for i in range(min(column_count, len(columns_info))):
+        db_field_name = columns_info[i]
+        if field_mapping and columns_info[i] in field_mapping:
+            # 使用用户提供的字段映射
+            db_field_name = field_mapping[columns_info[i]]
+
+        # 只保留表中存在的字段
+        if db_field_name in columns_info and db_field_name not in used:
+            targets.append((i, db_field_name))
+            used.add(db_field_name)
+    return targets
+
+
+def iter_rows(reader: Iterable[List[str]], targets: List[Tuple[int, str]]) -> Iterator[Tuple[int, tuple]]:
+    """
+    把CSV行转换为插入用的值元组，跳过空行；空字符串转为NULL
+
+    Yields:
+        Tuple[int, tuple]: (行号, 值元组)，行号从标题行之后的第一行开始计为1
+    """
+    indexes = [index for index, _ in targets]
+    for row_num, row in enumerate(reader, start=1):
+        if not row or all(cell.strip() == '' for cell in row):
+            continue  # 跳过空行
+
+        row_len = len(row)
+        values = []
+        for index in indexes:
+            value = row[index] if index < row_len else None
+            if value is None or value.strip() == '':
+                values.append(None)
+            else:
+                values.append(value)
+        yield row_num, tuple(values)
+
+
+def batch_byte_budget(max_allowed_packet: int) -> int:
+    """根据max_allowed_packet计算executemany每批允许的字节数"""
+    return max(64 * 1024, min(int(max_allowed_packet * PACKET_USAGE), MAX_BATCH_BYTES))
+
+
+def import_with_executemany(cursor, table_name: str, fields: List[str], rows: Iterable[Tuple[int, tuple]],
+                            max_allowed_packet: int) -> int:
+    """
+    使用参数化executemany批量插入
+
+    mysql.connector会把 INSERT ... VALUES (%s, ...) 的executemany改写为单条多行INSERT，
+    每批累计的数据字节数不超过按max_allowed_packet计算的上限。
+
+    Returns:
+        int: 插入的行数
+    """
+    columns_str = ', '.join([f"`{field}`" for field in fields])
+    placeholders = ', '.join(['%s'] * len(fields))
+    insert_sql = f"INSERT INTO `{table_name}` ({columns_str}) VALUES ({placeholders})"
+    byte_budget = batch_byte_budget(max_allowed_packet)
+
+    rows_inserted = 0
+    batch = []
+    batch_bytes = 0
+    first_row = None
+    last_row = None
+
+    def flush():
+        try:
+            cursor.executemany(insert_sql, batch)
+        except Exception as e:
+            raise CSVImportError(str(e), first_row, last_row)
+
+    for row_num, values in rows:
+        if not batch:
+            first_row = row_num
+        last_row = row_num
+        batch.append(values)
+        batch_bytes += sum(len(value) + VALUE_OVERHEAD if value is not None else VALUE_OVERHEAD
+                           for value in values)
+
+        # 按字节数自适应批大小
+        if batch_bytes >= byte_budget or len(batch) >= MAX_BATCH_ROWS:
+            flush()
+            rows_inserted += len(batch)
+            batch = []
+            batch_bytes = 0
+
+    # 处理最后一批数据（如果还有剩余）
+    if batch:
+        flush()
+        rows_inserted += len(batch)
+
+    return rows_inserted
+
+
+def _escape_load_data_value(value: Optional[str]) -> str:
+    """按 LOAD DATA 默认转义规则（ESCAPED BY '\\\\'）编码单个值"""
+    if value is None:
+        return '\\N'
+    return (value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+            .replace('\r', '\\r').replace('\0', '\\0'))
+
+
+def import_with_load_data(cursor, fifo_path: str, table_name: str, fields: List[str],
+                          rows: Iterable[Tuple[int, tuple]]) -> int:
+    """
+    使用 LOAD DATA LOCAL INFILE 导入
+
+    后台线程把行数据编码为制表符分隔格式写入命名管道，驱动从管道读取并流式发送给服务器，
+    整个过程不需要把文件落盘或整体加载到内存。连接需要以 allow_local_infile_in_path
+    指向管道所在目录的方式建立。
+
+    LOCAL方式下服务器把重复键、截断、类型转换等错误降级为警告并继续导入。为了与executemany的行为一致，
+    导入后检查警告和导入行数，有警告或行数不符时抛出CSVImportError，由调用方回滚事务。
+
+    Returns:
+        int: 服务器报告的导入行数
+
+    Raises:
+        CSVImportError: 数据有误，行号为警告对应的CSV行号
+    """
+    os.mkfifo(fifo_path)
+    # lines为写入管道的行数；跳过空行后管道中的行号与CSV行号不再一致，
+    # offsets只在两者的差值变化时记录 (管道行号, CSV行号 - 管道行号)
+    state = {"last_row": 0, "lines": 0, "offsets": [], "error": None}
+    stop = threading.Event()
+
+    def writer():
+        offset = 0
+        try:
+            with open(fifo_path, 'wb') as fifo:
+                buffer = []
+                for row_num, values in rows:
+                    if stop.is_set():
+                        return
+                    buffer.append('\t'.join([_escape_load_data_value(value) for value in values]) + '\n')
+                    state["last_row"] = row_num
+                    state["lines"] += 1
+                    if row_num - state["lines"] != offset:
+                        offset = row_num - state["lines"]
+                        state["offsets"].append((state["lines"], offset))
+                    if len(buffer) >= LOAD_DATA_BUFFER_ROWS:
+                        fifo.write(''.join(buffer).encode('utf-8'))
+                        buffer = []
+                if buffer:
+                    fifo.write(''.join(buffer).encode('utf-8'))
+        except BrokenPipeError:
+            # 服务器提前终止读取（通常是LOAD DATA执行出错），由主线程报告错误
+            pass
+        except Exception as e:
+            state["error"] = e
+
+    thread = threading.Thread(target=writer, name="csv-load-data-writer", daemon=True)
+    thread.start()
+
+    columns_str = ', '.join([f"`{field}`" for field in fields])
+    load_sql = (
+        f"LOAD DATA LOCAL INFILE %s INTO TABLE `{table_name}` CHARACTER SET utf8mb4 "
+        "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+        f"({columns_str})"
+    )
+    try:
+        cursor.execute(load_sql, (fifo_path,))
+        imported = cursor.rowcount
+    finally:
+        stop.set()
+        while thread.is_alive():
+            # 服务器未读取管道就返回时，反复以非阻塞方式打开读端，让阻塞在open上的写线程退出
+            try:
+                os.close(os.open(fifo_path, os.O_RDONLY | os.O_NONBLOCK))
+            except OSError:
+                pass
+            thread.join(0.1)
+
+    if state["error"] is not None:
+        raise CSVImportError(str(state["error"]), state["last_row"] + 1)
+    _check_load_data_result(cursor, imported, state)
+    return imported
+
+
+def _check_load_data_result(cursor, imported: int, state: Dict[str, Any]):
+    """LOAD DATA产生警告或导入行数与发送行数不符时抛出CSVImportError"""
+    if cursor.warning_count:
+        cursor.execute("SHOW WARNINGS")
+        warnings = [row for row in cursor.fetchall() if row[0] != "Note"]
+        if warnings:
+            level, code, message = warnings[0][:3]
+            match = _WARNING_ROW.search(message)
+            if match:
+                row_num = _csv_row_num(int(match.group(1) or match.group(2)), state["offsets"])
+                raise CSVImportError(message, row_num)
+            # 重复键等警告不包含行号
+            raise CSVImportError(message, 1, state["last_row"])
+    if imported != state["lines"]:
+        raise CSVImportError(f"Imported {imported} of {state['lines']} rows", 1, state["last_row"])
+
+
+def _csv_row_num(line: int, offsets: List[Tuple[int, int]]) -> int:
+    """把LOAD DATA中的行号换算为CSV行号"""
+    index = bisect.bisect_right(offsets, (line, float("inf"))) - 1
+    return line + offsets[index][1] if index >= 0 else line
+
+
+def load_data_supported(local_infile) -> bool:
+    """判断是否可以使用 LOAD DATA LOCAL INFILE：服务器开启local_infile且系统支持命名管道"""
+    return hasattr(os, "mkfifo") and str(local_infile) in ("1", "ON")
+
+
+def choose_strategy(requested: str, local_infile) -> str:
+    """根据请求的策略和服务器能力确定实际使用的导入策略"""
+    if requested == STRATEGY_AUTO:
+        return STRATEGY_LOAD_DATA if load_data_supported(local_infile) else STRATEGY_EXECUTEMANY
+    return requested
+
+
+class LoadDataPipe:
+    """LOAD DATA使用的临时命名管道目录，退出时清理"""
+
+    def __init__(self):
+        self.directory = None
+        self.path = None
+
+    def __enter__(self):
+        self.directory = tempfile.mkdtemp(prefix="csv-import-")
+        self.path = os.path.join(self.directory, "data.fifo")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def import_stats(strategy: str, rows_imported: int, started: float) -> Dict[str, Any]:
+    """构建导入结果中的统计信息"""
+    elapsed = max(time.monotonic() - started, 1e-6)
+    return {
+        "strategy": strategy,
+        "rows_imported": rows_imported,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(rows_imported / elapsed, 1)
+    }
@@ -1,87 +1,468 @@
-import json
-import os
 import csv
+import threading
+import time
 import mysql.connector
 from mysql.connector import Error
-from typing import List, Dict, Any
+from mysql.connector.errors import PoolError
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 import sql_util
+from connection_pool import (ConnectionPool, PooledConnection, PoolExhaustedError, connection_kwargs, pool_key,
+                             DEFAULT_POOL_SIZE, DEFAULT_IDLE_TIMEOUT, DEFAULT_CHECKOUT_TIMEOUT, DEFAULT_MIN_IDLE)
+from result_stream import ResultStream, DatabaseExportProgress, DEFAULT_CHUNK_SIZE
+import export_encoder
+import csv_import
+import batch_executor
+import schema_introspection
+from table_index import TableIndex
+import keyset_pagination
+from metadata_cache import MetadataCache, DEFAULT_TTL, DEFAULT_MAX_ENTRIES
+import result_cache
+from result_cache import ResultCache
+import replica_set
+from replica_set import ReplicaSet
+import archive_export
+from archive_export import ArchiveExport
+import result_encoding
+import metrics
+import request_executor
+import config_store
+import bulk_register
+from instance_discovery import InstanceDiscovery
+from health_monitor import DatabaseBusyError
+from config_store import ConfigStore
+import slow_query_log
+from slow_query_log import SlowQueryLog
+
+
+# 测试连接时的连接超时（秒），不响应的主机不会让请求一直等待
+TEST_CONNECT_TIMEOUT = 5
 
 
 class DatabaseManager:
-    def __init__(self, config_path: str = "./config.json"):
+    def __init__(self, config_path: str = "./config.json", metadata_ttl: float = DEFAULT_TTL,
+                 metadata_max_entries: int = DEFAULT_MAX_ENTRIES,
+                 slow_queries: Optional[SlowQueryLog] = None,
+                 config_watch_interval: float = config_store.DEFAULT_WATCH_INTERVAL):
         self.config_path = config_path
-        self.load_config()
-    
+        # 每个数据库配置对应一个连接池，键为 connection_pool.pool_key(db_config)
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+        # 配置了只读副本的数据库对应的副本集合，键同样为主库的 pool_key(db_config)
+        self._replica_sets = {}
+        # 表名、表结构等元数据的缓存，执行DDL后失效
+        self._metadata = MetadataCache(metadata_ttl, metadata_max_entries)
+        # 只读查询结果的缓存，只对配置了result_cache的数据库生效，写操作后按表失效
+        self._results = ResultCache()
+        # 执行SQL和自定义SQL导出中超过阈值的语句记录在这里，为None时不记录
+        self.slow_queries = slow_queries
+        # 多实例数据库发现，结果按实例缓存
+        self._discovery = InstanceDiscovery()
+        # AI生成SQL时用于筛选相关表的索引，键为 pool_key(db_config)
+        self._table_indexes = {}
+        self._table_indexes_lock = threading.Lock()
+        # 同一配置文件的所有 DatabaseManager 共享一个配置存储，任何一个修改配置或文件被外部修改后，
+        # 各自清理失效配置的连接池和缓存
+        self._config = ConfigStore.shared(config_path, config_watch_interval)
+        self._config.subscribe(self._on_config_change)
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """与 config.json 结构相同的配置快照"""
+        return self._config.as_dict()
+
     def load_config(self):
-        """从JSON文件加载数据库配置"""
-        try:
-            if os.path.exists(self.config_path):
-                with open(self.config_path, 'r') as f:
-                    self.config = json.load(f)
-            else:
-                self.config = {"databases": []}
-        except Exception as e:
-            print(f"Error loading config: {e}")
-            self.config = {"databases": []}
-    
+        """从JSON文件重新加载数据库配置"""
+        self._config.reload()
+
     def save_config(self):
         """保存数据库配置到JSON文件"""
         try:
-            with open(self.config_path, 'w') as f:
-                json.dump(self.config, f, indent=2)
+            self._config.save()
         except Exception as e:
             print(f"Error saving config: {e}")
-    
+
+    def _on_config_change(self, stale: List[Dict[str, Any]]):
+        """配置被删除或修改后，旧配置的连接池中的连接和缓存的元数据、查询结果已不再适用"""
+        for db in stale:
+            self._close_pool(db)
+            self._metadata.invalidate(pool_key(db))
+            self._results.invalidate(pool_key(db))
+            with self._table_indexes_lock:
+                self._table_indexes.pop(pool_key(db), None)
+
     def add_database(self, db_config: Dict[str, Any]) -> bool:
-        """添加数据库连接配置"""
-        # 检查是否已存在相同名称的数据库
-        for db in self.config["databases"]:
-            if db.get("name") == db_config.get("name"):
-                return False
-        
-        self.config["databases"].append(db_config)
-        self.save_config()
-        return True
-    
+        """添加数据库连接配置，名称已存在时返回False"""
+        try:
+            return self._config.add(db_config)
+        except Exception as e:
+            print(f"Error saving config: {e}")
+            return False
+
+    def add_databases(self, entries: List[Any], workers: int = bulk_register.DEFAULT_WORKERS,
+                      per_host: int = bulk_register.DEFAULT_PER_HOST) -> List[Dict[str, Any]]:
+        """
+        批量添加数据库连接配置
+
+        每个条目先在本地校验，再并行创建数据库并测试连接，验证成功的条目一次性写入配置文件。
+
+        Args:
+            entries (List[Any]): 数据库连接配置列表
+            workers (int): 同时验证的条目数
+            per_host (int): 同一实例上同时验证的条目数
+
+        Returns:
+            List[Dict[str, Any]]: 与entries顺序相同的结果，包含 name、success，失败时包含 error，
+                成功时 created 表示数据库是否为本次新建
+        """
+        seen = set()
+        results = []
+        valid = []
+        for entry in entries:
+            result = {"name": entry.get('name') if isinstance(entry, dict) else None}
+            error = bulk_register.validate_entry(entry, lambda name: self.get_database(name) is not None, seen)
+            if error:
+                result.update(success=False, error=error)
+            else:
+                valid.append((result, entry))
+            results.append(result)
+
+        # 请求超时后客户端已经得到504：停止验证剩余的条目，也不再保存配置
+        cancelled = threading.Event()
+        unregister = request_executor.on_cancel(cancelled.set)
+        try:
+            outcomes = bulk_register.verify_all([entry for _, entry in valid], self._create_and_verify,
+                                                workers, per_host, cancelled)
+        finally:
+            unregister()
+        verified = []
+        for (result, entry), outcome in zip(valid, outcomes):
+            result.update(outcome)
+            if outcome["success"]:
+                verified.append((result, entry))
+        if cancelled.is_set():
+            for result, _ in verified:
+                result.update(success=False, error="Request cancelled")
+            return results
+
+        # 验证期间可能有其他请求添加了同名配置，这些条目不会覆盖已有的配置
+        error = "Database with this name already exists"
+        try:
+            saved = self._config.add_many([entry for _, entry in verified])
+        except Exception as e:
+            print(f"Error saving config: {e}")
+            saved = [False] * len(verified)
+            error = f"Failed to save config: {e}"
+        for (result, _), ok in zip(verified, saved):
+            if not ok:
+                result.update(success=False, error=error)
+        return results
+
     def remove_database(self, name: str) -> bool:
         """删除数据库连接配置"""
-        for i, db in enumerate(self.config["databases"]):
-            if db.get("name") == name:
-                del self.config["databases"][i]
-                self.save_config()
-                return True
-        return False
-    
+        try:
+            return self._config.remove(name)
+        except Exception as e:
+            print(f"Error saving config: {e}")
+            return False
+
     def update_database(self, old_name: str, new_db_config: Dict[str, Any]) -> bool:
-        """更新数据库连接配置"""
-        for i, db in enumerate(self.config["databases"]):
-            if db.get("name") == old_name:
-                self.config["databases"][i] = new_db_config
-                self.save_config()
-                return True
-        return False
-    
+        """更新数据库连接配置，新名称与其他配置重复时返回False"""
+        try:
+            return self._config.update(old_name, new_db_config)
+        except Exception as e:
+            print(f"Error saving config: {e}")
+            return False
+
     def list_databases(self) -> List[Dict[str, Any]]:
         """列出所有数据库连接配置"""
-        return self.config["databases"]
-    
+        return self._config.list()
+
     def get_database(self, name: str) -> Dict[str, Any]:
         """获取特定的数据库连接配置"""
-        for db in self.config["databases"]:
-            if db.get("name") == name:
-                return db
-        return None
+        return self._config.get(name)
     
+    def _get_pool(self, db_config: Dict[str, Any]) -> ConnectionPool:
+        """获取（必要时创建）数据库配置对应的连接池"""
+        key = pool_key(db_config)
+        with self._pools_lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(
+                    connection_kwargs(db_config),
+                    size=db_config.get('pool_size', DEFAULT_POOL_SIZE),
+                    idle_timeout=db_config.get('pool_idle_timeout', DEFAULT_IDLE_TIMEOUT),
+                    checkout_timeout=db_config.get('pool_checkout_timeout', DEFAULT_CHECKOUT_TIMEOUT)
+                )
+                self._pools[key] = pool
+            return pool
+
+    def _get_connection(self, db_config: Dict[str, Any], read_only: bool = False) -> PooledConnection:
+        """从连接池借出连接，调用close()即归还；read_only为True时可以使用只读副本"""
+        if read_only:
+            return self._acquire_read(db_config)[0]
+        with metrics.DB_CONNECT_SECONDS.time(db_config.get('name', '')):
+            connection = self._get_pool(db_config).acquire()
+        return self._bind_request(connection, db_config)
+
+    def _bind_request(self, connection: PooledConnection, server_config: Dict[str, Any],
+                      read_only: bool = False) -> PooledConnection:
+        """
+        把借出的连接与当前请求（request_executor）关联：请求超时后对连接上正在执行的语句发送KILL QUERY，
+        使连接和执行器的名额尽快释放。只读连接还把会话的 max_execution_time 设置为请求的剩余时间，
+        由服务器自行终止超时的SELECT（会话状态在连接归还时重置）。不在执行器中执行时不做任何处理
+        """
+        remaining = request_executor.remaining_time()
+        if remaining is None:
+            return connection
+        connection.on_release(self._kill_on_cancel(server_config, connection.connection_id,
+                                                   connection.begin_cancel))
+        if read_only:
+            try:
+                cursor = connection.cursor()
+                cursor.execute(f"SET SESSION max_execution_time = {max(1, int(remaining * 1000))}")
+                cursor.close()
+            except Error as e:
+                # MariaDB等不支持该变量的服务器只依赖KILL QUERY
+                print(f"Error setting max_execution_time: {e}")
+        return connection
+
+    def _kill_on_cancel(self, server_config: Dict[str, Any], connection_id: int,
+                        begin_cancel: Callable[[], bool] = None) -> Callable[[], None]:
+        """
+        请求超时后对指定连接上正在执行的语句发送KILL QUERY
+
+        取消在其他线程中执行，执行时连接可能已经归还。连接池中的连接通过 begin_cancel
+        确认仍被本请求借出（并在归还时丢弃），避免终止其他请求在同一连接上执行的语句
+
+        Returns:
+            Callable[[], None]: 取消登记的函数，连接归还或关闭之前调用
+        """
+        if request_executor.remaining_time() is None:
+            return lambda: None
+
+        def cancel():
+            if begin_cancel is None or begin_cancel():
+                self._kill_query(server_config, connection_id)
+        return request_executor.on_cancel(cancel)
+
+    def _get_replica_set(self, db_config: Dict[str, Any]) -> Optional[ReplicaSet]:
+        """获取（必要时创建）数据库配置的只读副本集合，未配置副本时返回None"""
+        if not db_config.get('replicas'):
+            return None
+        key = pool_key(db_config)
+        with self._pools_lock:
+            replicas = self._replica_sets.get(key)
+            if replicas is None:
+                replicas = ReplicaSet(
+                    replica_set.replica_configs(db_config),
+                    strategy=db_config.get('replica_strategy', replica_set.ROUND_ROBIN),
+                    retry_interval=db_config.get('replica_retry_interval', replica_set.DEFAULT_RETRY_INTERVAL),
+                    sticky_seconds=db_config.get('replica_sticky_seconds', replica_set.DEFAULT_STICKY_SECONDS)
+                )
+                self._replica_sets[key] = replicas
+            return replicas
+
+    def _acquire_read(self, db_config: Dict[str, Any]) -> Tuple[PooledConnection, Dict[str, Any]]:
+        """
+        为只读操作借出连接
+
+        配置了只读副本时按 replica_strategy 依次尝试副本，无法连接的副本被标记为不可用；
+        没有可用的副本时回退到主库
+
+        Returns:
+            Tuple[PooledConnection, Dict[str, Any]]: (连接, 实际连接的服务器配置)
+        """
+        # 包括尝试不可用副本的时间
+        connection, server_config = None, db_config
+        with metrics.DB_CONNECT_SECONDS.time(db_config.get('name', '')):
+            replicas = self._get_replica_set(db_config)
+            if replicas is not None:
+                for index in replicas.candidates(lambda i: self._get_pool(replicas.configs[i]).in_use):
+                    config = replicas.configs[index]
+                    try:
+                        connection = self._get_pool(config).acquire()
+                    except PoolError:
+                        # 连接池耗尽或已关闭，副本本身可用，尝试下一个
+                        continue
+                    except Error as e:
+                        print(f"Replica {config.get('host')}:{config.get('port', 3306)} unavailable: {e}")
+                        replicas.mark_failed(index, e)
+                        continue
+                    replicas.mark_ok(index)
+                    server_config = config
+                    break
+                else:
+                    replicas.note_primary_read()
+            if connection is None:
+                connection = self._get_pool(db_config).acquire()
+        return self._bind_request(connection, server_config, read_only=True), server_config
+
+    def _close_pool(self, db_config: Dict[str, Any]):
+        """关闭并移除数据库配置对应的连接池（包括只读副本的连接池）"""
+        with self._pools_lock:
+            pools = [self._pools.pop(pool_key(db_config), None)]
+            replicas = self._replica_sets.pop(pool_key(db_config), None)
+            if replicas is not None:
+                pools.extend(self._pools.pop(pool_key(config), None) for config in replicas.configs)
+        for pool in pools:
+            if pool:
+                pool.close()
+
+    def get_replica_status(self, name: str) -> Dict[str, Any]:
+        """获取数据库只读副本的健康状态、读操作分配情况和连接池统计"""
+        db_config = self.get_database(name)
+        if not db_config:
+            return {"success": False, "error": "Database not found"}
+        replicas = self._get_replica_set(db_config)
+        if replicas is None:
+            return {"success": True, "data": {"strategy": None, "replicas": [], "primary_reads": 0}}
+
+        status = replicas.get_stats()
+        with self._pools_lock:
+            for config, replica in zip(replicas.configs, status["replicas"]):
+                pool = self._pools.get(pool_key(config))
+                replica["pool"] = pool.get_stats() if pool else None
+        return {"success": True, "data": status}
+
+    def get_pool_stats(self, name: str = None) -> Dict[str, Any]:
+        """获取连接池统计信息，未指定name时返回所有已配置数据库的统计"""
+        databases = self.list_databases() if name is None else [self.get_database(name)]
+        stats = {}
+        with self._pools_lock:
+            for db in databases:
+                if not db:
+                    continue
+                pool = self._pools.get(pool_key(db))
+                stats[db.get("name")] = pool.get_stats() if pool else None
+        return stats
+
+    def _invalidate_metadata(self, db_config: Dict[str, Any], table_names: List[str]):
+        """
+        使DDL修改过的元数据缓存失效
+
+        Args:
+            db_config (Dict[str, Any]): 数据库配置
+            table_names (List[str]): sql_util.ddl_table_names 的结果，为None时不做处理，
+                为空列表时使整个数据库的缓存失效
+        """
+        if table_names is None:
+            return
+        if not table_names:
+            self._metadata.invalidate(pool_key(db_config))
+        for table_name in table_names:
+            self._metadata.invalidate(pool_key(db_config), table_name)
+
+    @staticmethod
+    def _tracking_ddl(sql_statements: Iterable[str], ddl_tables: list):
+        """逐条传递语句，同时记录DDL修改的表，执行结束后由调用方统一使缓存失效"""
+        for sql_statement in sql_statements:
+            table_names = sql_util.ddl_table_names(sql_statement)
+            if table_names is not None:
+                ddl_tables.append(table_names)
+            yield sql_statement
+
+    def _invalidate_results(self, db_config: Dict[str, Any], sql_statement: str = None,
+                            table_names: List[str] = None):
+        """
+        写操作后使缓存的查询结果失效
+
+        Args:
+            db_config (Dict[str, Any]): 数据库配置
+            sql_statement (str): 执行的写操作，按其中涉及的表使结果失效；为空或无法解析时使整个数据库的结果失效
+            table_names (List[str]): 已知被修改的表，提供时不解析sql_statement
+        """
+        # 写入后的一段时间内读操作走主库，避免从副本读到复制延迟之前的数据
+        replicas = self._get_replica_set(db_config)
+        if replicas is not None:
+            replicas.note_write()
+
+        db_key = pool_key(db_config)
+        table_names = list(table_names or [])
+        # 没有缓存的结果时不需要解析SQL，整库失效即可（同时让正在执行的查询不写入缓存）
+        if not table_names and sql_statement and self._results.has_entries(db_key):
+            table_names = sql_util.extract_table_names(sql_statement)
+        self._results.invalidate(db_key, table_names or None)
+
+    def _result_dependencies(self, db_config: Dict[str, Any], tables: Tuple[str, ...]) -> Optional[Tuple[str, ...]]:
+        """
+        缓存查询结果时记录的表：查询引用的表加上其中视图依赖的表
+
+        Returns:
+            Optional[Tuple[str, ...]]: 无法确定视图的依赖（服务器不支持 VIEW_TABLE_USAGE 或读取失败）时为None，
+                此时不缓存结果
+        """
+        views = self._get_views(db_config)
+        if views is None:
+            return None
+        return result_cache.expand_views(tables, views)
+
+    def _get_views(self, db_config: Dict[str, Any]) -> Optional[Dict[str, Optional[Tuple[str, ...]]]]:
+        """
+        数据库中的视图及其直接引用的表和视图（小写，带缓存，执行DDL后失效）
+
+        information_schema.VIEW_TABLE_USAGE 从 MySQL 8.0.13 开始提供，更早的版本中视图的依赖记为None
+
+        Returns:
+            Optional[Dict]: 视图名 -> 引用的表名元组或None；读取失败时返回None
+        """
+        hit, views = self._metadata.get(pool_key(db_config), "views")
+        if hit:
+            return views
+
+        connection = None
+        try:
+            connection = self._get_connection(db_config, read_only=True)
+            cursor = connection.cursor()
+            database = db_config.get('database', '')
+            cursor.execute("SELECT TABLE_NAME FROM information_schema.VIEWS WHERE TABLE_SCHEMA = %s", (database,))
+            views = {str(row[0]).lower(): None for row in cursor.fetchall()}
+            if views:
+                try:
+                    cursor.execute("SELECT VIEW_NAME, TABLE_NAME FROM information_schema.VIEW_TABLE_USAGE "
+                                   "WHERE VIEW_SCHEMA = %s", (database,))
+                    usage = cursor.fetchall()
+                except Error as e:
+                    print(f"View dependencies unavailable, views will not be cached: {e}")
+                else:
+                    dependencies = {name: [] for name in views}
+                    for view_name, table_name in usage:
+                        dependencies.setdefault(str(view_name).lower(), []).append(str(table_name).lower())
+                    views = {name: tuple(tables) for name, tables in dependencies.items()}
+            cursor.close()
+            self._metadata.put(pool_key(db_config), "views", views)
+            return views
+        except Error as e:
+            print(f"Error getting views: {e}")
+            return None
+        finally:
+            if connection and connection.is_connected():
+                try:
+                    connection.close()
+                except Exception as e2:
+                    print(f"Error closing connection: {e2}")
+
+    def get_result_cache_stats(self) -> Dict[str, Any]:
+        """获取查询结果缓存统计信息"""
+        return self._results.get_stats()
+
+    def refresh_metadata(self, name: str, table_name: str = None) -> Dict[str, Any]:
+        """手动使数据库（或指定表）的元数据缓存失效，下次请求时重新从服务器读取"""
+        db_config = self.get_database(name)
+        if not db_config:
+            return {"success": False, "error": "Database not found"}
+        invalidated = self._metadata.invalidate(pool_key(db_config), table_name)
+        return {"success": True, "invalidated": invalidated}
+
+    def get_metadata_cache_stats(self) -> Dict[str, Any]:
+        """获取元数据缓存统计信息"""
+        return self._metadata.get_stats()
+
     def test_connection(self, db_config: Dict[str, Any]) -> bool:
-        """测试数据库连接"""
+        """测试数据库连接，未配置connect_timeout时最多等待TEST_CONNECT_TIMEOUT秒"""
         try:
-            connection = mysql.connector.connect(
-                host=db_config.get('host', 'localhost'),
-                port=db_config.get('port', 3306),
-                database=db_config.get('database', ''),
-                user=db_config.get('user', ''),
-                password=db_config.get('password', '')
-            )
+            kwargs = connection_kwargs(db_config)
+            kwargs.setdefault("connection_timeout", TEST_CONNECT_TIMEOUT)
+            connection = mysql.connector.connect(**kwargs)
             if connection.is_connected():
                 connection.close()
                 return True
@@ -90,6 +471,58 @@ class DatabaseManager:
             return False
         return False
 
+    def probe_database(self, db_config: Dict[str, Any]) -> float:
+        """
+        通过连接池探测数据库是否可用，并预先建立 pool_min_idle 个空闲连接
+
+        连接池的连接已全部借出时不等待空闲连接，抛出 health_monitor.DatabaseBusyError（可能是正在使用中，
+        也可能是所有连接都卡在无响应的服务器上）。无法连接或连接池已关闭时抛出异常
+
+        Returns:
+            float: 借出连接并执行 SELECT 1 的耗时（秒）
+        """
+        pool = self._get_pool(db_config)
+        started = time.perf_counter()
+        try:
+            connection = pool.acquire(timeout=0)
+        except PoolExhaustedError:
+            raise DatabaseBusyError(f"All {pool.size} pooled connections are in use")
+        with connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+        latency = time.perf_counter() - started
+        pool.prewarm(db_config.get('pool_min_idle', DEFAULT_MIN_IDLE))
+        return latency
+
+    def _create_and_verify(self, db_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        在一个连接上完成 create_database 和 test_connection 的工作：数据库不存在时创建，
+        再切换到该数据库确认可以访问。失败时抛出异常
+
+        Returns:
+            Dict[str, Any]: {"created": 数据库是否为本次新建}
+        """
+        kwargs = connection_kwargs(db_config)
+        database_name = kwargs.pop("database")
+        kwargs.setdefault("connection_timeout", bulk_register.DEFAULT_CONNECT_TIMEOUT)
+        connection = mysql.connector.connect(**kwargs)
+        try:
+            cursor = connection.cursor()
+            # 库名中的 _ 和 % 在LIKE中是通配符
+            pattern = database_name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            cursor.execute("SHOW DATABASES LIKE %s", (pattern,))
+            created = cursor.fetchone() is None
+            quoted = database_name.replace('`', '``')
+            if created:
+                cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{quoted}`")
+            cursor.execute(f"USE `{quoted}`")
+            cursor.close()
+        finally:
+            connection.close()
+        return {"created": created}
+
     def create_database(self, db_config: Dict[str, Any]) -> bool:
         """测试数据库连接"""
         try:
@@ -120,21 +553,20 @@ class DatabaseManager:
         except Exception as e:
             return False
     
+    @metrics.instrument()
     def get_tables(self, db_name: str) -> List[str]:
         """获取数据库中的所有表名"""
         db_config = self.get_database(db_name)
         if not db_config:
             return []
+
+        hit, tables = self._metadata.get(pool_key(db_config), "tables")
+        if hit:
+            return tables
         
         connection = None
         try:
-            connection = mysql.connector.connect(
-                host=db_config.get('host', 'localhost'),
-                port=db_config.get('port', 3306),
-                database=db_config.get('database', ''),
-                user=db_config.get('user', ''),
-                password=db_config.get('password', '')
-            )
+            connection = self._get_connection(db_config, read_only=True)
             
             if not connection.is_connected():
                 return []
@@ -144,6 +576,7 @@ class DatabaseManager:
             tables = [table[0] for table in cursor.fetchall()]
             cursor.close()
             
+            self._metadata.put(pool_key(db_config), "tables", tables)
             return tables
             
         except Error as e:
@@ -156,21 +589,20 @@ class DatabaseManager:
                 except Exception as e2:
                     print(f"Error closing connection: {e2}")
     
+    @metrics.instrument()
     def get_table_structure(self, db_name: str, table_name: str) -> List[Dict[str, Any]]:
         """获取表结构信息"""
         db_config = self.get_database(db_name)
         if not db_config:
             return []
+
+        hit, structure = self._metadata.get(pool_key(db_config), "structure", table_name)
+        if hit:
+            return structure
         
         connection = None
         try:
-            connection = mysql.connector.connect(
-                host=db_config.get('host', 'localhost'),
-                port=db_config.get('port', 3306),
-                database=db_config.get('database', ''),
-                user=db_config.get('user', ''),
-                password=db_config.get('password', '')
-            )
+            connection = self._get_connection(db_config, read_only=True)
             
             if not connection.is_connected():
                 return []
@@ -192,6 +624,7 @@ class DatabaseManager:
                     "Extra": column[5]
                 })
             
+            self._metadata.put(pool_key(db_config), "structure", structure, table_name)
             return structure
             
         except Error as e:
@@ -204,21 +637,20 @@ class DatabaseManager:
                 except Exception as e2:
                     print(f"Error closing connection: {e2}")
     
+    @metrics.instrument()
     def get_table_info(self, db_name: str, table_name: str) -> Dict[str, Any]:
         """获取表的完整信息，包括建表语句和索引"""
         db_config = self.get_database(db_name)
         if not db_config:
             return {}
+
+        hit, table_info = self._metadata.get(pool_key(db_config), "info", table_name)
+        if hit:
+            return table_info
         
         connection = None
         try:
-            connection = mysql.connector.connect(
-                host=db_config.get('host', 'localhost'),
-                port=db_config.get('port', 3306),
-                database=db_config.get('database', ''),
-                user=db_config.get('user', ''),
-                password=db_config.get('password', '')
-            )
+            connection = self._get_connection(db_config, read_only=True)
             
             if not connection.is_connected():
                 return {}
@@ -256,10 +688,12 @@ class DatabaseManager:
             cursor.close()
             
             # 返回完整的表信息
-            return {
+            table_info = {
                 "create_table_sql": create_table_sql,
                 "indexes": index_list
             }
+            self._metadata.put(pool_key(db_config), "info", table_info, table_name)
+            return table_info
             
         except Error as e:
             print(f"Error getting table info: {e}")
@@ -271,100 +705,173 @@ class DatabaseManager:
                 except Exception as e2:
                     print(f"Error closing connection: {e2}")
     
-    def get_all_tables_structure(self, db_name: str) -> Dict[str, Any]:
-        """获取数据库中所有表的结构信息"""
+    @metrics.instrument()
+    def get_all_tables_structure(self, db_name: str, include_ddl: bool = True,
+                                 table_names: List[str] = None) -> Dict[str, Any]:
+        """
+        获取数据库中所有表的结构信息
+
+        表结构和索引通过 information_schema 的几条集合查询一次取得，建表语句只为
+        实际返回的表按需读取
+
+        Args:
+            db_name (str): 数据库名称
+            include_ddl (bool): 是否包含建表语句（create_table_sql）
+            table_names (List[str]): 只返回这些表，为空时返回全部表
+
+        Returns:
+            Dict[str, Any]: {"success": True, "data": {表名: {"structure", "create_table_sql", "indexes", "foreign_keys"}}}
+        """
         db_config = self.get_database(db_name)
         if not db_config:
             return {"success": False, "error": "Database not found"}
-        
+
+        schema, error = self._get_schema(db_config)
+        if error:
+            return {"success": False, "error": error}
+
+        if table_names is not None:
+            schema = {name: schema[name] for name in table_names if name in schema}
+
+        ddl, ddl_errors = {}, {}
+        if include_ddl:
+            ddl_result = self.get_tables_ddl(db_name, list(schema))
+            if not ddl_result["success"]:
+                return ddl_result
+            ddl, ddl_errors = ddl_result["data"], ddl_result["errors"]
+
+        all_tables_structure = {}
+        for table_name, table in schema.items():
+            if table_name in ddl_errors:
+                # 即使某个表出错，也继续处理其他表
+                all_tables_structure[table_name] = {"error": ddl_errors[table_name]}
+                continue
+            info = {"structure": table["structure"]}
+            if include_ddl:
+                info["create_table_sql"] = ddl.get(table_name, "")
+            info["indexes"] = table["indexes"]
+            info["foreign_keys"] = table["foreign_keys"]
+            all_tables_structure[table_name] = info
+
+        return {"success": True, "data": all_tables_structure}
+
+    def _get_schema(self, db_config: Dict[str, Any]) -> Tuple[Optional[Dict[str, Dict[str, Any]]], Optional[str]]:
+        """
+        读取数据库的 schema_introspection.introspect 结果（带缓存）
+
+        Returns:
+            Tuple: (表结构, 错误信息)，成功时错误信息为None
+        """
+        hit, schema = self._metadata.get(pool_key(db_config), "schema")
+        if hit:
+            return schema, None
+
         connection = None
         try:
-            connection = mysql.connector.connect(
-                host=db_config.get('host', 'localhost'),
-                port=db_config.get('port', 3306),
-                database=db_config.get('database', ''),
-                user=db_config.get('user', ''),
-                password=db_config.get('password', '')
-            )
-            
+            connection = self._get_connection(db_config, read_only=True)
+
             if not connection.is_connected():
-                return {"success": False, "error": "Database connection failed"}
-            
-            # 获取所有表名
+                return None, "Database connection failed"
+
             cursor = connection.cursor()
-            cursor.execute("SHOW TABLES")
-            tables = [table[0] for table in cursor.fetchall()]
+            schema = schema_introspection.introspect(cursor, db_config.get('database', ''))
             cursor.close()
-            
-            # 为每个表获取结构信息
-            all_tables_structure = {}
-            for table_name in tables:
+            self._metadata.put(pool_key(db_config), "schema", schema)
+            return schema, None
+
+        except Error as e:
+            print(f"Error getting all tables structure: {e}")
+            return None, str(e)
+        finally:
+            if connection and connection.is_connected():
+                try:
+                    connection.close()
+                except Exception as e2:
+                    print(f"Error closing connection: {e2}")
+
+    @metrics.instrument()
+    def rank_tables(self, db_name: str, question: str, limit: int = 10) -> Dict[str, Any]:
+        """
+        在本地按相关度筛选与问题有关的表（BM25，索引表名、表注释、字段名和字段注释）
+
+        索引由缓存的表结构建立；表结构缓存失效并重新读取后，只重新索引内容变化的表
+
+        Args:
+            db_name (str): 数据库名称
+            question (str): 自然语言问题
+            limit (int): 最多返回的表数
+
+        Returns:
+            Dict[str, Any]: {"success": True, "data": [{"table", "score", "comment", "structure"}]}，按得分从高到低排列
+        """
+        db_config = self.get_database(db_name)
+        if not db_config:
+            return {"success": False, "error": "Database not found"}
+
+        schema, error = self._get_schema(db_config)
+        if error:
+            return {"success": False, "error": error}
+
+        with self._table_indexes_lock:
+            index = self._table_indexes.get(pool_key(db_config))
+            if index is None:
+                index = self._table_indexes[pool_key(db_config)] = TableIndex()
+        index.sync(schema)
+
+        return {"success": True, "data": [
+            {"table": table_name, "score": score, "comment": schema[table_name].get("comment", ""),
+             "structure": schema[table_name]["structure"]}
+            for table_name, score in index.search(question, limit) if table_name in schema
+        ]}
+
+    @metrics.instrument()
+    def get_tables_ddl(self, db_name: str, table_names: List[str]) -> Dict[str, Any]:
+        """
+        获取指定表的建表语句，结果按表缓存
+
+        Returns:
+            Dict[str, Any]: {"success": True, "data": {表名: 建表语句}, "errors": {读取失败的表名: 错误信息}}
+        """
+        db_config = self.get_database(db_name)
+        if not db_config:
+            return {"success": False, "error": "Database not found"}
+
+        ddl, errors = {}, {}
+        missing = []
+        for table_name in table_names:
+            hit, create_table_sql = self._metadata.get(pool_key(db_config), "ddl", table_name)
+            if hit:
+                ddl[table_name] = create_table_sql
+            else:
+                missing.append(table_name)
+        if not missing:
+            return {"success": True, "data": ddl, "errors": errors}
+
+        connection = None
+        try:
+            connection = self._get_connection(db_config, read_only=True)
+
+            if not connection.is_connected():
+                return {"success": False, "error": "Database connection failed"}
+
+            cursor = connection.cursor()
+            for table_name in missing:
                 try:
-                    cursor = connection.cursor()
-                    cursor.execute(f"DESCRIBE `{table_name}`")
-                    columns = cursor.fetchall()
-                    cursor.close()
-                    
-                    # 转换为字典列表
-                    structure = []
-                    for column in columns:
-                        structure.append({
-                            "Field": column[0],
-                            "Type": column[1],
-                            "Null": column[2],
-                            "Key": column[3],
-                            "Default": column[4],
-                            "Extra": column[5]
-                        })
-                    
-                    # 获取表的完整信息
-                    cursor = connection.cursor()
                     cursor.execute(f"SHOW CREATE TABLE `{table_name}`")
                     create_table_result = cursor.fetchone()
-                    create_table_sql = create_table_result[1] if create_table_result else ""
-                    cursor.close()
-                    
-                    # 获取索引信息
-                    cursor = connection.cursor()
-                    cursor.execute(f"SHOW INDEX FROM `{table_name}`")
-                    indexes = cursor.fetchall()
-                    cursor.close()
-                    
-                    # 处理索引数据
-                    index_list = []
-                    for index in indexes:
-                        index_info = {
-                            "Table": index[0],
-                            "Non_unique": index[1], 
-                            "Key_name": index[2],
-                            "Seq_in_index": index[3],
-                            "Column_name": index[4],
-                            "Collation": index[5],
-                            "Cardinality": index[6],
-                            "Sub_part": index[7],
-                            "Packed": index[8],
-                            "Null": index[9],
-                            "Index_type": index[10],
-                            "Comment": index[11]
-                        }
-                        index_list.append(index_info)
-                    
-                    all_tables_structure[table_name] = {
-                        "structure": structure,
-                        "create_table_sql": create_table_sql,
-                        "indexes": index_list
-                    }
                 except Error as e:
                     print(f"Error getting info for table {table_name}: {e}")
-                    # 即使某个表出错，也继续处理其他表
-                    all_tables_structure[table_name] = {
-                        "error": str(e)
-                    }
-            
-            return {"success": True, "data": all_tables_structure}
-            
+                    errors[table_name] = str(e)
+                    continue
+                create_table_sql = create_table_result[1] if create_table_result else ""
+                ddl[table_name] = create_table_sql
+                self._metadata.put(pool_key(db_config), "ddl", create_table_sql, table_name)
+            cursor.close()
+
+            return {"success": True, "data": ddl, "errors": errors}
+
         except Error as e:
-            print(f"Error getting all tables structure: {e}")
+            print(f"Error getting tables DDL: {e}")
             return {"success": False, "error": str(e)}
         finally:
             if connection and connection.is_connected():
@@ -372,73 +879,175 @@ class DatabaseManager:
                     connection.close()
                 except Exception as e2:
                     print(f"Error closing connection: {e2}")
-    
-    def execute_sql(self, db_name: str, sql_statement: str) -> Dict[str, Any]:
-        """执行SQL语句"""
+
+    @metrics.instrument(rows=("returned", "row_count"))
+    def browse_table(self, db_name: str, table_name: str, sort: str = None,
+                     page_size: int = keyset_pagination.DEFAULT_PAGE_SIZE, token: str = None) -> Dict[str, Any]:
+        """
+        按键集（Seek）方式分页浏览表数据
+
+        以主键或非空唯一索引作为排序的最终依据，用上一页最后一行的排序值作为查询条件，
+        不使用OFFSET，任意页的查询代价都与第一页相同
+
+        Args:
+            db_name (str): 数据库名称
+            table_name (str): 表名
+            sort (str): 排序方式，例如 "created_at:desc,name"；提供token时使用令牌中的排序方式
+            page_size (int): 每页行数
+            token (str): 上一页返回的续页令牌，为空时返回第一页
+
+        Returns:
+            Dict[str, Any]: 包含columns、rows、next_token（没有下一页时为None）
+        """
         db_config = self.get_database(db_name)
         if not db_config:
             return {"success": False, "error": "Database not found"}
+
+        structure = self.get_table_structure(db_name, table_name)
+        if not structure:
+            return {"success": False, "error": f"Cannot get structure for table {table_name}"}
+        columns = [column["Field"] for column in structure]
+
+        key_columns = keyset_pagination.choose_key_columns(structure,
+                                                           self.get_table_info(db_name, table_name).get("indexes", []))
+        if not key_columns:
+            return {"success": False,
+                    "error": f"Table {table_name} has no primary key or NOT NULL unique index for keyset pagination"}
+
+        page_size = max(1, min(int(page_size), keyset_pagination.MAX_PAGE_SIZE))
+        try:
+            if token:
+                order, last_values = keyset_pagination.decode_token(token, table_name)
+                order = keyset_pagination.build_order(order, columns, key_columns)
+                if len(order) != len(last_values):
+                    raise keyset_pagination.PaginationError("Invalid continuation token")
+            else:
+                order = keyset_pagination.build_order(keyset_pagination.parse_sort(sort), columns, key_columns)
+                last_values = None
+        except keyset_pagination.PaginationError as e:
+            return {"success": False, "error": str(e)}
+
+        sql, params = keyset_pagination.build_page_query(table_name, columns, order, last_values, page_size)
+
+        connection = None
+        try:
+            connection = self._get_connection(db_config, read_only=True)
+
+            if not connection.is_connected():
+                return {"success": False, "error": "Database connection failed"}
+
+            cursor = connection.cursor()
+            cursor.execute(sql, tuple(params))
+            rows = cursor.fetchall()
+            cursor.close()
+
+            next_token = None
+            if len(rows) > page_size:
+                rows = rows[:page_size]
+                positions = [columns.index(column) for column, _ in order]
+                next_token = keyset_pagination.encode_token(table_name, order,
+                                                            [rows[-1][i] for i in positions])
+
+            return {
+                "success": True,
+                "columns": columns,
+                "rows": rows,
+                "row_count": len(rows),
+                "key_columns": key_columns,
+                "sort": [{"column": column, "direction": direction} for column, direction in order],
+                "next_token": next_token
+            }
+
+        except Error as e:
+            print(f"Error browsing table: {e}")
+            return {"success": False, "error": str(e)}
+        finally:
+            if connection and connection.is_connected():
+                try:
+                    connection.close()
+                except Exception as e2:
+                    print(f"Error closing connection: {e2}")
+
+    @metrics.instrument(rows=("returned", "row_count"))
+    def execute_sql(self, db_name: str, sql_statement: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        执行SQL语句
+
+        数据库配置开启result_cache时，确定性的只读查询结果会被缓存，返回结果中的cache字段
+        说明本次是否命中缓存；use_cache为False时跳过缓存直接查询
+        """
+        db_config = self.get_database(db_name)
+        if not db_config:
+            return {"success": False, "error": "Database not found"}
+
+        # 语句类型、涉及的表、能否缓存等信息都来自同一次（带缓存的）解析
+        analysis = sql_util.analyze_sql(sql_statement)
+        cacheable = None
+        if use_cache and db_config.get('result_cache'):
+            cacheable = analysis.cache_key
+            if cacheable:
+                hit, cached, age = self._results.get(pool_key(db_config), cacheable[0])
+                if hit:
+                    return dict(cached, cache={"status": "hit", "age_seconds": round(age, 3)})
+                generation = self._results.generation(pool_key(db_config))
+                cache_tables = self._result_dependencies(db_config, cacheable[1])
+                if cache_tables is None:
+                    cacheable = None
         
+        is_read = analysis.read_only
         connection = None
         try:
-            connection = mysql.connector.connect(
-                host=db_config.get('host', 'localhost'),
-                port=db_config.get('port', 3306),
-                database=db_config.get('database', ''),
-                user=db_config.get('user', ''),
-                password=db_config.get('password', '')
-            )
+            connection = self._get_connection(db_config, read_only=analysis.read_only)
             
             if not connection.is_connected():
                 return {"success": False, "error": "Database connection failed"}
             
             cursor = connection.cursor()
             
-            # 分析SQL语句类型
-            sql_upper = sql_statement.strip().upper()
-            
-            if sql_upper.startswith("SELECT") or sql_upper.startswith("SHOW"):
-                cursor.execute(sql_statement)
-                results = cursor.fetchall()
+            started = time.perf_counter()
+            if analysis.returns_rows and not analysis.multi_statement:
+                with metrics.DB_EXECUTE_SECONDS.time(db_name):
+                    cursor.execute(sql_statement)
+                with metrics.DB_FETCH_SECONDS.time(db_name):
+                    results = cursor.fetchall()
+                self._record_slow_query(db_config, sql_statement, started, len(results), "execute_sql")
                 print(cursor.description)
 
-                # 获取列名
+                # 获取列名和列类型
                 columns = [desc[0] for desc in cursor.description]
+                types = result_encoding.column_types(cursor.description)
                 cursor.close()
-                return {
+                result = {
                     "success": True,
                     "type": "SELECT",
                     "columns": columns,
+                    "column_types": types,
                     "results": results,
                     "row_count": len(results)
                 }
-            elif sql_upper.startswith("WITH"):
-                cursor.execute(sql_statement)
-                try:
-                    results = cursor.fetchall()
-                except Error as e:
-                    connection.commit()
-                    affected_rows = cursor.rowcount
-                    cursor.close()
-                    # 不要在这里关闭连接，因为后续代码可能需要使用它
-                    # connection.close() 
-                    return {
-                        "success": True,
-                        "type": sql_upper.split()[0],
-                        "affected_rows": affected_rows
-                    }
+                if cacheable:
+                    self._results.put(pool_key(db_config), cacheable[0], result,
+                                      result_cache.estimate_size(columns, results), cache_tables,
+                                      db_config.get('result_cache_ttl', result_cache.DEFAULT_TTL), generation)
+                return dict(result, cache={"status": "miss" if cacheable else "bypass"})
             else:
-                # 非SELECT语句
+                # 非查询语句或多条语句；其中返回结果集的语句（如CALL）读取并丢弃结果，影响行数记为0
                 affected_rows_list = []
-                for result in cursor.execute(sql_statement, multi=True):
-                    affected_rows_list.append(result.rowcount)
-                connection.commit()
+                with metrics.DB_EXECUTE_SECONDS.time(db_name):
+                    for result in cursor.execute(sql_statement, multi=True):
+                        if result.with_rows:
+                            result.fetchall()
+                            affected_rows_list.append(0)
+                        else:
+                            affected_rows_list.append(result.rowcount)
+                    connection.commit()
+                self._record_slow_query(db_config, sql_statement, started, sum(affected_rows_list), "execute_sql")
 
                 cursor.close()
 
                 return {
                     "success": True,
-                    "type": sql_upper.split()[0],
+                    "type": analysis.kind,
                     "affected_rows": affected_rows_list
                 }
                 
@@ -454,66 +1063,161 @@ class DatabaseManager:
                 "error": str(e)
             }
         finally:
+            # DDL会隐式提交，即使执行出错也可能已经生效
+            self._invalidate_metadata(db_config, analysis.ddl_tables)
+            if not is_read:
+                self._invalidate_results(db_config, sql_statement)
             if connection and connection.is_connected():
                 try:
                     connection.close()
                 except Exception as e2:
                     print(f"Error closing connection: {e2}")
     
-    def get_instance_databases(self, db_config: Dict[str, Any]) -> Dict[str, Any]:
-        """获取指定数据库实例中的所有数据库列表"""
+    @metrics.instrument()
+    def stream_sql(self, db_name: str, sql_statement: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+        """
+        使用非缓冲游标流式执行查询语句
+
+        Args:
+            db_name (str): 数据库名称
+            sql_statement (str): 返回结果集的单条SQL语句（SELECT/SHOW/DESCRIBE/EXPLAIN等）
+            chunk_size (int): 每次fetchmany读取的行数
+
+        Returns:
+            Dict[str, Any]: 成功时 "stream" 为 ResultStream，调用方必须迭代完或调用其 close()
+        """
+        db_config = self.get_database(db_name)
+        if not db_config:
+            return {"success": False, "error": "Database not found"}
+
+        if not sql_util.returns_rows(sql_statement):
+            return {"success": False, "error": "Streaming mode only supports statements that return rows"}
+
+        result = self._open_result_stream(db_config, sql_statement, chunk_size)
+        if not result["success"]:
+            print(f"Error streaming SQL: {result['error']}")
+            return {"success": False, "error": result["error"]}
+        if result["stream"] is None:
+            return {"success": False, "error": "Streaming mode only supports statements that return rows"}
+
+        return {"success": True, "stream": result["stream"]}
+
+    def _open_result_stream(self, db_config: Dict[str, Any], sql_statement: str,
+                            chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            with_packet_size: bool = False, slow_query_source: str = None) -> Dict[str, Any]:
+        """
+        在非缓冲游标上执行SQL语句，只读语句可以在只读副本上执行
+
+        Args:
+            with_packet_size (bool): 为True时先读取服务器的max_allowed_packet（导出INSERT SQL时使用）
+            slow_query_source (str): 不为None时按该来源记录慢查询；返回结果集的语句在结果流关闭时记录，
+                耗时包括调用方读取结果的时间
+
+        Returns:
+            Dict[str, Any]: 返回结果集的语句 "stream" 为 ResultStream；
+                否则 "stream" 为None，"affected_rows" 为影响的行数（连接已归还）。
+                with_packet_size为True时 "max_allowed_packet" 为服务器的设置
+        """
         connection = None
         try:
-            # 连接到MySQL服务器（不指定具体数据库）
-            connection = mysql.connector.connect(
-                host=db_config.get('host', 'localhost'),
-                port=db_config.get('port', 3306),
-                user=db_config.get('user', ''),
-                password=db_config.get('password', '')
-            )
-            
-            if not connection.is_connected():
-                return {"success": False, "error": "Database connection failed"}
-            
+            if sql_util.analyze_sql(sql_statement).read_only:
+                connection, server_config = self._acquire_read(db_config)
+            else:
+                connection, server_config = self._get_connection(db_config), db_config
+            max_allowed_packet = None
+            if with_packet_size:
+                cursor = connection.cursor()
+                cursor.execute("SELECT @@max_allowed_packet")
+                max_allowed_packet = int(cursor.fetchone()[0])
+                cursor.close()
+            cursor = connection.cursor(buffered=False)
+            database = db_config.get('name', '')
+            started = time.perf_counter()
+            with metrics.DB_EXECUTE_SECONDS.time(database):
+                cursor.execute(sql_statement)
+
+            if not cursor.description:
+                affected_rows = cursor.rowcount
+                cursor.close()
+                connection.close()
+                if slow_query_source:
+                    self._record_slow_query(db_config, sql_statement, started, affected_rows, slow_query_source)
+                return {"success": True, "stream": None, "affected_rows": affected_rows}
+
+            on_close = None
+            if slow_query_source:
+                on_close = lambda stream: self._record_slow_query(db_config, sql_statement, started,
+                                                                  stream.row_count, slow_query_source)
+            stream = ResultStream(connection, cursor, chunk_size,
+                                  cancel=lambda connection_id: self._kill_query(server_config, connection_id),
+                                  on_fetch=lambda seconds: metrics.DB_FETCH_SECONDS.observe(database,
+                                                                                            value=seconds),
+                                  on_close=on_close)
+            return {"success": True, "stream": stream, "max_allowed_packet": max_allowed_packet}
+
+        except Error as e:
+            if connection:
+                connection.close(discard=True)
+            return {"success": False, "error": str(e)}
+
+    def _record_slow_query(self, db_config: Dict[str, Any], sql_statement: str, started: float,
+                           rows: Optional[int], source: str):
+        """耗时超过阈值时记录慢查询，EXPLAIN由慢查询日志的后台线程执行"""
+        if self.slow_queries is None:
+            return
+        explain = None
+        if slow_query_log.explainable(sql_statement):
+            explain = lambda: self._explain(db_config, sql_statement)
+        self.slow_queries.record(db_config.get('name', ''), sql_statement, time.perf_counter() - started,
+                                 rows, source, explain)
+
+    def _explain(self, db_config: Dict[str, Any], sql_statement: str) -> str:
+        """执行 EXPLAIN FORMAT=JSON 并返回执行计划（JSON文本），只读语句在只读副本上执行"""
+        if sql_util.analyze_sql(sql_statement).read_only:
+            connection, _ = self._acquire_read(db_config)
+        else:
+            connection = self._get_connection(db_config)
+        with connection:
             cursor = connection.cursor()
-            # 获取所有数据库列表
-            cursor.execute("SHOW DATABASES")
-            databases = [db[0] for db in cursor.fetchall()]
-            
-            # 排除系统数据库（可选）
-            system_databases = ['information_schema', 'performance_schema', 
-                              'mysql', 'sys']
-            user_databases = [db for db in databases if db not in system_databases]
-            
+            cursor.execute(f"EXPLAIN FORMAT=JSON {sql_statement}")
+            plan = cursor.fetchone()[0]
+            cursor.close()
+        return plan
+
+    @staticmethod
+    def _closing(content, stream: ResultStream):
+        """包装导出内容迭代器：无论正常结束还是提前关闭，都会关闭底层结果流"""
+        try:
+            yield from content
+        finally:
+            stream.close()
+
+    def _kill_query(self, db_config: Dict[str, Any], connection_id: int):
+        """通过独立连接终止指定连接上正在执行的查询"""
+        connection = None
+        try:
+            # 不使用连接池：连接池耗尽时也必须能够终止查询
+            connection = mysql.connector.connect(**connection_kwargs(db_config))
+            cursor = connection.cursor()
+            cursor.execute(f"KILL QUERY {int(connection_id)}")
             cursor.close()
-            
-            return {
-                "success": True,
-                "data": user_databases
-            }
-            
         except Error as e:
-            print(f"Error getting instance databases: {e}")
-            return {"success": False, "error": str(e)}
+            print(f"Error killing query {connection_id}: {e}")
         finally:
-            if connection and connection.is_connected():
+            if connection:
                 try:
                     connection.close()
-                except Exception as e2:
-                    print(f"Error closing connection: {e2}")
-    
-    def export_table_data(self, db_name: str, table_name: str, format_type: str = "insert_sql") -> Dict[str, Any]:
-        """导出指定表的数据为INSERT SQL或CSV格式"""
-        db_config = self.get_database(db_name)
-        if not db_config:
-            return {"success": False, "error": "Database not found"}
-        
+                except Exception:
+                    pass
+
+    def get_instance_databases(self, db_config: Dict[str, Any]) -> Dict[str, Any]:
+        """获取指定数据库实例中的所有数据库列表"""
         connection = None
         try:
+            # 连接到MySQL服务器（不指定具体数据库）
             connection = mysql.connector.connect(
                 host=db_config.get('host', 'localhost'),
                 port=db_config.get('port', 3306),
-                database=db_config.get('database', ''),
                 user=db_config.get('user', ''),
                 password=db_config.get('password', '')
             )
@@ -522,88 +1226,25 @@ class DatabaseManager:
                 return {"success": False, "error": "Database connection failed"}
             
             cursor = connection.cursor()
-            
-            # 获取表结构
-            cursor.execute(f"DESCRIBE `{table_name}`")
-            columns = cursor.fetchall()
-            
-            # 构建列名列表，用于CSV导出和INSERT语句的字段部分
-            column_names = [column[0] for column in columns]
-            
-            # 获取所有数据行
-            cursor.execute(f"SELECT * FROM `{table_name}`")
-            rows = cursor.fetchall()
-            
-            if format_type == "csv":
-                # 生成CSV格式内容
-                output_lines = []
-                
-                # 添加CSV头
-                output_lines.append(','.join([f'"{col}"' for col in column_names]))
-                
-                # 处理每一行数据
-                for row in rows:
-                    csv_row = []
-                    for value in row:
-                        if value is None:
-                            csv_row.append('')
-                        elif isinstance(value, str):
-                            # 对字符串进行转义处理，如果包含引号或逗号需要加引号
-                            escaped_value = value.replace('"', '""')
-                            csv_row.append(f'"{escaped_value}"')
-                        else:
-                            csv_row.append(str(value))
-                    output_lines.append(','.join(csv_row))
-                
-                result_content = '\n'.join(output_lines)
-            elif format_type == "insert_sql":
-                # 生成INSERT SQL格式内容
-                output_lines = []
-                
-                # 添加文件头注释
-                output_lines.append("-- MySQL dump")
-                output_lines.append(f"-- Table: {table_name}")
-                output_lines.append("")
-                
-                for row in rows:
-                    # 构建插入语句的值部分，注意数据类型的处理
-                    values_list = []
-                    for i, value in enumerate(row):
-                        column_name = column_names[i]
-                        
-                        if value is None:
-                            values_list.append('NULL')
-                        elif isinstance(value, str):
-                            # 对字符串进行转义和引号处理
-                            escaped_value = value.replace('\\', '\\\\').replace("'", "\\'")
-                            values_list.append(f"'{escaped_value}'")
-                        elif isinstance(value, (int, float)):
-                            values_list.append(str(value))
-                        else:
-                            # 其他类型转换为字符串并用引号包围
-                            values_list.append(f"'{str(value)}'")
-                    
-                    # 构建INSERT语句
-                    columns_str = ', '.join([f'`{col}`' for col in column_names])
-                    values_str = ', '.join(values_list)
-                    insert_sql = f"INSERT INTO `{table_name}` ({columns_str}) VALUES ({values_str});"
-                    output_lines.append(insert_sql)
-                
-                result_content = '\n'.join(output_lines)
-            else:
-                return {"success": False, "error": f"Unsupported format type: {format_type}"}
+            # 获取所有数据库列表
+            cursor.execute("SHOW DATABASES")
+            databases = [db[0] for db in cursor.fetchall()]
+            
+            # 排除系统数据库（可选）
+            system_databases = ['information_schema', 'performance_schema', 
+                              'mysql', 'sys']
+            user_databases = [db for db in databases if db not in system_databases]
             
             cursor.close()
             
             return {
                 "success": True,
-                "content": result_content,
-                "format": format_type
+                "data": user_databases
             }
             
         except Error as e:
-            print(f"Error exporting table data: {e}")
-            return {"success": False, "error": f"Failed to export data: {str(e)}"}
+            print(f"Error getting instance databases: {e}")
+            return {"success": False, "error": str(e)}
         finally:
             if connection and connection.is_connected():
                 try:
@@ -611,71 +1252,251 @@ class DatabaseManager:
                 except Exception as e2:
                     print(f"Error closing connection: {e2}")
     
+    def discover_instances(self, instances: List[Dict[str, Any]],
+                           use_cache: bool = True) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        并行获取多个实例上的数据库列表、表数量和数据大小，按实例完成的先后顺序返回
+
+        Args:
+            instances (List[Dict[str, Any]]): 实例参数（host、port、user、password）
+            use_cache (bool): 为False时忽略缓存重新查询
+
+        Returns:
+            Iterator[Tuple[int, Dict[str, Any]]]: 同 InstanceDiscovery.discover
+        """
+        return self._discovery.discover(instances, use_cache)
+
+    def get_discovery_cache_stats(self) -> Dict[str, Any]:
+        """获取实例发现结果缓存的统计信息"""
+        return self._discovery.get_stats()
+
+    @metrics.instrument()
+    def export_table_data(self, db_name: str, table_name: str, format_type: str = "insert_sql") -> Dict[str, Any]:
+        """
+        导出指定表的数据为INSERT SQL或CSV格式
+
+        导出内容以迭代器形式按块生成，内存占用与表的大小无关。
+
+        Returns:
+            Dict[str, Any]: 成功时 "content" 为导出文本块的迭代器，"stream" 为底层 ResultStream
+        """
+        if format_type not in ("csv", "insert_sql"):
+            return {"success": False, "error": f"Unsupported format type: {format_type}"}
+
+        db_config = self.get_database(db_name)
+        if not db_config:
+            return {"success": False, "error": "Database not found"}
+        
+        result = self._open_result_stream(db_config, f"SELECT * FROM `{table_name}`",
+                                          with_packet_size=format_type == "insert_sql")
+        if not result["success"]:
+            print(f"Error exporting table data: {result['error']}")
+            return {"success": False, "error": f"Failed to export data: {result['error']}"}
+
+        stream = result["stream"]
+        if format_type == "csv":
+            content = export_encoder.encode_csv(stream.description, stream)
+        else:
+            header_lines = ["-- MySQL dump", f"-- Table: {table_name}", ""]
+            content = export_encoder.encode_insert_sql(table_name, stream.description, stream, header_lines,
+                                                       result["max_allowed_packet"])
+
+        return {
+            "success": True,
+            "content": self._closing(content, stream),
+            "stream": stream,
+            "format": format_type
+        }
+    
+    @metrics.instrument()
     def export_database_data(self, db_name: str, format_type: str = "insert_sql") -> Dict[str, Any]:
-        """导出数据库中所有表的数据为INSERT SQL或CSV格式"""
+        """
+        导出数据库中所有表的数据为INSERT SQL或CSV格式（逐表流式生成）
+
+        Returns:
+            Dict[str, Any]: 成功时 "content" 为导出文本块的迭代器，
+                "stream" 为 DatabaseExportProgress，row_count 为所有表累计已读取的行数
+        """
+        if format_type not in ("csv", "insert_sql"):
+            return {"success": False, "error": f"Unsupported format type: {format_type}"}
+
         # 获取数据库中的所有表
         tables = self.get_tables(db_name)
         
         if not tables:
             return {"success": False, "error": "No tables found in database"}
-        
-        results = []
-        
-        for table_name in tables:
-            # 导出每个表的数据
-            export_result = self.export_table_data(db_name, table_name, format_type)
-            
-            if export_result["success"]:
-                results.append({
-                    "table": table_name,
-                    "content": export_result["content"]
-                })
-            else:
-                return {"success": False, "error": f"Failed to export table {table_name}: {export_result['error']}"}
-        
-        # 根据格式类型组合所有内容
-        if format_type == "csv":
-            # CSV导出时，将所有表的数据合并为一个大的CSV文件（每张表之间用空行分隔）
-            output_lines = []
-            for result in results:
-                output_lines.append(f"-- Table: {result['table']}")
-                output_lines.append(result["content"])
-                output_lines.append("")  # 空行分隔不同表
-            combined_content = '\n'.join(output_lines)
-        elif format_type == "insert_sql":
-            # INSERT SQL导出时，将所有表的内容合并为一个文件
-            output_lines = []
-            output_lines.append("-- MySQL dump of all tables")
-            for result in results:
-                output_lines.append(f"-- Table: {result['table']}")
-                output_lines.append(result["content"])
-                output_lines.append("")  # 空行分隔不同表
-            combined_content = '\n'.join(output_lines)
-        else:
-            return {"success": False, "error": f"Unsupported format type: {format_type}"}
-        
+
+        progress = DatabaseExportProgress()
+
+        def generate():
+            # INSERT SQL导出时，将所有表的内容合并为一个文件；CSV导出时每张表之间用空行分隔
+            separator = ""
+            if format_type == "insert_sql":
+                yield "-- MySQL dump of all tables"
+                separator = "\n"
+
+            for table_name in tables:
+                # 逐个表导出，同一时间只占用一个连接
+                export_result = self.export_table_data(db_name, table_name, format_type)
+                if not export_result["success"]:
+                    yield f"{separator}-- Failed to export table {table_name}: {export_result['error']}\n"
+                    return
+
+                yield f"{separator}-- Table: {table_name}\n"
+                progress.current = export_result["stream"]
+                try:
+                    yield from export_result["content"]
+                finally:
+                    progress.finish_table()
+                yield "\n"
+                separator = "\n"
+
         return {
             "success": True,
-            "content": combined_content,
+            "content": generate(),
+            "stream": progress,
             "format": format_type,
             "tables_count": len(tables)
             }
     
+    @metrics.instrument()
+    def export_database_archive(self, db_name: str, format_type: str = "insert_sql", archive_format: str = "zip",
+                                table_names: List[str] = None, workers: int = archive_export.DEFAULT_WORKERS,
+                                consistent: bool = True) -> Dict[str, Any]:
+        """
+        并行导出数据库中所有表（或指定表）的数据，打包为zip或tar流
+
+        consistent为True时所有表在同一个一致性快照中导出：由独立连接短暂执行
+        FLUSH TABLES WITH READ LOCK，期间各工作连接开启 START TRANSACTION WITH CONSISTENT SNAPSHOT，
+        随后立即释放全局读锁；没有RELOAD权限或等待锁超时时退化为单个连接在一个快照中依次导出。
+        consistent为False时各表并行导出，每张表自身一致。配置了只读副本时所有工作连接使用同一个副本。
+
+        Args:
+            db_name (str): 数据库名称
+            format_type (str): 每张表的文件格式，csv 或 insert_sql
+            archive_format (str): zip、tar 或 tar.gz
+            table_names (List[str]): 只导出这些表，为空时导出全部表
+            workers (int): 最多并行导出的连接数，不超过连接池大小
+            consistent (bool): 是否要求所有表来自同一个快照
+
+        Returns:
+            Dict[str, Any]: 成功时 "export" 为 ArchiveExport，迭代得到归档的字节块；
+                调用方提前结束读取时需要调用 export.close()
+        """
+        if format_type not in archive_export.FILE_EXTENSIONS:
+            return {"success": False, "error": f"Unsupported format type: {format_type}"}
+        if archive_format not in archive_export.ARCHIVE_FORMATS:
+            return {"success": False, "error": f"Unsupported archive format: {archive_format}"}
+
+        db_config = self.get_database(db_name)
+        if not db_config:
+            return {"success": False, "error": "Database not found"}
+
+        tables = self.get_tables(db_name)
+        if table_names:
+            unknown = [table for table in table_names if table not in tables]
+            if unknown:
+                return {"success": False, "error": f"Tables not found: {', '.join(unknown)}"}
+            tables = list(dict.fromkeys(table_names))
+        if not tables:
+            return {"success": False, "error": "No tables found in database"}
+
+        connections = []
+        try:
+            connection, server_config = self._acquire_read(db_config)
+            connections.append(connection)
+            cursor = connection.cursor()
+            tables = archive_export.order_by_size(cursor, db_config.get('database', ''), tables)
+            cursor.close()
+
+            # 其余工作连接只使用连接池中立即可用的名额，不等待其他请求归还
+            pool = self._get_pool(server_config)
+            count = max(1, min(int(workers), archive_export.MAX_WORKERS, pool.size, len(tables)))
+            while len(connections) < count:
+                try:
+                    connections.append(pool.acquire(timeout=0))
+                except Error:
+                    break
+
+            if not consistent:
+                snapshot = archive_export.SNAPSHOT_PER_TABLE
+            elif len(connections) > 1 and self._start_shared_snapshot(server_config, connections):
+                snapshot = archive_export.SNAPSHOT_SHARED
+            else:
+                for extra in connections[1:]:
+                    extra.close()
+                del connections[1:]
+                cursor = connection.cursor()
+                archive_export.start_snapshot(cursor)
+                cursor.close()
+                snapshot = archive_export.SNAPSHOT_SINGLE
+
+        except Error as e:
+            for connection in connections:
+                connection.close(discard=True)
+            print(f"Error starting database export: {e}")
+            return {"success": False, "error": str(e)}
+
+        export = ArchiveExport(
+            connections, tables, format_type, archive_format,
+            release=lambda connection, discard: connection.close(discard=discard),
+            cancel_query=lambda connection_id: self._kill_query(server_config, connection_id),
+            snapshot=snapshot
+        )
+        return {"success": True, "export": export, "tables_count": len(tables), "snapshot": snapshot}
+
+    def _start_shared_snapshot(self, server_config: Dict[str, Any], connections: List[PooledConnection]) -> bool:
+        """
+        让多个连接共享同一个一致性快照
+
+        在独立连接上持有全局读锁期间依次开启各连接的快照事务，此时没有任何写入，
+        各快照看到的数据完全相同。全局读锁会阻塞写操作，因此限制等待时间并在快照开启后立即释放
+
+        Returns:
+            bool: 是否成功；失败（通常是没有RELOAD权限或等待锁超时）时各连接都没有开启事务
+        """
+        coordinator = None
+        try:
+            # 不使用连接池：持有全局读锁的连接不能再交给其他请求
+            coordinator = mysql.connector.connect(**connection_kwargs(server_config))
+            cursor = coordinator.cursor()
+            cursor.execute(f"SET SESSION lock_wait_timeout = {int(archive_export.SNAPSHOT_LOCK_TIMEOUT)}")
+            cursor.execute("FLUSH TABLES WITH READ LOCK")
+            try:
+                for connection in connections:
+                    snapshot_cursor = connection.cursor()
+                    archive_export.start_snapshot(snapshot_cursor)
+                    snapshot_cursor.close()
+            finally:
+                cursor.execute("UNLOCK TABLES")
+            cursor.close()
+            return True
+        except Error as e:
+            print(f"Shared export snapshot unavailable, exporting from a single snapshot: {e}")
+            for connection in connections:
+                self._rollback_quietly(connection)
+            return False
+        finally:
+            if coordinator:
+                try:
+                    coordinator.close()
+                except Exception:
+                    pass
+
+    @metrics.instrument()
     def get_tables_info(self, db_name: str) -> Dict[str, Any]:
         """获取数据库中所有表的名称和描述信息"""
         db_config = self.get_database(db_name)
         if not db_config:
             return {"columns": [], "tables": []}
+
+        hit, tables_info = self._metadata.get(pool_key(db_config), "tables_info")
+        if hit:
+            return tables_info
         
         connection = None
         try:
-            connection = mysql.connector.connect(
-                host=db_config.get('host', 'localhost'),
-                port=db_config.get('port', 3306),
-                database=db_config.get('database', ''),
-                user=db_config.get('user', ''),
-                password=db_config.get('password', '')
-            )
+            connection = self._get_connection(db_config, read_only=True)
             
             if not connection.is_connected():
                 return {"columns": [], "tables": []}
@@ -694,10 +1515,12 @@ class DatabaseManager:
             
             cursor.close()
             # 返回指定格式
-            return {
+            tables_info = {
                 "columns": columns,
                 "tables": results
             }
+            self._metadata.put(pool_key(db_config), "tables_info", tables_info)
+            return tables_info
             
         except Error as e:
             print(f"Error getting tables info: {e}")
@@ -709,7 +1532,9 @@ class DatabaseManager:
                 except Exception as e2:
                     pass
 
-    def import_csv_to_table(self, db_name: str, table_name: str, reader, field_mapping: dict = {}) -> Dict[str, Any]:
+    @metrics.instrument(rows=("imported", "rows_imported"))
+    def import_csv_to_table(self, db_name: str, table_name: str, reader, field_mapping: dict = {},
+                            strategy: str = csv_import.STRATEGY_AUTO) -> Dict[str, Any]:
         """
         从CSV reader导入数据到指定表（支持批量处理和事务控制）
         
@@ -717,169 +1542,105 @@ class DatabaseManager:
             db_name (str): 数据库名称
             table_name (str): 目标表名
             reader: CSV reader对象
-            field_mapping (dict): 字段映射，格式为 {csv_column_index: db_field_name}
+            field_mapping (dict): 字段映射，格式为 {表字段名: 目标字段名}
+            strategy (str): 导入策略，auto/executemany/load_data；auto时服务器开启
+                local_infile则使用LOAD DATA LOCAL INFILE，否则使用参数化executemany
             
         Returns:
-            Dict[str, Any]: 导入结果信息
+            Dict[str, Any]: 导入结果信息，包括使用的策略和每秒导入行数
         """
+        if strategy not in csv_import.STRATEGIES:
+            return {"success": False, "error": f"Unsupported import strategy: {strategy}"}
+
         db_config = self.get_database(db_name)
         if not db_config:
             return {"success": False, "error": "Database configuration not found"}
         
+        # 获取表结构信息
+        table_structure = self.get_table_structure(db_name, table_name)
+        if not table_structure:
+            return {"success": False, "error": f"Cannot get structure for table {table_name}"}
+        
+        columns_info = [col['Field'] for col in table_structure]
+
+        # 跳过标题行（如果有）
+        try:
+            header_row = next(reader)
+        except StopIteration:
+            return {"success": False, "error": "CSV file is empty"}
+
+        targets = csv_import.resolve_targets(len(header_row), columns_info, field_mapping)
+        if not targets:
+            return {"success": False, "error": "No CSV columns match the table fields"}
+        fields = [field for _, field in targets]
+        rows = csv_import.iter_rows(reader, targets)
+
         connection = None
+        started = time.monotonic()
         try:
-            connection = mysql.connector.connect(
-                host=db_config.get('host', 'localhost'),
-                port=db_config.get('port', 3306),
-                database=db_config.get('database', ''),
-                user=db_config.get('user', ''),
-                password=db_config.get('password', '')
-                , autocommit=False
-            )
-            
-            if not connection.is_connected():
-                return {"success": False, "error": "Database connection failed"}
-            
+            connection = self._get_connection(db_config)
             cursor = connection.cursor()
-            
-            # 获取表结构信息
-            table_structure = self.get_table_structure(db_name, table_name)
-            if not table_structure:
-                return {"success": False, "error": f"Cannot get structure for table {table_name}"}
-            
-            columns_info = [col['Field'] for col in table_structure]
-            
-            # 读取CSV数据并处理插入
-            rows_inserted = 0
-            batch_size = 50
-            
-            # 跳过标题行（如果有）
-            try:
-                header_row = next(reader)
-                print(f"Header row: {header_row}")
-            except StopIteration:
-                return {"success": False, "error": "CSV file is empty"}
-            
-            # 批量处理数据
-            batch_data = []
-            for row_num, row in enumerate(reader, start=1):
-                if not row or all(cell.strip() == '' for cell in row):
-                    continue  # 跳过空行
-                    
-                try:
-                    # 构建插入语句的字段和值列表
-                    insert_fields = []
-                    insert_values = []
-                    
-                    # 处理字段映射，或者使用默认映射（CSV列索引到数据库字段）
-                    for i, value in enumerate(row):
-                        db_field_name = None
-                        
-                        if field_mapping:
-                            # 使用用户提供的字段映射
-                            if columns_info[i] in field_mapping:
-                                db_field_name = field_mapping[columns_info[i]]
-                            elif i < len(columns_info):
-                                db_field_name = columns_info[i]
-                        else:
-                            # 没有提供字段映射时，自动映射（使用表结构中的列名）
-                            if i < len(columns_info):
-                                db_field_name = columns_info[i]
-                        
-                        # 如果找到了对应的数据库字段
-                        if db_field_name and db_field_name in columns_info:
-                            insert_fields.append(f"`{db_field_name}`")
-                            
-                            # 处理值的类型转换和转义
-                            if value is None or value.strip() == '':
-                                insert_values.append('NULL')
-                            else:
-                                # 对字符串进行处理
-                                if isinstance(value, str):
-                                    escaped_value = value.replace('\\', '\\\\').replace("'", "\\'")
-                                    insert_values.append(f"'{escaped_value}'")
-                                else:
-                                    insert_values.append(str(value))
-                    
-                    # 构建并执行INSERT语句
-                    if insert_fields and insert_values:
-                        batch_data.append((insert_fields, insert_values))
-                        
-                        # 如果达到批处理大小，就执行批量插入
-                        if len(batch_data) >= batch_size:
-                            self._execute_batch_insert(cursor, table_name, batch_data)
-                            rows_inserted += len(batch_data)
-                            batch_data = []  # 清空批次数据
-                    
-                except Exception as e:
-                    print(f"Error processing row {row_num}: {str(e)}")
-                    # 立即回滚事务并返回错误
-                    if connection:
-                        connection.rollback()
+            cursor.execute("SELECT @@GLOBAL.local_infile, @@max_allowed_packet")
+            local_infile, max_allowed_packet = cursor.fetchone()
+            cursor.close()
+
+            strategy = csv_import.choose_strategy(strategy, local_infile)
+            if strategy == csv_import.STRATEGY_LOAD_DATA:
+                # LOAD DATA需要开启local_infile的专用连接，不使用连接池
+                connection.close()
+                connection = None
+                with csv_import.LoadDataPipe() as pipe:
+                    connection = mysql.connector.connect(**connection_kwargs(db_config),
+                                                         allow_local_infile_in_path=pipe.directory)
+                    # 与连接池中的连接一样，请求超时后终止正在执行的LOAD DATA
+                    unregister = self._kill_on_cancel(db_config, connection.connection_id)
                     try:
-                        cursor.close()
-                    except:
-                        pass
-                    return {"success": False, "error": f"Failed to process row {row_num}: {str(e)}"}
-            
-            # 处理最后一批数据（如果还有剩余）
-            if batch_data:
-                self._execute_batch_insert(cursor, table_name, batch_data)
-                rows_inserted += len(batch_data)
-            
+                        cursor = connection.cursor()
+                        rows_inserted = csv_import.import_with_load_data(cursor, pipe.path, table_name,
+                                                                         fields, rows)
+                    finally:
+                        unregister()
+            else:
+                cursor = connection.cursor()
+                rows_inserted = csv_import.import_with_executemany(cursor, table_name, fields, rows,
+                                                                   int(max_allowed_packet))
+
             # 如果没有发生任何错误，提交事务
             connection.commit()
             cursor.close()
-            
-            return {
-                "success": True,
-                "rows_imported": rows_inserted
-            }
-            
+
+            stats = csv_import.import_stats(strategy, rows_inserted, started)
+            print(f"Imported {rows_inserted} rows into {table_name} using {strategy} "
+                  f"({stats['rows_per_second']} rows/s)")
+            return dict(success=True, **stats)
+
+        except csv_import.CSVImportError as e:
+            print(f"Error in import_csv_to_table: {e.describe()}")
+            self._rollback_quietly(connection)
+            return {"success": False, "error": e.describe()}
         except Exception as e:
             print(f"Error in import_csv_to_table: {str(e)}")
             # 确保在任何情况下都回滚并关闭连接
-            try:
-                if 'connection' in locals() and connection.is_connected():
-                    if connection:
-                        connection.rollback()
-            except:
-                pass
+            self._rollback_quietly(connection)
             return {"success": False, "error": f"Failed to import CSV data: {str(e)}"}
         finally:
+            self._invalidate_results(db_config, table_names=[table_name])
             if connection and connection.is_connected():
                 try:
                     connection.close()
                 except Exception as e2:
                     print(f"Error closing connection: {e2}")
 
-    def _execute_batch_insert(self, cursor, table_name: str, batch_data) -> None:
-        """
-        执行批量插入操作
-        
-        Args:
-            cursor: 数据库游标
-            table_name (str): 表名
-            batch_data: 包含所有待插入数据的批次列表，每个元素为 (insert_fields, insert_values)
-        """
-        # 构建多个INSERT语句（每个记录一个VALUES子句）
-        # 对于每条记录构造VALUES部分
-        values_list = []
-        for insert_fields, insert_values in batch_data:
-            fields_str = ', '.join(insert_fields)
-            values_str = ', '.join(insert_values)
-            values_list.append(f"({values_str})")
-        
-        # 构造批量INSERT语句，一次性插入多行
-        if values_list:  # 确保有数据需要插入
-            all_values_str = ', '.join(values_list)
-            fields_str = ', '.join(batch_data[0][0])  # 使用第一个记录的字段作为模板
-            insert_sql = f"INSERT INTO `{table_name}` ({fields_str}) VALUES {all_values_str}"
-            print(f"Executing batch SQL: {insert_sql}")
-            results = cursor.execute(insert_sql, multi=True)
-            for cur in results:          # 必须迭代完，驱动才会把真正 rowcount 放进 cur
-                return cur.rowcount
+    @staticmethod
+    def _rollback_quietly(connection):
+        """回滚事务，忽略连接已断开等错误"""
+        try:
+            if connection and connection.is_connected():
+                connection.rollback()
+        except Exception:
+            pass
 
+    @metrics.instrument()
     def execute_batch_sql(self, db_name: str, sql_statements: List[str]) -> Dict[str, Any]:
         """
         执行批量SQL语句（支持事务）
@@ -895,17 +1656,13 @@ class DatabaseManager:
         if not db_config:
             return {"success": False, "error": "Database not found"}
         
+        # 记录执行过的DDL修改的表，结束后使相关的元数据缓存失效
+        ddl_tables = []
+        sql_statements = self._tracking_ddl(sql_statements, ddl_tables)
         connection = None
         try:
-            # 使用autocommit=False确保事务控制
-            connection = mysql.connector.connect(
-                host=db_config.get('host', 'localhost'),
-                port=db_config.get('port', 3306),
-                database=db_config.get('database', ''),
-                user=db_config.get('user', ''),
-                password=db_config.get('password', '')
-                , autocommit=False
-            )
+            # 连接池中的连接默认autocommit=False，确保事务控制
+            connection = self._get_connection(db_config)
             
             if not connection.is_connected():
                 return {"success": False, "error": "Database connection failed"}
@@ -915,12 +1672,10 @@ class DatabaseManager:
             # 执行所有SQL语句
             affected_rows_list = []
             for sql_statement in sql_statements:
-                sql_upper = sql_statement.strip().upper()
-                
-                if sql_upper.startswith("SELECT"):
+                if sql_util.returns_rows(sql_statement):
                     cursor.execute(sql_statement)
                     results = cursor.fetchall()
-                    # 对于SELECT语句，我们只记录影响的行数（通常是0）
+                    # 对于查询语句，我们只记录影响的行数（通常是0）
                     affected_rows_list.append(0)
                 else:
                     # 非SELECT语句
@@ -951,20 +1706,29 @@ class DatabaseManager:
                 "error": str(e)
             }
         finally:
+            for table_names in ddl_tables:
+                self._invalidate_metadata(db_config, table_names)
+            self._invalidate_results(db_config)
             if connection and connection.is_connected():
                 try:
                     connection.close()
                 except Exception as e2:
                     print(f"Error closing connection: {e2}")
 
-    def execute_batch_sql_no_execute_sql(self, db_name: str, sql_statements: List[str]) -> Dict[str, Any]:
+    @metrics.instrument()
+    def execute_batch_sql_no_execute_sql(self, db_name: str, sql_statements: Iterable[str],
+                                          commit_every: int = None) -> Dict[str, Any]:
         """
         执行批量SQL语句（支持事务）- 不调用execute_sql，直接处理
         用于/api/databases/<name>/import/sql端点
+
+        连续的语句按max_allowed_packet打包为多语句数据包发送，连续的同表单行INSERT
+        合并为多行INSERT，影响行数仍按原始语句逐条返回
         
         Args:
             db_name (str): 数据库名称
-            sql_statements (List[str]): SQL语句列表
+            sql_statements (Iterable[str]): SQL语句列表或按需生成语句的迭代器
+            commit_every (int): 每执行多少条语句提交一次；为空时所有语句在一个事务中执行
             
         Returns:
             Dict[str, Any]: 执行结果
@@ -973,37 +1737,26 @@ class DatabaseManager:
         if not db_config:
             return {"success": False, "error": "Database not found"}
         
+        # 记录执行过的DDL修改的表，结束后使相关的元数据缓存失效
+        ddl_tables = []
+        sql_statements = self._tracking_ddl(sql_statements, ddl_tables)
         connection = None
         try:
-            # 使用autocommit=False确保事务控制
-            connection = mysql.connector.connect(
-                host=db_config.get('host', 'localhost'),
-                port=db_config.get('port', 3306),
-                database=db_config.get('database', ''),
-                user=db_config.get('user', ''),
-                password=db_config.get('password', '')
-                , autocommit=False
-            )
+            # 连接池中的连接默认autocommit=False，确保事务控制
+            connection = self._get_connection(db_config)
             
             if not connection.is_connected():
                 return {"success": False, "error": "Database connection failed"}
             
             cursor = connection.cursor()
-            
-            # 执行所有SQL语句
-            affected_rows_list = []
-            for sql_statement in sql_statements:
-                sql_upper = sql_statement.strip().upper()
-                
-                if sql_upper.startswith("SELECT"):
-                    cursor.execute(sql_statement)
-                    results = cursor.fetchall()
-                    # 对于SELECT语句，我们只记录影响的行数（通常是0）
-                    affected_rows_list.append(0)
-                else:
-                    # 非SELECT语句
-                    for result in cursor.execute(sql_statement, multi=True):
-                        affected_rows_list.append(result.rowcount)
+            cursor.execute("SELECT @@max_allowed_packet")
+            max_allowed_packet = int(cursor.fetchone()[0])
+
+            # 执行所有SQL语句（sql_statements可以是惰性生成语句的迭代器）
+            result = batch_executor.execute_batches(
+                connection, cursor, sql_statements,
+                batch_executor.packet_byte_budget(max_allowed_packet), commit_every
+            )
             
             # 提交事务
             connection.commit()
@@ -1012,23 +1765,30 @@ class DatabaseManager:
             return {
                 "success": True,
                 "type": "BATCH",
-                "affected_rows": affected_rows_list
+                "affected_rows": result["affected_rows"],
+                "statement_count": result["statement_count"],
+                "packet_count": result["packet_count"]
+            }
+
+        except batch_executor.BatchExecutionError as e:
+            self._rollback_quietly(connection)
+            print(f"Error executing batch SQL at statement {e.statement_number}: {e}")
+            return {
+                "success": False,
+                "error": f"Statement {e.statement_number}: {e}",
+                "committed_statements": e.committed_statements
             }
-                
         except Error as e:
-            if connection:
-                connection.rollback()
+            self._rollback_quietly(connection)
             print(f"Error executing batch SQL: {e}")
-            try:
-                if 'connection' in locals() and connection.is_connected():
-                    connection.close()
-            except:
-                pass
             return {
                 "success": False,
                 "error": str(e)
             }
         finally:
+            for table_names in ddl_tables:
+                self._invalidate_metadata(db_config, table_names)
+            self._invalidate_results(db_config)
             if connection and connection.is_connected():
                 try:
                     connection.close()
@@ -1036,175 +1796,75 @@ class DatabaseManager:
                     pass
 
 
+    @metrics.instrument()
     def export_sql_data(self, db_name: str, sql_statement: str, format_type: str = "insert_sql", table_name: str = None) -> Dict[str, Any]:
-        """根据SQL语句导出数据为INSERT SQL或CSV格式"""
-        db_config = self.get_database(db_name)
-        if not db_config:
-            return {"success": False, "error": "Database not found"}
-        connection = None
-        try:
-            connection = mysql.connector.connect(
-                host=db_config.get('host', 'localhost'),
-                port=db_config.get('port', 3306),
-                database=db_config.get('database', ''),
-                user=db_config.get('user', ''),
-                password=db_config.get('password', '')
-            )
-
-            if not connection.is_connected():
-                return {"success": False, "error": "Database connection failed"}
+        """
+        根据SQL语句导出数据为INSERT SQL或CSV格式
 
-            cursor = connection.cursor()
+        查询结果通过非缓冲游标分块读取并逐块编码，内存占用与结果集大小无关。
 
-            # 执行SQL语句
-            cursor.execute(sql_statement)
+        Returns:
+            Dict[str, Any]: 成功时 "content" 为导出文本块的迭代器，"stream" 为底层 ResultStream
+                （非查询语句时为None）。调用方提前结束读取时需要调用 stream.close()
+        """
+        if format_type not in ("csv", "insert_sql"):
+            return {"success": False, "error": f"Unsupported format type: {format_type}"}
 
-            # 获取结果
-            results = cursor.fetchall()
+        db_config = self.get_database(db_name)
+        if not db_config:
+            return {"success": False, "error": "Database not found"}
 
-            # 如果是SELECT查询，获取列信息
-            if sql_statement.strip().upper().startswith("SELECT"):
-                columns = [desc[0] for desc in cursor.description]
+        result = self._open_result_stream(db_config, sql_statement, with_packet_size=format_type == "insert_sql",
+                                          slow_query_source="export_sql_data")
+        if not result["success"]:
+            print(f"Error exporting SQL data: {result['error']}")
+            return {"success": False, "error": result["error"]}
 
-                if format_type == "csv":
-                    # 生成CSV格式内容
-                    output_lines = []
-
-                    # 添加CSV头（字段名）
-                    output_lines.append(','.join([f'"{col}"' for col in columns]))
-
-                    # 处理每一行数据
-                    for row in results:
-                        csv_row = []
-                        for value in row:
-                            if value is None:
-                                csv_row.append('')
-                            elif isinstance(value, str):
-                                # 对字符串进行转义处理，如果包含引号或逗号需要加引号
-                                escaped_value = value.replace('"', '""')
-                                csv_row.append(f'"{escaped_value}"')
-                            else:
-                                csv_row.append(str(value))
-                        output_lines.append(','.join(csv_row))
-
-                    result_content = '\n'.join(output_lines)
-                elif format_type == "insert_sql":
-                    # 生成INSERT SQL格式内容
-                    output_lines = []
-
-                    # 添加文件头注释
-                    output_lines.append("-- MySQL dump from custom SQL")
-                    output_lines.append("")
-
-                    # 如果table_name为None或空字符串，需要从SQL中解析表名
-                    if not table_name:
-                        # 使用sql_util提取SQL中的表名
-                        table_names = sql_util.extract_table_names(sql_statement)
-                        if table_names:
-                            table_name = table_names[0]  # 获取第一个表名
-                        else:
-                            table_name = "table_name"
-
-                    # 批量处理：每50条记录为一批进行插入
-                    batch_size = 50
-                    for i in range(0, len(results), batch_size):
-                        batch = results[i:i + batch_size]
-
-                        # 对于每个批次，构建多个INSERT语句（单个INSERT包含多行）
-                        if len(batch) == 1:
-                            # 如果只有一条记录，则使用单条插入
-                            row = batch[0]
-                            values_list = []
-                            for j, value in enumerate(row):
-                                column_name = columns[j]
-
-                                if value is None:
-                                    values_list.append('NULL')
-                                elif isinstance(value, str):
-                                    # 对字符串进行转义和引号处理
-                                    escaped_value = value.replace('\\', '\\\\').replace("'", "\\'")
-                                    values_list.append(f"'{escaped_value}'")
-                                elif isinstance(value, (int, float)):
-                                    values_list.append(str(value))
-                                else:
-                                    # 其他类型转换为字符串并用引号包围
-                                    values_list.append(f"'{str(value)}'")
-
-                            columns_str = ', '.join([f'`{col}`' for col in columns])
-                            values_str = ', '.join(values_list)
-                            insert_sql = f"INSERT INTO `{table_name}` ({columns_str}) VALUES ({values_str});"
-                            output_lines.append(insert_sql)
-                        else:
-                            # 如果有多条记录，则使用多行插入
-                            batch_values = []
-                            for row in batch:
-                                values_list = []
-                                for j, value in enumerate(row):
-                                    column_name = columns[j]
-
-                                    if value is None:
-                                        values_list.append('NULL')
-                                    elif isinstance(value, str):
-                                        # 对字符串进行转义和引号处理
-                                        escaped_value = value.replace('\\', '\\\\').replace("'", "\\'")
-                                        values_list.append(f"'{escaped_value}'")
-                                    elif isinstance(value, (int, float)):
-                                        values_list.append(str(value))
-                                    else:
-                                        # 其他类型转换为字符串并用引号包围
-                                        values_list.append(f"'{str(value)}'")
-
-                                batch_values.append(f"({', '.join(values_list)})")
-
-                            columns_str = ', '.join([f'`{col}`' for col in columns])
-                            values_str = ', '.join(batch_values)
-                            insert_sql = f"INSERT INTO `{table_name}` ({columns_str}) VALUES {values_str};"
-                            output_lines.append(insert_sql)
-
-                    result_content = '\n'.join(output_lines)
-                else:
-                    return {"success": False, "error": f"Unsupported format type: {format_type}"}
+        stream = result["stream"]
+        if stream is None:
+            # 非SELECT语句（如INSERT/UPDATE/DELETE），返回影响的行数
+            affected_rows = result["affected_rows"]
+            if format_type == "csv":
+                output_lines = ['"affected_rows"', str(affected_rows)]
             else:
-                # 非SELECT语句（如INSERT/UPDATE/DELETE），返回影响的行数
-                if format_type == "csv":
-                    # 对于非SELECT语句，CSV格式可以简单返回影响行数信息
-                    output_lines = []
-                    output_lines.append('"affected_rows"')
-                    output_lines.append(str(len(results)))
-                    result_content = '\n'.join(output_lines)
-                elif format_type == "insert_sql":
-                    # 如果table_name为None或空字符串，需要从SQL中解析表名
-                    if not table_name:
-                        # 使用sql_util提取SQL中的表名
-                        table_names = sql_util.extract_table_names(sql_statement)
-                        if table_names:
-                            table_name = table_names[0]  # 获取第一个表名
-
-                    # 对于非SELECT语句，INSERT SQL格式也可以返回影响行数信息
-                    output_lines = []
-                    output_lines.append("-- MySQL command results")
-                    output_lines.append(f"-- SQL: {sql_statement}")
-                    if table_name:
-                        output_lines.append(f"-- Table: {table_name}")
-                    output_lines.append(f"-- Affected rows: {len(results)}")
-                    result_content = '\n'.join(output_lines)
-                else:
-                    return {"success": False, "error": f"Unsupported format type: {format_type}"}
+                # 如果table_name为None或空字符串，需要从SQL中解析表名
+                if not table_name:
+                    table_names = sql_util.extract_table_names(sql_statement)
+                    if table_names:
+                        table_name = table_names[0]
 
-            cursor.close()
+                output_lines = ["-- MySQL command results", f"-- SQL: {sql_statement}"]
+                if table_name:
+                    output_lines.append(f"-- Table: {table_name}")
+                output_lines.append(f"-- Affected rows: {affected_rows}")
 
             return {
                 "success": True,
-                "content": result_content,
-                "format": format_type,
-                "row_count": len(results) if sql_statement.strip().upper().startswith("SELECT") else None
+                "content": iter(['\n'.join(output_lines)]),
+                "stream": None,
+                "format": format_type
             }
 
-        except Error as e:
-            print(f"Error exporting SQL data: {e}")
-        finally:
-            try:
-                if 'connection' in locals() and connection.is_connected():
-                    connection.close()
-            except:
-                pass
+        if format_type == "csv":
+            content = export_encoder.encode_csv(stream.description, stream)
+        else:
+            # 如果table_name为None或空字符串，需要从SQL中解析表名
+            if not table_name:
+                # 使用sql_util提取SQL中的表名
+                table_names = sql_util.extract_table_names(sql_statement)
+                if table_names:
+                    table_name = table_names[0]  # 获取第一个表名
+                else:
+                    table_name = "table_name"
+
+            # 多行INSERT语句，每条语句的大小按max_allowed_packet限制
+            header_lines = ["-- MySQL dump from custom SQL", ""]
+            content = export_encoder.encode_insert_sql(table_name, stream.description, stream, header_lines,
+                                                       result["max_allowed_packet"])
+
+        return {
+            "success": True,
+            "content": self._closing(content, stream),
+            "stream": stream,
+            "format": format_type
+        }
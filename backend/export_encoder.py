@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+导出编码模块
+把分块读取的查询结果逐块编码为CSV或INSERT SQL文本，供所有导出路径（单表、整库、自定义SQL、
+归档导出）使用：
+- 根据游标的description为每列生成一次值编码函数，编码时不再对每个值做类型判断
+- CSV由csv.writer按RFC 4180生成（字段按需加引号，记录以CRLF结尾）
+- INSERT SQL生成多行INSERT，每条语句的大小按max_allowed_packet限制
+"""
+
+import csv
+import datetime
+import io
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from mysql.connector import FieldType
+
+# 每条多行INSERT语句最多占用max_allowed_packet的比例（导入端的设置可能更小）
+PACKET_USAGE = 0.5
+# 每条多行INSERT语句的字节数上下限
+MIN_STATEMENT_BYTES = 16 * 1024
+MAX_STATEMENT_BYTES = 16 * 1024 * 1024
+# 无法获取max_allowed_packet时使用的默认值（MySQL 8.0的默认设置）
+DEFAULT_MAX_ALLOWED_PACKET = 64 * 1024 * 1024
+
+# binary字符集的编号，该字符集的字符串列（BINARY、VARBINARY、BLOB）按二进制数据导出
+BINARY_CHARSET = 63
+
+_INTEGER_TYPES = frozenset([FieldType.TINY, FieldType.SHORT, FieldType.LONG, FieldType.LONGLONG,
+                            FieldType.INT24, FieldType.YEAR])
+_FLOAT_TYPES = frozenset([FieldType.FLOAT, FieldType.DOUBLE])
+_DECIMAL_TYPES = frozenset([FieldType.DECIMAL, FieldType.NEWDECIMAL])
+_TEMPORAL_TYPES = frozenset([FieldType.DATE, FieldType.NEWDATE, FieldType.DATETIME, FieldType.TIMESTAMP])
+_BLOB_TYPES = frozenset([FieldType.TINY_BLOB, FieldType.MEDIUM_BLOB, FieldType.LONG_BLOB, FieldType.BLOB,
+                         FieldType.VAR_STRING, FieldType.STRING, FieldType.VARCHAR])
+
+# 与mysqldump相同的字符串转义规则
+_SQL_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    "'": "\\'",
+    '\0': '\\0',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\x1a': '\\Z'
+})
+
+
+def statement_byte_budget(max_allowed_packet: int) -> int:
+    """根据max_allowed_packet计算每条多行INSERT语句允许的字节数"""
+    return max(MIN_STATEMENT_BYTES, min(int(max_allowed_packet * PACKET_USAGE), MAX_STATEMENT_BYTES))
+
+
+def format_time(value: datetime.timedelta) -> str:
+    """把TIME列的timedelta格式化为MySQL的 [-]HH:MM:SS[.ffffff]"""
+    sign = "-" if value < datetime.timedelta(0) else ""
+    value = abs(value)
+    hours, remainder = divmod(value.days * 86400 + value.seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    text = f"{sign}{hours:02d}:{minutes:02d}:{seconds:02d}"
+    if value.microseconds:
+        text += f".{value.microseconds:06d}"
+    return text
+
+
+def quote_sql_string(value: str) -> str:
+    """把字符串转义并加引号，作为SQL字符串字面量"""
+    return "'" + value.translate(_SQL_ESCAPES) + "'"
+
+
+def _text(value) -> str:
+    """JSON、ENUM、SET等列的值转换为文本（驱动可能返回bytes或set）"""
+    if value.__class__ is str:
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8')
+    if isinstance(value, (set, frozenset)):
+        return ','.join(sorted(value))
+    return str(value)
+
+
+def _bit_value(value) -> int:
+    """BIT列的值转换为整数（驱动可能返回整数或大端字节串）"""
+    if isinstance(value, (bytes, bytearray)):
+        return int.from_bytes(value, 'big')
+    return int(value)
+
+
+def _sql_hex(value) -> str:
+    """二进制数据导出为十六进制字面量"""
+    return '0x' + value.hex() if value else "''"
+
+
+def _sql_string_or_hex(value) -> str:
+    """字符串列的值：驱动对二进制排序规则等情况可能返回bytes，此时导出为十六进制字面量"""
+    if value.__class__ is str:
+        return quote_sql_string(value)
+    if isinstance(value, (bytes, bytearray)):
+        return _sql_hex(value)
+    return quote_sql_string(_text(value))
+
+
+def _is_binary(column) -> bool:
+    return len(column) > 8 and column[8] == BINARY_CHARSET
+
+
+def sql_value_encoders(description) -> List[Callable]:
+    """
+    根据游标的description为每列生成INSERT语句中的值编码函数
+
+    编码函数的参数不为None（NULL由调用方处理），返回SQL字面量
+    """
+    encoders = []
+    for column in description:
+        type_code = column[1]
+        if type_code in _INTEGER_TYPES or type_code in _FLOAT_TYPES or type_code in _DECIMAL_TYPES:
+            encoders.append(str)
+        elif type_code in _TEMPORAL_TYPES:
+            encoders.append(lambda value: f"'{value}'")
+        elif type_code == FieldType.TIME:
+            encoders.append(lambda value: f"'{format_time(value)}'")
+        elif type_code == FieldType.BIT:
+            encoders.append(lambda value: f"b'{_bit_value(value):b}'")
+        elif type_code == FieldType.GEOMETRY or (type_code in _BLOB_TYPES and _is_binary(column)):
+            encoders.append(lambda value: _sql_hex(value) if isinstance(value, (bytes, bytearray))
+                            else _sql_string_or_hex(value))
+        elif type_code in (FieldType.JSON, FieldType.ENUM, FieldType.SET):
+            encoders.append(lambda value: quote_sql_string(_text(value)))
+        else:
+            encoders.append(_sql_string_or_hex)
+    return encoders
+
+
+def csv_value_encoders(description) -> List[Optional[Callable]]:
+    """
+    根据游标的description为每列生成CSV字段的值编码函数
+
+    None表示该列的值可以直接交给csv.writer（字符串、整数、浮点数、DECIMAL、日期时间）；
+    二进制数据导出为十六进制文本（可以用UNHEX()还原）
+    """
+    encoders = []
+    for column in description:
+        type_code = column[1]
+        if (type_code in _INTEGER_TYPES or type_code in _FLOAT_TYPES or type_code in _DECIMAL_TYPES
+                or type_code in _TEMPORAL_TYPES):
+            encoders.append(None)
+        elif type_code == FieldType.TIME:
+            encoders.append(format_time)
+        elif type_code == FieldType.BIT:
+            encoders.append(_bit_value)
+        elif type_code == FieldType.GEOMETRY or (type_code in _BLOB_TYPES and _is_binary(column)):
+            encoders.append(lambda value: value.hex() if isinstance(value, (bytes, bytearray)) else _text(value))
+        elif type_code in (FieldType.JSON, FieldType.ENUM, FieldType.SET):
+            encoders.append(_text)
+        else:
+            encoders.append(lambda value: value if value.__class__ is str else
+                            value.hex() if isinstance(value, (bytes, bytearray)) else _text(value))
+    return encoders
+
+
+def encode_csv(description, chunks: Iterable[List[tuple]]) -> Iterator[str]:
+    """
+    把分块的行数据编码为CSV文本
+
+    Args:
+        description: 游标的description
+        chunks (Iterable[List[tuple]]): 行数据块，例如 ResultStream
+
+    Yields:
+        str: 表头以及每个数据块对应的CSV文本（每条记录以CRLF结尾）；NULL导出为空字段
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\r\n')
+    converted = [(i, encode) for i, encode in enumerate(csv_value_encoders(description)) if encode is not None]
+
+    writer.writerow([column[0] for column in description])
+    yield buffer.getvalue()
+
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        if converted:
+            rows = [list(row) for row in chunk]
+            for i, encode in converted:
+                for row in rows:
+                    value = row[i]
+                    if value is not None:
+                        row[i] = encode(value)
+            writer.writerows(rows)
+        else:
+            writer.writerows(chunk)
+        yield buffer.getvalue()
+
+
+def encode_insert_sql(table_name: str, description, chunks: Iterable[List[tuple]],
+                      header_lines: List[str] = None,
+                      max_allowed_packet: int = DEFAULT_MAX_ALLOWED_PACKET) -> Iterator[str]:
+    """
+    把分块的行数据编码为多行INSERT SQL文本
+
+    Args:
+        table_name (str): INSERT语句的目标表名
+        description: 游标的description
+        chunks (Iterable[List[tuple]]): 行数据块，例如 ResultStream
+        header_lines (List[str]): 文件头注释行
+        max_allowed_packet (int): 服务器的max_allowed_packet，每条INSERT语句的大小按它限制
+
+    Yields:
+        str: 文件头以及每个数据块对应的INSERT语句（语句之间以换行分隔）
+    """
+    yield '\n'.join(header_lines or [])
+
+    columns_str = ', '.join([f'`{column[0]}`' for column in description])
+    prefix = f"\nINSERT INTO `{table_name}` ({columns_str}) VALUES "
+    encoders = sql_value_encoders(description)
+    budget = statement_byte_budget(max_allowed_packet) - len(prefix.encode('utf-8')) - 1
+
+    pending = []
+    pending_bytes = 0
+    for chunk in chunks:
+        output = []
+        for row in chunk:
+            values = '(' + ', '.join(['NULL' if value is None else encode(value)
+                                      for encode, value in zip(encoders, row)]) + ')'
+            size = len(values) if values.isascii() else len(values.encode('utf-8'))
+            # 加上这一行会超过上限时先输出已有的行；单行超过上限时单独成为一条语句
+            if pending and pending_bytes + size + 2 > budget:
+                output.append(prefix + ', '.join(pending) + ';')
+                pending = []
+                pending_bytes = 0
+            pending.append(values)
+            pending_bytes += size + 2
+        if output:
+            yield ''.join(output)
+
+    # 处理最后一批数据（如果还有剩余）
+    if pending:
+        yield prefix + ', '.join(pending) + ';'
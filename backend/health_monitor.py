@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+健康检查模块
+后台线程定期并行探测所有已配置的数据库，在内存中保存每个数据库最近的可达性和延迟：
+- 每轮探测在有界线程池中并行执行，超过timeout秒没有结果的数据库记为超时，不等待其完成
+- 上一轮仍未结束的探测（例如连接一个不响应的主机）不会重复提交，避免占满线程池
+- GET /api/databases 直接返回最近一次的结果，不需要在请求中连接数据库
+- 探测通过连接池进行，探测之后连接池预先建立空闲连接，后续请求不需要等待建立连接
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+DEFAULT_INTERVAL = 30       # 两轮探测之间的间隔（秒），为0时不启动后台探测
+DEFAULT_TIMEOUT = 5         # 单个数据库的探测超时（秒）
+DEFAULT_WORKERS = 16        # 同时探测的数据库数
+DEFAULT_HISTORY = 60        # 每个数据库保留的探测记录数
+
+STATUS_UNKNOWN = "unknown"  # 尚未探测
+STATUS_UP = "up"
+STATUS_DOWN = "down"
+STATUS_TIMEOUT = "timeout"
+STATUS_BUSY = "busy"        # 连接池的连接全部借出，本轮没有探测到服务器
+
+
+class DatabaseBusyError(Exception):
+    """探测时没有可用的连接（例如连接池已全部借出），无法判断服务器是否可用"""
+
+
+class _DatabaseHealth:
+    """单个数据库的探测记录"""
+
+    def __init__(self, history: int):
+        self.history = deque(maxlen=history)
+        self.status = STATUS_UNKNOWN
+        self.latency_ms = None
+        self.error = None
+        self.checked_at = None
+        self.last_up_at = None
+        self.consecutive_failures = 0
+        self.in_flight = None  # 尚未结束的探测（Future）
+
+    def record(self, status: str, latency_ms: Optional[float], error: Optional[str], checked_at: float):
+        self.status = status
+        self.latency_ms = latency_ms
+        self.error = error
+        self.checked_at = checked_at
+        if status == STATUS_UP:
+            self.last_up_at = checked_at
+            self.consecutive_failures = 0
+        elif status != STATUS_BUSY:
+            self.consecutive_failures += 1
+        self.history.append((checked_at, status, latency_ms))
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = [latency for _, status, latency in self.history if status == STATUS_UP and latency is not None]
+        up = sum(1 for _, status, _ in self.history if status == STATUS_UP)
+        # busy 的探测没有得到服务器的状态，不计入可用率
+        probed = sum(1 for _, status, _ in self.history if status != STATUS_BUSY)
+        return {
+            "status": self.status,
+            "latency_ms": self.latency_ms,
+            "error": self.error,
+            "checked_at": self.checked_at,
+            "last_up_at": self.last_up_at,
+            "consecutive_failures": self.consecutive_failures,
+            "availability": round(up / probed, 4) if probed else None,
+            "avg_latency_ms": round(sum(latencies) / len(latencies), 3) if latencies else None
+        }
+
+
+class HealthMonitor:
+    """
+    数据库健康监视器
+
+    Args:
+        list_databases (Callable[[], List[Dict]]): 返回当前所有数据库配置
+        probe (Callable[[Dict], float]): 探测单个数据库，返回延迟（秒），无法连接时抛出异常；
+            没有可用的连接、无法判断服务器状态时抛出 DatabaseBusyError
+        interval (float): 两轮探测之间的间隔（秒）
+        timeout (float): 单个数据库的探测超时（秒）
+        workers (int): 同时探测的数据库数
+        history (int): 每个数据库保留的探测记录数
+    """
+
+    def __init__(self, list_databases: Callable[[], List[Dict[str, Any]]],
+                 probe: Callable[[Dict[str, Any]], float],
+                 interval: float = DEFAULT_INTERVAL, timeout: float = DEFAULT_TIMEOUT,
+                 workers: int = DEFAULT_WORKERS, history: int = DEFAULT_HISTORY):
+        self.list_databases = list_databases
+        self.probe = probe
+        self.interval = interval
+        self.timeout = timeout
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="health-probe")
+        self._health = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.rounds = 0
+
+    def start(self):
+        """启动后台探测线程，interval为0时不启动"""
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def trigger(self):
+        """立即开始下一轮探测（例如添加或修改了数据库配置之后）"""
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Error checking database health: {e}")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def check(self, names: Iterable[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        探测一轮并等待结果（最多timeout秒）
+
+        Args:
+            names (Iterable[str]): 只探测这些数据库，为None时探测全部
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 被探测数据库的最新状态
+        """
+        databases = self.list_databases()
+        if names is not None:
+            names = set(names)
+            databases = [db for db in databases if db.get("name") in names]
+
+        submitted = {}
+        with self._lock:
+            if names is None:
+                # 删除已不在配置中的数据库的记录
+                configured = {db.get("name") for db in databases}
+                for name in list(self._health):
+                    if name not in configured:
+                        del self._health[name]
+            for db in databases:
+                name = db.get("name")
+                health = self._health.get(name)
+                if health is None:
+                    health = self._health[name] = _DatabaseHealth(self.history)
+                if health.in_flight is not None and not health.in_flight.done():
+                    continue
+                health.in_flight = self._executor.submit(self._probe, db)
+                submitted[name] = health.in_flight
+
+        wait(list(submitted.values()), timeout=self.timeout)
+        now = time.time()
+        with self._lock:
+            for db in databases:
+                name = db.get("name")
+                health = self._health.get(name)
+                if health is None:
+                    continue
+                future = submitted.get(name) or health.in_flight
+                if future is not None and future.done():
+                    status, latency_ms, error = future.result()
+                else:
+                    status, latency_ms, error = STATUS_TIMEOUT, None, f"No response within {self.timeout:g}s"
+                health.record(status, latency_ms, error, now)
+            self.rounds += 1
+            return {db.get("name"): self._health[db.get("name")].summary()
+                    for db in databases if db.get("name") in self._health}
+
+    def _probe(self, db_config: Dict[str, Any]):
+        try:
+            latency = self.probe(db_config)
+        except DatabaseBusyError as e:
+            return STATUS_BUSY, None, str(e)
+        except Exception as e:
+            return STATUS_DOWN, None, str(e)
+        return STATUS_UP, round(latency * 1000, 3), None
+
+    def status(self, name: str) -> Dict[str, Any]:
+        """最近一次的探测结果，尚未探测时 status 为 unknown"""
+        with self._lock:
+            health = self._health.get(name)
+            return health.summary() if health else _DatabaseHealth(0).summary()
+
+    def get_history(self, name: str) -> Optional[List[Dict[str, Any]]]:
+        """数据库的探测记录（按时间顺序），没有记录时返回None"""
+        with self._lock:
+            health = self._health.get(name)
+            if health is None:
+                return None
+            return [{"checked_at": checked_at, "status": status, "latency_ms": latency_ms}
+                    for checked_at, status, latency_ms in health.history]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {}
+            for health in self._health.values():
+                counts[health.status] = counts.get(health.status, 0) + 1
+            return {"interval": self.interval, "timeout": self.timeout, "rounds": self.rounds,
+                    "databases": len(self._health), "status_counts": counts}
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+实例发现模块
+并行查询多个MySQL实例上的数据库列表，以及每个数据库的表数量和数据大小：
+- 每个实例使用一个独立的短连接（不经过连接池），连接和读取都有超时，不响应的实例不会拖慢其他实例
+- 所有请求共用一个有界线程池，结果按实例完成的先后顺序返回
+- 成功的结果按实例（地址、端口、账号、密码）缓存cache_ttl秒
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Tuple
+
+import mysql.connector
+
+DEFAULT_TIMEOUT = 10        # 连接和每次读取的超时（秒）
+DEFAULT_WORKERS = 16        # 同时查询的实例数
+DEFAULT_CACHE_TTL = 300     # 结果缓存的秒数
+DEFAULT_MAX_ENTRIES = 1000  # 缓存的实例数上限
+MAX_INSTANCES = 500         # 每次请求最多的实例数
+
+SYSTEM_DATABASES = frozenset(['information_schema', 'performance_schema', 'mysql', 'sys'])
+
+# 每个数据库的表数量和数据大小（数据 + 索引）；没有表的数据库不会出现在结果中
+_SCHEMA_SIZES = (
+    "SELECT table_schema, COUNT(*), COALESCE(SUM(data_length + index_length), 0) "
+    "FROM information_schema.tables GROUP BY table_schema"
+)
+
+
+def instance_key(config: Dict[str, Any]) -> Tuple:
+    """缓存的键：包含密码，使用错误密码的请求不会得到其他请求缓存的结果"""
+    return (config.get('host', 'localhost'), int(config.get('port', 3306)),
+            config.get('user', ''), config.get('password', ''))
+
+
+def validate_instance(config: Any) -> str:
+    """校验实例参数，返回错误信息，校验通过时返回空字符串"""
+    if not isinstance(config, dict):
+        return "Instance must be an object"
+    for field in ('host', 'user'):
+        if not config.get(field):
+            return f"Missing required field: {field}"
+    try:
+        int(config.get('port', 3306))
+    except (TypeError, ValueError):
+        return "port must be an integer"
+    return ""
+
+
+def list_instance_databases(config: Dict[str, Any], timeout: float = DEFAULT_TIMEOUT) -> List[Dict[str, Any]]:
+    """
+    查询实例上的用户数据库（排除系统库），以及每个数据库的表数量和数据大小
+
+    Returns:
+        List[Dict[str, Any]]: [{"name": ..., "tables": ..., "size_bytes": ...}]，按库名排序
+    """
+    connection = mysql.connector.connect(
+        host=config.get('host', 'localhost'),
+        port=int(config.get('port', 3306)),
+        user=config.get('user', ''),
+        password=config.get('password', ''),
+        connection_timeout=timeout
+    )
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SHOW DATABASES")
+        names = [row[0] for row in cursor.fetchall() if row[0] not in SYSTEM_DATABASES]
+        cursor.execute(_SCHEMA_SIZES)
+        sizes = {row[0]: (int(row[1]), int(row[2])) for row in cursor.fetchall()}
+        cursor.close()
+    finally:
+        connection.close()
+    return [{"name": name, "tables": sizes.get(name, (0, 0))[0], "size_bytes": sizes.get(name, (0, 0))[1]}
+            for name in sorted(names)]
+
+
+class InstanceDiscovery:
+    """
+    多实例并行发现
+
+    Args:
+        timeout (float): 连接和每次读取的超时（秒）
+        workers (int): 同时查询的实例数（所有请求共用）
+        cache_ttl (float): 结果缓存的秒数，为0时不缓存
+        max_entries (int): 缓存的实例数上限，超过时淘汰最久未使用的实例
+    """
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, workers: int = DEFAULT_WORKERS,
+                 cache_ttl: float = DEFAULT_CACHE_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="instance-discovery")
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key: Tuple):
+        with self._lock:
+            item = self._cache.get(key)
+            if item is None or time.monotonic() - item[0] > self.cache_ttl:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def _store(self, key: Tuple, databases: List[Dict[str, Any]]):
+        if self.cache_ttl <= 0:
+            return
+        with self._lock:
+            self._cache[key] = (time.monotonic(), databases)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _discover(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            databases = list_instance_databases(config, self.timeout)
+        except Exception as e:
+            return {"success": False, "error": str(e),
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)}
+        self._store(instance_key(config), databases)
+        return {"success": True, "cached": False, "databases": databases,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+    def discover(self, instances: List[Dict[str, Any]], use_cache: bool = True) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        并行查询多个实例，按完成的先后顺序返回结果
+
+        Args:
+            instances (List[Dict[str, Any]]): 实例参数（host、port、user、password），需先通过 validate_instance
+            use_cache (bool): 为False时忽略缓存重新查询
+
+        Yields:
+            Tuple[int, Dict[str, Any]]: (实例在instances中的位置, 结果)；成功时结果包含 databases 和 cached，
+                命中缓存时包含 age_seconds；失败时包含 error
+        """
+        futures = {}
+        for index, config in enumerate(instances):
+            cached = self._cached(instance_key(config)) if use_cache and self.cache_ttl > 0 else None
+            if cached is not None:
+                yield index, {"success": True, "cached": True, "databases": cached[1],
+                              "age_seconds": round(time.monotonic() - cached[0], 3)}
+            else:
+                futures[self._executor.submit(self._discover, config)] = index
+
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # 客户端断开时取消尚未开始的查询
+            for future in futures:
+                future.cancel()
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._cache), "max_entries": self.max_entries, "ttl": self.cache_ttl,
+                    "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+键集（Seek）分页模块
+按主键或非空唯一索引作为排序的最终依据，用"上一页最后一行之后"的条件代替 OFFSET，
+任意页的查询代价都与第一页相同。续页令牌是对排序方式和上一页最后一行排序值的不透明编码。
+"""
+
+import base64
+import datetime
+import decimal
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+ASC = "asc"
+DESC = "desc"
+
+_TOKEN_VERSION = 1
+
+
+class PaginationError(Exception):
+    """分页参数或续页令牌无效"""
+
+
+def quote_identifier(name: str) -> str:
+    """用反引号引用标识符"""
+    return "`" + name.replace("`", "``") + "`"
+
+
+def choose_key_columns(structure: List[Dict[str, Any]], indexes: List[Dict[str, Any]]) -> List[str]:
+    """
+    选择能唯一确定一行的列：优先使用主键，否则使用列都不允许为NULL的唯一索引
+
+    Args:
+        structure (List[Dict[str, Any]]): get_table_structure 的结果
+        indexes (List[Dict[str, Any]]): get_table_info 中的索引列表（SHOW INDEX格式）
+
+    Returns:
+        List[str]: 键列，找不到时返回空列表
+    """
+    not_null = {column["Field"] for column in structure if column["Null"] == "NO"}
+    unique_indexes = {}
+    for index in indexes:
+        if int(index["Non_unique"]) != 0:
+            continue
+        unique_indexes.setdefault(index["Key_name"], []).append(index)
+
+    candidates = []
+    for name, parts in unique_indexes.items():
+        parts.sort(key=lambda part: int(part["Seq_in_index"]))
+        columns = [part["Column_name"] for part in parts]
+        # 前缀索引（Sub_part）和函数索引不能保证按完整列值唯一
+        if any(part["Sub_part"] is not None or not part["Column_name"] for part in parts):
+            continue
+        if all(column in not_null for column in columns):
+            candidates.append((name != "PRIMARY", len(columns), columns))
+
+    if not candidates:
+        return []
+    return min(candidates)[2]
+
+
+def parse_sort(sort: Optional[str]) -> List[Tuple[str, str]]:
+    """
+    解析排序参数，例如 "created_at:desc,name"
+
+    Returns:
+        List[Tuple[str, str]]: (列名, asc/desc) 列表
+    """
+    result = []
+    if not sort:
+        return result
+    for item in sort.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        column, _, direction = item.partition(":")
+        direction = (direction or ASC).strip().lower()
+        if direction not in (ASC, DESC):
+            raise PaginationError(f"Invalid sort direction: {direction}")
+        result.append((column.strip(), direction))
+    return result
+
+
+def build_order(sort: List[Tuple[str, str]], columns: List[str], key_columns: List[str]) -> List[Tuple[str, str]]:
+    """校验排序列并追加键列作为排序的最终依据，保证排序结果唯一"""
+    known = set(columns)
+    order = []
+    seen = set()
+    for column, direction in sort:
+        if column not in known:
+            raise PaginationError(f"Unknown sort column: {column}")
+        if column not in seen:
+            order.append((column, direction))
+            seen.add(column)
+    for column in key_columns:
+        if column not in seen:
+            order.append((column, ASC))
+            seen.add(column)
+    return order
+
+
+def _after(column: str, direction: str, value) -> Tuple[str, list]:
+    """列值排在value之后的条件（MySQL中NULL在升序时排最前，降序时排最后）"""
+    quoted = quote_identifier(column)
+    if value is None:
+        if direction == ASC:
+            return f"{quoted} IS NOT NULL", []
+        return "FALSE", []
+    if direction == ASC:
+        return f"{quoted} > %s", [value]
+    return f"({quoted} < %s OR {quoted} IS NULL)", [value]
+
+
+def _equal(column: str, value) -> Tuple[str, list]:
+    quoted = quote_identifier(column)
+    if value is None:
+        return f"{quoted} IS NULL", []
+    return f"{quoted} = %s", [value]
+
+
+def seek_condition(order: List[Tuple[str, str]], last_values: list) -> Tuple[str, list]:
+    """
+    构建"排在上一页最后一行之后"的条件
+
+    展开为 (a > ?) OR (a = ? AND b > ?) OR ...；所有列都是升序且排序值都不为NULL时使用行构造器
+    (a, b) > (?, ?)，便于优化器直接在索引上定位。降序时NULL排在最后，而 (a, b) < (?, ?)
+    对含NULL的行不成立，会漏掉这些行，因此降序始终使用展开的条件
+    """
+    if all(direction == ASC for _, direction in order) and all(value is not None for value in last_values):
+        columns = ", ".join([quote_identifier(column) for column, _ in order])
+        placeholders = ", ".join(["%s"] * len(order))
+        return f"({columns}) > ({placeholders})", list(last_values)
+
+    branches = []
+    params = []
+    for i, (column, direction) in enumerate(order):
+        parts = []
+        branch_params = []
+        for (prev_column, _), prev_value in zip(order[:i], last_values[:i]):
+            condition, condition_params = _equal(prev_column, prev_value)
+            parts.append(condition)
+            branch_params.extend(condition_params)
+        condition, condition_params = _after(column, direction, last_values[i])
+        if condition == "FALSE":
+            continue
+        parts.append(condition)
+        branch_params.extend(condition_params)
+        branches.append("(" + " AND ".join(parts) + ")")
+        params.extend(branch_params)
+    if not branches:
+        return "FALSE", []
+    return "(" + " OR ".join(branches) + ")", params
+
+
+def build_page_query(table_name: str, columns: List[str], order: List[Tuple[str, str]],
+                     last_values: list = None, page_size: int = DEFAULT_PAGE_SIZE) -> Tuple[str, list]:
+    """构建一页数据的查询，多取一行用于判断是否还有下一页"""
+    sql = (f"SELECT {', '.join([quote_identifier(column) for column in columns])} "
+           f"FROM {quote_identifier(table_name)}")
+    params = []
+    if last_values is not None:
+        condition, params = seek_condition(order, last_values)
+        sql += f" WHERE {condition}"
+    order_by = ", ".join([f"{quote_identifier(column)} {direction.upper()}" for column, direction in order])
+    sql += f" ORDER BY {order_by} LIMIT {int(page_size) + 1}"
+    return sql, params
+
+
+def _encode_value(value):
+    """把排序值编码为可以放进JSON的形式，保留类型以便原样作为查询参数"""
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        return {"f": repr(value)}
+    if isinstance(value, decimal.Decimal):
+        return {"d": str(value)}
+    if isinstance(value, datetime.datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"da": value.isoformat()}
+    if isinstance(value, datetime.timedelta):
+        return {"td": value.total_seconds()}
+    if isinstance(value, (bytes, bytearray)):
+        return {"b": base64.b64encode(bytes(value)).decode("ascii")}
+    return {"s": str(value)}
+
+
+def _decode_value(value):
+    if not isinstance(value, dict):
+        return value
+    (kind, raw), = value.items()
+    if kind == "f":
+        return float(raw)
+    if kind == "d":
+        return decimal.Decimal(raw)
+    if kind == "dt":
+        return datetime.datetime.fromisoformat(raw)
+    if kind == "da":
+        return datetime.date.fromisoformat(raw)
+    if kind == "td":
+        return datetime.timedelta(seconds=raw)
+    if kind == "b":
+        return base64.b64decode(raw)
+    return raw
+
+
+def encode_token(table_name: str, order: List[Tuple[str, str]], last_values: list) -> str:
+    """生成续页令牌"""
+    payload = {
+        "v": _TOKEN_VERSION,
+        "t": table_name,
+        "o": [[column, direction] for column, direction in order],
+        "k": [_encode_value(value) for value in last_values]
+    }
+    data = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_token(token: str, table_name: str) -> Tuple[List[Tuple[str, str]], list]:
+    """
+    解析续页令牌
+
+    Returns:
+        Tuple[List[Tuple[str, str]], list]: (排序方式, 上一页最后一行的排序值)
+    """
+    try:
+        data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(data.decode("utf-8"))
+        if payload["v"] != _TOKEN_VERSION or payload["t"] != table_name:
+            raise ValueError("token does not belong to this table")
+        order = [(str(column), direction) for column, direction in payload["o"]]
+        last_values = [_decode_value(value) for value in payload["k"]]
+        if len(order) != len(last_values) or any(direction not in (ASC, DESC) for _, direction in order):
+            raise ValueError("malformed token")
+    except Exception:
+        raise PaginationError("Invalid continuation token")
+    return order, last_values
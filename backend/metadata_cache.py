@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+元数据缓存模块
+缓存表名列表、表结构、建表语句等元数据，避免每次请求都查询服务器：
+- 每个条目有过期时间（TTL）
+- 条目数超过上限时按LRU淘汰
+- 执行DDL后按数据库或表失效
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 2000
+
+
+class MetadataCache:
+    """
+    线程安全的元数据缓存
+
+    键为 (数据库键, 元数据类型, 表名)：数据库键为 connection_pool.pool_key(db_config)，
+    表名为None表示整个数据库级别的元数据（如表名列表）。
+    缓存的值在多个请求间共享，调用方不能修改。
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, db_key: Tuple, kind: str, table: str = None) -> Tuple[bool, Any]:
+        """
+        读取缓存
+
+        Returns:
+            Tuple[bool, Any]: (是否命中, 缓存的值)
+        """
+        key = (db_key, kind, table)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return True, value
+                del self._entries[key]
+            self._misses += 1
+            return False, None
+
+    def put(self, db_key: Tuple, kind: str, value: Any, table: str = None):
+        """写入缓存，超过条目上限时淘汰最久未使用的条目"""
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        key = (db_key, kind, table)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, db_key: Optional[Tuple] = None, table: str = None) -> int:
+        """
+        使缓存失效
+
+        Args:
+            db_key (Tuple): 数据库键，为空时清空全部缓存。同一服务器上同一数据库的
+                其他配置（例如不同用户）的缓存也会一并失效
+            table (str): 表名，为空时使整个数据库的缓存失效；否则只使该表的元数据和
+                数据库级别的元数据（表名列表等）失效
+
+        Returns:
+            int: 失效的条目数
+        """
+        with self._lock:
+            if db_key is None:
+                keys = list(self._entries)
+            else:
+                server = _server_key(db_key)
+                keys = [key for key in self._entries
+                        if _server_key(key[0]) == server
+                        and (table is None or key[2] is None or key[2].lower() == table.lower())]
+            for key in keys:
+                del self._entries[key]
+            self._invalidations += len(keys)
+            return len(keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations
+            }
+
+
+def _server_key(db_key: Tuple) -> Hashable:
+    """数据库键中的 (主机, 端口, 数据库) 部分"""
+    return db_key[:3]
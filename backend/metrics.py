@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+运行指标模块
+以Prometheus文本格式（0.0.4）导出服务的运行指标，由 GET /metrics 返回：
+- HTTP请求：按路由统计请求数和耗时分布，流式响应统计发送的字节数
+- 数据库：按数据库配置统计借出连接、执行语句、读取结果的耗时，各操作的耗时和失败次数，
+  返回、导入、导出的行数，以及连接池中的连接数
+- AI生成SQL的耗时
+
+指标在进程内存中累计，计数和观测只需要一次加锁；instrument 装饰器包装 DatabaseManager 的方法，
+路由的指标由 app.py 的 before_request/after_request 记录
+"""
+
+import bisect
+import functools
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 默认的耗时分布区间（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# AI生成SQL通常需要数秒到数分钟
+LLM_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+# 请求中的数据库名称不在配置中时使用的标签值，避免任意名称产生无限多的时间序列
+UNKNOWN_DATABASE = "unknown"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """指标基类，每组标签值对应一个时间序列"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _samples(self) -> Iterable[str]:
+        """各时间序列的样本行，由子类实现；基类没有样本"""
+        return iter(())
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """只增不减的计数"""
+
+    type_name = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """
+    可增可减的当前值
+
+    callback 在导出时调用，返回 (标签值元组, 数值) 的可迭代对象，用于连接数等由其他组件维护的状态
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Iterable[Tuple[tuple, float]]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+    def set_callback(self, callback: Callable[[], Iterable[Tuple[tuple, float]]]):
+        self.callback = callback
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+        if self.callback is not None:
+            try:
+                values.update((tuple(labels), value) for labels, value in self.callback())
+            except Exception as e:
+                print(f"Error collecting metric {self.name}: {e}")
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(*self.labels, value=time.perf_counter() - self.started)
+        return False
+
+
+class Histogram(_Metric):
+    """按区间统计观测值的分布，同时记录总和与次数"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # 每个区间的计数（非累计），最后一个为 +Inf；之后是总和与次数
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, *labels) -> _Timer:
+        """上下文管理器：记录代码块的耗时"""
+        return _Timer(self, labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._values.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            label_str = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_str} {_format_value(series[-2])}"
+            yield f"{self.name}_count{label_str} {series[-1]}"
+
+
+class Registry:
+    """指标的集合，按注册顺序导出"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by method, route and status.", ("method", "route", "status")))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time until the response (or the first byte of a streamed response) "
+    "is ready.", ("method", "route")))
+HTTP_STREAMED_BYTES = REGISTRY.register(Counter(
+    "http_streamed_bytes_total", "Bytes sent in streamed responses.", ("route",)))
+
+DB_CONNECT_SECONDS = REGISTRY.register(Histogram(
+    "db_connect_duration_seconds", "Time to check out a connection (including pool waits and new connections).",
+    ("database",)))
+DB_EXECUTE_SECONDS = REGISTRY.register(Histogram(
+    "db_execute_duration_seconds", "Time spent in cursor.execute.", ("database",)))
+DB_FETCH_SECONDS = REGISTRY.register(Histogram(
+    "db_fetch_duration_seconds", "Time spent fetching result rows (per fetch call).", ("database",)))
+DB_OPERATION_SECONDS = REGISTRY.register(Histogram(
+    "db_operation_duration_seconds", "Duration of DatabaseManager operations.", ("database", "operation")))
+DB_OPERATION_ERRORS = REGISTRY.register(Counter(
+    "db_operation_errors_total", "DatabaseManager operations that failed.", ("database", "operation")))
+DB_ROWS = REGISTRY.register(Counter(
+    "db_rows_total", "Rows returned, imported or exported.", ("database", "direction")))
+DB_CONNECTIONS = REGISTRY.register(Gauge(
+    "db_connections", "Pooled connections by state.", ("database", "state")))
+
+EXECUTOR_REQUESTS = REGISTRY.register(Gauge(
+    "executor_requests", "Requests running or queued in the bounded executors.", ("executor", "state")))
+
+LLM_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "llm_request_duration_seconds", "Duration of SQL generation requests to the language model.", ("outcome",),
+    buckets=LLM_BUCKETS))
+
+
+def instrument(rows: Tuple[str, str] = None):
+    """
+    DatabaseManager方法的装饰器：按数据库记录方法耗时，返回 success 为False或抛出异常时记录失败
+
+    被装饰的方法第一个参数为数据库配置名称。
+
+    Args:
+        rows (Tuple[str, str]): (方向, 结果中的行数字段)，例如 ("returned", "row_count")
+    """
+    def decorator(func):
+        operation = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(self, db_name, *args, **kwargs):
+            database = db_name if self.get_database(db_name) else UNKNOWN_DATABASE
+            started = time.perf_counter()
+            try:
+                result = func(self, db_name, *args, **kwargs)
+            except Exception:
+                DB_OPERATION_ERRORS.inc(database, operation)
+                raise
+            finally:
+                DB_OPERATION_SECONDS.observe(database, operation, value=time.perf_counter() - started)
+            if isinstance(result, dict):
+                if result.get("success") is False:
+                    DB_OPERATION_ERRORS.inc(database, operation)
+                elif rows and result.get(rows[1]):
+                    DB_ROWS.inc(database, rows[0], amount=result[rows[1]])
+            return result
+        return wrapper
+    return decorator
+
+
+def timed(histogram: Histogram):
+    """装饰器：记录函数耗时，标签为调用结果 success 或 error"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                result = func(*args, **kwargs)
+                outcome = "success"
+                return result
+            finally:
+                histogram.observe(outcome, value=time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def count_bytes(iterable, route: str):
+    """
+    包装流式响应的内容迭代器，结束（或客户端断开）时累计发送的字节数
+
+    字符串在这里按UTF-8编码后再传递（与Werkzeug对响应内容的编码相同），按实际发送的字节计数，
+    中文等非ASCII内容不会少算，也不需要再编码一次
+    """
+    total = 0
+    try:
+        for piece in iterable:
+            if isinstance(piece, str):
+                piece = piece.encode("utf-8")
+            total += len(piece)
+            yield piece
+    finally:
+        HTTP_STREAMED_BYTES.inc(route, amount=total)
+        close = getattr(iterable, "close", None)
+        if close is not None:
+            close()
+
+
+def pool_connections(pool_stats: Dict[str, Optional[Dict]]) -> List[Tuple[tuple, float]]:
+    """把 DatabaseManager.get_pool_stats() 的结果转换为 DB_CONNECTIONS 的样本"""
+    samples = []
+    for name, stats in pool_stats.items():
+        if stats:
+            samples.append(((name, "in_use"), stats["in_use"]))
+            samples.append(((name, "idle"), stats["idle"]))
+    return samples
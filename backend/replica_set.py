@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+只读副本模块
+数据库配置中的 replicas 列出该库的只读副本，只读操作按轮询或最少连接数分配到健康的副本上：
+- 借出连接失败的副本被标记为不可用，retry_interval 秒后才会再次尝试（每次只放行一个请求试探）
+- 没有可用的副本时回退到主库
+- 通过本服务写入后的 sticky_seconds 秒内读操作仍走主库，避免因复制延迟读到写入之前的数据
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+ROUND_ROBIN = "round_robin"
+LEAST_CONNECTIONS = "least_connections"
+STRATEGIES = (ROUND_ROBIN, LEAST_CONNECTIONS)
+
+DEFAULT_RETRY_INTERVAL = 30     # 不可用的副本经过该秒数后再次尝试
+DEFAULT_STICKY_SECONDS = 5      # 写入后该秒数内的读操作走主库
+DEFAULT_CONNECT_TIMEOUT = 5     # 连接副本的超时秒数，副本宕机时尽快回退到主库
+
+# 副本可以单独设置的连接字段，未设置的字段沿用主库的配置（库名与主库相同）
+REPLICA_FIELDS = ("host", "port", "user", "password")
+# 副本沿用的主库连接池参数
+_INHERITED_FIELDS = ("port", "database", "user", "password", "pool_size", "pool_idle_timeout",
+                     "pool_checkout_timeout")
+
+
+def validate_replicas(db_config: Dict[str, Any]) -> Optional[str]:
+    """
+    校验数据库配置中的只读副本设置
+
+    Returns:
+        Optional[str]: 配置有误时返回错误信息，否则返回None
+    """
+    replicas = db_config.get("replicas")
+    if replicas is None:
+        return None
+    if not isinstance(replicas, list):
+        return "replicas must be a list"
+    for i, replica in enumerate(replicas):
+        if not isinstance(replica, dict) or not replica.get("host"):
+            return f"replicas[{i}] must be an object with a host"
+        unknown = sorted(set(replica) - set(REPLICA_FIELDS))
+        if unknown:
+            return f"replicas[{i}] has unsupported fields: {', '.join(unknown)}"
+    strategy = db_config.get("replica_strategy", ROUND_ROBIN)
+    if strategy not in STRATEGIES:
+        return f"Unsupported replica_strategy: {strategy}"
+    return None
+
+
+def replica_configs(db_config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """根据主库配置生成每个副本的完整连接配置"""
+    base = {key: db_config[key] for key in _INHERITED_FIELDS if key in db_config}
+    base["connect_timeout"] = db_config.get("replica_connect_timeout", DEFAULT_CONNECT_TIMEOUT)
+    configs = []
+    for replica in db_config.get("replicas") or []:
+        config = dict(base)
+        config.update({key: replica[key] for key in REPLICA_FIELDS if key in replica})
+        configs.append(config)
+    return configs
+
+
+class _Replica:
+    __slots__ = ("healthy", "failures", "last_error", "retry_at", "reads")
+
+    def __init__(self):
+        self.healthy = True
+        self.failures = 0
+        self.last_error = None
+        self.retry_at = 0.0
+        self.reads = 0
+
+
+class ReplicaSet:
+    """
+    一个数据库配置的所有只读副本及其健康状态（线程安全）
+
+    Args:
+        configs (List[Dict[str, Any]]): replica_configs 生成的副本连接配置
+        strategy (str): round_robin 轮询，least_connections 选择借出连接最少的副本
+        retry_interval (float): 不可用的副本再次尝试前等待的秒数
+        sticky_seconds (float): 写入后读操作走主库的秒数
+    """
+
+    def __init__(self, configs: List[Dict[str, Any]], strategy: str = ROUND_ROBIN,
+                 retry_interval: float = DEFAULT_RETRY_INTERVAL,
+                 sticky_seconds: float = DEFAULT_STICKY_SECONDS):
+        self.configs = configs
+        self.strategy = strategy
+        self.retry_interval = retry_interval
+        self.sticky_seconds = sticky_seconds
+        self._replicas = [_Replica() for _ in configs]
+        self._lock = threading.Lock()
+        self._next = 0
+        self._last_write = None
+        self._primary_reads = 0
+
+    def candidates(self, load: Callable[[int], int]) -> List[int]:
+        """
+        按选择策略排列本次读操作可以依次尝试的副本下标
+
+        健康的副本在前；到了重试时间的不可用副本排在最后作为试探，并推迟其下次重试时间，
+        避免并发请求同时试探同一个副本。
+
+        Args:
+            load (Callable[[int], int]): 返回副本当前借出的连接数，least_connections 策略使用
+
+        Returns:
+            List[int]: 副本下标；为空时应使用主库
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._last_write is not None and now - self._last_write < self.sticky_seconds:
+                return []
+            healthy = [i for i, replica in enumerate(self._replicas) if replica.healthy]
+            probes = [i for i, replica in enumerate(self._replicas)
+                      if not replica.healthy and replica.retry_at <= now]
+            for i in probes:
+                self._replicas[i].retry_at = now + self.retry_interval
+            start = self._next
+            self._next += 1
+
+        if self.strategy == LEAST_CONNECTIONS:
+            healthy.sort(key=lambda i: (load(i), (i - start) % len(self.configs)))
+        else:
+            healthy.sort(key=lambda i: (i - start) % len(self.configs))
+        return healthy + probes
+
+    def mark_ok(self, index: int):
+        """副本借出连接成功"""
+        with self._lock:
+            replica = self._replicas[index]
+            replica.healthy = True
+            replica.failures = 0
+            replica.reads += 1
+
+    def mark_failed(self, index: int, error: Exception):
+        """副本借出连接失败，retry_interval 秒内不再分配读操作"""
+        with self._lock:
+            replica = self._replicas[index]
+            replica.healthy = False
+            replica.failures += 1
+            replica.last_error = str(error)
+            replica.retry_at = time.monotonic() + self.retry_interval
+
+    def note_write(self):
+        """记录一次写入，sticky_seconds 秒内的读操作走主库"""
+        with self._lock:
+            self._last_write = time.monotonic()
+
+    def note_primary_read(self):
+        """记录一次走主库的读操作（写入后的sticky时间内或没有可用的副本）"""
+        with self._lock:
+            self._primary_reads += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各副本的健康状态和读操作分配情况"""
+        now = time.monotonic()
+        with self._lock:
+            replicas = []
+            for config, replica in zip(self.configs, self._replicas):
+                replicas.append({
+                    "host": config.get("host"),
+                    "port": config.get("port", 3306),
+                    "healthy": replica.healthy,
+                    "failures": replica.failures,
+                    "last_error": replica.last_error,
+                    "retry_in": None if replica.healthy else round(max(0.0, replica.retry_at - now), 3),
+                    "reads": replica.reads
+                })
+            return {
+                "strategy": self.strategy,
+                "replicas": replicas,
+                "primary_reads": self._primary_reads
+            }
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+有界请求执行器
+在固定大小的线程池中执行耗时的请求处理（数据库操作、LLM调用），
+限制同时执行和排队的请求数，并为每个请求设置超时时间，
+避免少数慢请求占满服务器的所有处理线程
+
+请求超时后执行处理过程中通过 on_cancel 登记的取消操作（例如对正在执行的语句发送KILL QUERY），
+使超时的处理尽快结束并释放线程和数据库连接
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+
+class ExecutorBusyError(Exception):
+    """正在执行和排队的请求数已达上限"""
+
+
+class RequestTimeoutError(Exception):
+    """请求处理超时"""
+
+    def __init__(self, timeout: float):
+        super().__init__(f"Request timed out after {timeout:g} seconds")
+        self.timeout = timeout
+
+
+class _Request:
+    """执行中的请求：截止时间，以及超时后需要执行的取消操作"""
+
+    def __init__(self, timeout: float):
+        self.deadline = time.monotonic() + timeout if timeout > 0 else None
+        self._callbacks = {}
+        self._next_token = 0
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        with self._lock:
+            token = self._next_token
+            self._next_token += 1
+            self._callbacks[token] = callback
+
+        def unregister():
+            with self._lock:
+                self._callbacks.pop(token, None)
+        return unregister
+
+    def finish(self):
+        """处理结束后不再执行取消操作"""
+        with self._lock:
+            self._finished = True
+            self._callbacks.clear()
+
+    def cancel(self):
+        with self._lock:
+            if self._finished:
+                return
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error cancelling timed out request: {e}")
+
+
+_current = threading.local()
+
+
+def on_cancel(callback: Callable[[], None]) -> Callable[[], None]:
+    """
+    登记当前请求超时后需要执行的取消操作（在其他线程中执行）
+
+    Returns:
+        Callable[[], None]: 取消登记的函数；不在执行器中执行时不登记，返回空操作
+    """
+    request = getattr(_current, "request", None)
+    if request is None:
+        return lambda: None
+    return request.on_cancel(callback)
+
+
+def remaining_time() -> Optional[float]:
+    """当前请求距离超时的剩余秒数，不在执行器中执行或没有超时时间时为None"""
+    request = getattr(_current, "request", None)
+    return request.remaining() if request is not None else None
+
+
+class RequestExecutor:
+    """
+    有界线程池
+
+    最多max_workers个请求同时执行，另外最多max_queue个请求排队，超出时立即拒绝。
+    请求超时后调用方立即得到RequestTimeoutError，同时在后台执行通过 on_cancel 登记的取消操作；
+    已经开始的处理在结束之前仍占用一个名额。
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, timeout: float):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timeouts = 0
+
+    def call(self, func: Callable, *args, timeout: float = None, **kwargs) -> Any:
+        """
+        在线程池中执行func并等待结果
+
+        Args:
+            func (Callable): 要执行的函数
+            timeout (float): 超时时间（秒），为空时使用执行器的默认超时
+
+        Returns:
+            Any: func的返回值；func抛出的异常会原样抛出
+
+        Raises:
+            ExecutorBusyError: 正在执行和排队的请求数已达上限
+            RequestTimeoutError: 超过超时时间仍未完成
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ExecutorBusyError(f"Too many concurrent requests for {self.name}")
+
+        timeout = self.timeout if timeout is None else timeout
+        request = _Request(timeout)
+        with self._lock:
+            self._pending += 1
+        future = self._executor.submit(self._run, request, func, args, kwargs)
+
+        try:
+            return future.result(timeout if timeout > 0 else None)
+        except FutureTimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            # 取消操作可能需要建立新的数据库连接，不阻塞超时响应
+            threading.Thread(target=request.cancel, name=f"{self.name}-cancel", daemon=True).start()
+            raise RequestTimeoutError(timeout)
+
+    def _run(self, request: _Request, func: Callable, args: tuple, kwargs: dict) -> Any:
+        with self._lock:
+            self._pending -= 1
+            self._running += 1
+        _current.request = request
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current.request = None
+            request.finish()
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+            self._slots.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取执行器统计信息"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "timeout": self.timeout,
+                "running": self._running,
+                "queued": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts
+            }
+
+    def shutdown(self):
+        """停止接受新的请求并等待正在执行的请求结束"""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+查询结果缓存模块
+缓存只读查询的结果，键为 (数据库键, 规范化的SQL指纹)：
+- 每个条目有过期时间（TTL）
+- 条目数或估算的总字节数超过上限时按LRU淘汰
+- 写操作按涉及的表使相关结果失效
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_TTL = 60
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# 单个结果超过总容量的这个比例时不缓存，避免一个大结果挤掉所有其他条目
+MAX_ENTRY_RATIO = 0.125
+# 估算结果大小时每个值的额外开销
+VALUE_OVERHEAD = 16
+
+
+def estimate_size(columns: List[str], rows: List[tuple]) -> int:
+    """粗略估算结果集占用的内存字节数"""
+    size = sum(len(column) + VALUE_OVERHEAD for column in columns)
+    for row in rows:
+        for value in row:
+            if value is None:
+                size += VALUE_OVERHEAD
+            elif isinstance(value, (str, bytes, bytearray)):
+                size += len(value) + VALUE_OVERHEAD
+            else:
+                size += 2 * VALUE_OVERHEAD
+    return size
+
+
+def expand_views(tables: Iterable[str], views: Dict[str, Optional[Tuple[str, ...]]]) -> Optional[Tuple[str, ...]]:
+    """
+    把查询引用的视图展开为视图（递归）依赖的表，写这些表时缓存的结果同样失效
+
+    Args:
+        tables (Iterable[str]): 查询引用的表和视图
+        views (Dict): 视图名（小写） -> 视图直接引用的表和视图（小写），依赖无法确定时为None
+
+    Returns:
+        Optional[Tuple[str, ...]]: 查询引用的表、视图以及视图依赖的表（小写）；
+            引用了依赖无法确定的视图时返回None，结果不应缓存
+    """
+    expanded = {}
+    pending = [table.lower() for table in tables]
+    while pending:
+        name = pending.pop()
+        if name in expanded:
+            continue
+        expanded[name] = True
+        if name in views:
+            if views[name] is None:
+                return None
+            pending.extend(views[name])
+    return tuple(expanded)
+
+
+class _Entry:
+    __slots__ = ("value", "size", "tables", "created_at", "expires_at")
+
+    def __init__(self, value, size: int, tables: frozenset, ttl: float):
+        self.value = value
+        self.size = size
+        self.tables = tables
+        self.created_at = time.monotonic()
+        self.expires_at = self.created_at + ttl
+
+
+class ResultCache:
+    """
+    线程安全的查询结果缓存
+
+    数据库键为 connection_pool.pool_key(db_config)，失效时按其中的 (主机, 端口, 数据库)
+    匹配，同一数据库的其他配置（例如不同用户）缓存的结果也会一并失效。
+    缓存的值在多个请求间共享，调用方不能修改。
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # 每个数据库的失效次数，查询期间发生过失效时不缓存该查询的结果
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, db_key: Tuple, fingerprint: str) -> Tuple[bool, Any, float]:
+        """
+        读取缓存
+
+        Returns:
+            Tuple[bool, Any, float]: (是否命中, 缓存的值, 缓存条目的存在时间（秒）)
+        """
+        key = (db_key, fingerprint)
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is not None:
+                if entry.expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return True, entry.value, now - entry.created_at
+                self._remove(key)
+            self._misses += 1
+            return False, None, 0.0
+
+    def generation(self, db_key: Tuple) -> int:
+        """数据库当前的失效次数，在执行查询之前读取，写入缓存时传给put"""
+        with self._lock:
+            return self._generations.get(db_key[:3], 0)
+
+    def put(self, db_key: Tuple, fingerprint: str, value: Any, size: int, tables: Iterable[str], ttl: float,
+            generation: int):
+        """
+        写入缓存，超过条目数或字节数上限时淘汰最久未使用的条目
+
+        查询执行期间该数据库发生过失效（generation已变化）时不写入，避免缓存写操作之前读到的旧结果
+        """
+        if ttl <= 0 or size > self.max_bytes * MAX_ENTRY_RATIO:
+            return
+        key = (db_key, fingerprint)
+        with self._lock:
+            if self._generations.get(db_key[:3], 0) != generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, size, frozenset(table.lower() for table in tables), ttl)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def has_entries(self, db_key: Tuple) -> bool:
+        """数据库是否有缓存的结果，没有时写操作不需要解析SQL来确定失效范围"""
+        server = db_key[:3]
+        with self._lock:
+            return any(key[0][:3] == server for key in self._entries)
+
+    def invalidate(self, db_key: Optional[Tuple] = None, tables: Optional[Iterable[str]] = None) -> int:
+        """
+        使缓存的结果失效
+
+        Args:
+            db_key (Tuple): 数据库键，为空时清空全部缓存
+            tables (Iterable[str]): 被修改的表，为空时使整个数据库缓存的结果失效
+
+        Returns:
+            int: 失效的条目数
+        """
+        changed = None if tables is None else {table.lower() for table in tables}
+        with self._lock:
+            if db_key is None:
+                keys = list(self._entries)
+            else:
+                server = db_key[:3]
+                self._generations[server] = self._generations.get(server, 0) + 1
+                keys = [key for key, entry in self._entries.items()
+                        if key[0][:3] == server and (changed is None or entry.tables & changed)]
+            for key in keys:
+                self._remove(key)
+            self._invalidations += len(keys)
+            return len(keys)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations
+            }
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+查询结果编码模块
+把 execute_sql 返回的查询结果编码为可协商的响应格式：
+- json: 原有格式，results 为行数组，由Flask的jsonify序列化
+- columnar: 按列组织的JSON，results 为每列一个数组，并附带每列的MySQL类型标记
+- msgpack: 与columnar相同的结构，使用MessagePack二进制编码（需要安装msgpack）
+- arrow: Apache Arrow IPC流，每列一个类型化的数组（需要安装pyarrow）
+
+编码直接按列处理游标返回的行元组，每列根据类型标记选择一次转换函数，
+不为每行构建字典，也不逐个值调用JSON序列化的default回调
+"""
+
+import base64
+import datetime
+import decimal
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from mysql.connector import FieldType
+
+from export_encoder import format_time
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+JSON = "json"
+COLUMNAR = "columnar"
+MSGPACK = "msgpack"
+ARROW = "arrow"
+FORMATS = (JSON, COLUMNAR, MSGPACK, ARROW)
+
+MIMETYPES = {
+    JSON: "application/json",
+    COLUMNAR: "application/json",
+    MSGPACK: "application/msgpack",
+    ARROW: "application/vnd.apache.arrow.stream"
+}
+# 请求未指定format时按Accept请求头选择二进制格式
+_ACCEPT_FORMATS = {
+    "application/msgpack": MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.apache.arrow.stream": ARROW
+}
+# Arrow IPC流中每个记录批次的最大行数
+ARROW_BATCH_ROWS = 64 * 1024
+
+_INTEGER_TYPES = frozenset(["TINY", "SHORT", "LONG", "LONGLONG", "INT24", "YEAR"])
+_FLOAT_TYPES = frozenset(["FLOAT", "DOUBLE"])
+_DECIMAL_TYPES = frozenset(["DECIMAL", "NEWDECIMAL"])
+_DATETIME_TYPES = frozenset(["DATETIME", "TIMESTAMP"])
+_DATE_TYPES = frozenset(["DATE", "NEWDATE"])
+
+
+class EncodingError(Exception):
+    """请求的编码格式无效或服务器未安装所需的库"""
+
+
+def column_types(description) -> List[str]:
+    """根据游标的description得到每列的MySQL类型名称（如 LONGLONG、NEWDECIMAL、DATETIME）"""
+    return [FieldType.get_info(column[1]) or "UNKNOWN" for column in description]
+
+
+def negotiate(requested: Optional[str], accept_mimetypes=None) -> str:
+    """
+    确定响应的编码格式
+
+    Args:
+        requested (str): 请求参数中的format，优先使用
+        accept_mimetypes: Flask的 request.accept_mimetypes
+
+    Returns:
+        str: FORMATS 中的一个
+
+    Raises:
+        EncodingError: 格式无效或服务器未安装所需的库
+    """
+    if requested:
+        if requested not in FORMATS:
+            raise EncodingError(f"Unsupported result format: {requested}. Supported formats: {list(FORMATS)}")
+        encoding = requested
+    else:
+        encoding = JSON
+        if accept_mimetypes is not None:
+            # 只有客户端明确列出二进制格式、且优先级高于JSON时才使用；*/*、没有Accept或优先级相同时都返回JSON，
+            # 浏览器fetch、axios、curl等默认的Accept不会得到二进制响应
+            best_quality = accept_mimetypes[MIMETYPES[JSON]]
+            for mimetype, quality in accept_mimetypes:
+                accepted = _ACCEPT_FORMATS.get(mimetype.lower())
+                if accepted is not None and quality > best_quality:
+                    encoding, best_quality = accepted, quality
+
+    if encoding == MSGPACK and msgpack is None:
+        raise EncodingError("MessagePack encoding requires the msgpack package: pip install msgpack")
+    if encoding == ARROW and pyarrow is None:
+        raise EncodingError("Arrow encoding requires the pyarrow package: pip install pyarrow")
+    return encoding
+
+
+def _generic(value, binary: Callable) -> Any:
+    """类型标记无法确定转换方式时，按值的Python类型转换"""
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return format_time(value)
+    if isinstance(value, (bytes, bytearray)):
+        return binary(value)
+    if isinstance(value, (set, frozenset)):
+        return ",".join(sorted(value))
+    return str(value)
+
+
+def _base64(value) -> str:
+    return base64.b64encode(bytes(value)).decode("ascii")
+
+
+def _converter(type_name: str, binary: Callable) -> Optional[Callable]:
+    """
+    列的值转换函数，None表示不需要转换
+
+    binary 决定二进制值的表示：JSON中为base64字符串，MessagePack中为原生bin类型
+    """
+    if type_name in _INTEGER_TYPES or type_name in _FLOAT_TYPES:
+        return None
+    if type_name in _DECIMAL_TYPES:
+        return str
+    if type_name in _DATETIME_TYPES or type_name in _DATE_TYPES:
+        return lambda value: value.isoformat()
+    if type_name == "TIME":
+        return format_time
+    # 字符串列在二进制排序规则下会返回bytearray，其余类型（JSON、SET、BIT、BLOB等）按值转换
+    return lambda value: value if value.__class__ is str else _generic(value, binary)
+
+
+def _columns(rows: List[tuple], width: int) -> List[tuple]:
+    """把行元组转置为列元组"""
+    if not rows:
+        return [()] * width
+    return list(zip(*rows))
+
+
+def _convert_columns(result: Dict[str, Any], binary: Callable) -> List[list]:
+    converted = []
+    for values, type_name in zip(_columns(result["results"], len(result["columns"])), result["column_types"]):
+        convert = _converter(type_name, binary)
+        if convert is None:
+            converted.append(list(values))
+        else:
+            converted.append([None if value is None else convert(value) for value in values])
+    return converted
+
+
+def _columnar_payload(result: Dict[str, Any], binary: Callable) -> Dict[str, Any]:
+    data = {key: value for key, value in result.items() if key not in ("success", "results")}
+    data["layout"] = COLUMNAR
+    data["results"] = _convert_columns(result, binary)
+    return {"success": True, "data": data}
+
+
+def encode_columnar_json(result: Dict[str, Any]) -> bytes:
+    """按列编码为JSON"""
+    payload = _columnar_payload(result, _base64)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_msgpack(result: Dict[str, Any]) -> bytes:
+    """按列编码为MessagePack，二进制值保持为bin类型"""
+    payload = _columnar_payload(result, bytes)
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+_ARROW_TYPES = {}
+if pyarrow is not None:
+    _ARROW_TYPES = {
+        "FLOAT": pyarrow.float64(),
+        "DOUBLE": pyarrow.float64(),
+        "DATETIME": pyarrow.timestamp("us"),
+        "TIMESTAMP": pyarrow.timestamp("us"),
+        "DATE": pyarrow.date32(),
+        "NEWDATE": pyarrow.date32(),
+        "TIME": pyarrow.duration("us")
+    }
+    _ARROW_TYPES.update({type_name: pyarrow.int64() for type_name in _INTEGER_TYPES})
+
+
+def _arrow_array(values: tuple, type_name: str):
+    """
+    构建一列Arrow数组：先按类型标记对应的Arrow类型构建，失败时（如超出int64的无符号整数）
+    让pyarrow自行推断类型，仍然失败时转换为字符串
+    """
+    errors = (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, TypeError, ValueError, OverflowError)
+    arrow_type = _ARROW_TYPES.get(type_name)
+    if arrow_type is not None:
+        try:
+            return pyarrow.array(values, type=arrow_type)
+        except errors:
+            pass
+    try:
+        return pyarrow.array(values)
+    except errors:
+        return pyarrow.array([None if value is None else _generic(value, _base64) for value in values],
+                             type=pyarrow.string())
+
+
+def encode_arrow(result: Dict[str, Any]) -> bytes:
+    """编码为Arrow IPC流，查询类型、行数和缓存状态放在schema的元数据中"""
+    columns = result["columns"]
+    arrays = [_arrow_array(values, type_name)
+              for values, type_name in zip(_columns(result["results"], len(columns)), result["column_types"])]
+    metadata = {key: json.dumps(value) for key, value in result.items()
+                if key not in ("success", "results", "columns")}
+    table = pyarrow.Table.from_arrays(arrays, names=columns, metadata=metadata)
+
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=ARROW_BATCH_ROWS)
+    return sink.getvalue().to_pybytes()
+
+
+_ENCODERS = {
+    COLUMNAR: encode_columnar_json,
+    MSGPACK: encode_msgpack,
+    ARROW: encode_arrow
+}
+
+
+def encode(result: Dict[str, Any], encoding: str) -> Tuple[bytes, str]:
+    """
+    按指定格式编码查询结果
+
+    Args:
+        result (Dict[str, Any]): execute_sql 返回的查询结果（包含 columns、column_types、results）
+        encoding (str): COLUMNAR、MSGPACK 或 ARROW
+
+    Returns:
+        Tuple[bytes, str]: (响应内容, MIME类型)
+    """
+    return _ENCODERS[encoding](result), MIMETYPES[encoding]
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+流式结果集模块
+基于非缓冲游标逐块读取查询结果，避免一次性fetchall把整个结果集加载到内存
+"""
+
+import time
+from typing import Callable, List, Optional
+
+# 每次fetchmany读取的默认行数
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class ResultStream:
+    """
+    非缓冲游标上的分块结果迭代器
+
+    迭代时每次返回一个由fetchmany读取的行列表。结果读完或调用close()时，
+    连接会归还给连接池；若结果集尚未读完（客户端断开、达到行数上限等），
+    会通过cancel回调终止服务器端查询，并丢弃该连接而不是读完剩余的行。
+
+    Args:
+        connection: 连接池借出的连接（PooledConnection）
+        cursor: 已执行查询的非缓冲游标
+        chunk_size (int): 每次fetchmany读取的行数
+        cancel (Callable[[int], None]): 终止查询的回调，参数为连接ID
+        on_fetch (Callable[[float], None]): 每次fetchmany之后调用，参数为耗时（秒）
+        on_close (Callable[[ResultStream], None]): 结果流关闭、连接归还之后调用一次
+    """
+
+    def __init__(self, connection, cursor, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 cancel: Optional[Callable[[int], None]] = None,
+                 on_fetch: Optional[Callable[[float], None]] = None,
+                 on_close: Optional[Callable[["ResultStream"], None]] = None):
+        self.connection = connection
+        self.cursor = cursor
+        self.chunk_size = max(1, int(chunk_size))
+        self.description = cursor.description
+        self.columns = [desc[0] for desc in cursor.description]
+        self.row_count = 0
+        self.cancelled = False
+        self._cancel = cancel
+        self._on_fetch = on_fetch
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> List[tuple]:
+        if self._closed:
+            raise StopIteration
+        started = time.perf_counter()
+        try:
+            chunk = self.cursor.fetchmany(self.chunk_size)
+        except Exception:
+            self.close()
+            raise
+        if self._on_fetch is not None:
+            self._on_fetch(time.perf_counter() - started)
+        if not chunk:
+            self.close()
+            raise StopIteration
+        self.row_count += len(chunk)
+        return chunk
+
+    def close(self):
+        """结束读取并归还连接，可重复调用"""
+        if self._closed:
+            return
+        self._closed = True
+
+        discard = False
+        try:
+            if self.connection.unread_result:
+                # 结果集未读完：终止服务器端查询，丢弃连接而不是读完剩余的行
+                self.cancelled = True
+                discard = True
+                if self._cancel:
+                    self._cancel(self.connection.connection_id)
+            else:
+                self.cursor.close()
+        except Exception as e:
+            print(f"Error closing result stream: {e}")
+            discard = True
+        finally:
+            self.connection.close(discard=discard)
+            if self._on_close is not None:
+                try:
+                    self._on_close(self)
+                except Exception as e:
+                    print(f"Error in result stream close callback: {e}")
+
+    def __del__(self):
+        # 兜底：调用方忘记close时也要把连接还给连接池
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class DatabaseExportProgress:
+    """
+    逐表导出整个数据库时的进度
+
+    与 ResultStream 提供相同的 row_count / cancelled / close()，
+    调用方可以像单个结果流一样读取累计行数。row_count 为已导出完的表的行数加上当前表已读取的行数。
+    """
+
+    def __init__(self):
+        self.finished_rows = 0
+        self.current: Optional[ResultStream] = None
+        self.cancelled = False
+
+    @property
+    def row_count(self) -> int:
+        current = self.current
+        return self.finished_rows + (current.row_count if current is not None else 0)
+
+    def finish_table(self):
+        """当前表导出结束（包括提前关闭）后调用，把它的行数计入累计值"""
+        current = self.current
+        if current is None:
+            return
+        self.current = None
+        self.finished_rows += current.row_count
+        self.cancelled = self.cancelled or current.cancelled
+
+    def close(self):
+        """关闭正在导出的表的结果流，可重复调用"""
+        current = self.current
+        if current is not None:
+            current.close()
+            self.finish_table()
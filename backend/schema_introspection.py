@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+批量读取表结构模块
+通过 information_schema 的 TABLES、COLUMNS、STATISTICS、KEY_COLUMN_USAGE 几条集合查询
+一次取得整个数据库的表结构，在内存中组装成与 DESCRIBE / SHOW INDEX 相同格式的数据，
+避免逐表查询带来的大量网络往返
+"""
+
+from typing import Any, Dict, List
+
+_TABLES_SQL = """
+    SELECT TABLE_NAME, TABLE_COMMENT
+    FROM   information_schema.TABLES
+    WHERE  TABLE_SCHEMA = %s{filter}
+    ORDER  BY TABLE_NAME
+"""
+
+_COLUMNS_SQL = """
+    SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_DEFAULT, EXTRA, COLUMN_COMMENT
+    FROM   information_schema.COLUMNS
+    WHERE  TABLE_SCHEMA = %s{filter}
+    ORDER  BY TABLE_NAME, ORDINAL_POSITION
+"""
+
+_STATISTICS_SQL = """
+    SELECT TABLE_NAME, NON_UNIQUE, INDEX_NAME, SEQ_IN_INDEX, COLUMN_NAME, COLLATION,
+           CARDINALITY, SUB_PART, PACKED, NULLABLE, INDEX_TYPE, COMMENT
+    FROM   information_schema.STATISTICS
+    WHERE  TABLE_SCHEMA = %s{filter}
+    ORDER  BY TABLE_NAME, INDEX_NAME = 'PRIMARY' DESC, INDEX_NAME, SEQ_IN_INDEX
+"""
+
+_FOREIGN_KEYS_SQL = """
+    SELECT TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
+    FROM   information_schema.KEY_COLUMN_USAGE
+    WHERE  TABLE_SCHEMA = %s AND REFERENCED_TABLE_NAME IS NOT NULL{filter}
+    ORDER  BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION
+"""
+
+
+def _text(value):
+    """information_schema 的部分列在某些服务器版本下以bytes返回，统一转换为字符串"""
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8')
+    return value
+
+
+def _query(cursor, sql: str, database: str, table_names: List[str] = None) -> List[tuple]:
+    """执行带可选表名过滤的information_schema查询"""
+    params = [database]
+    table_filter = ""
+    if table_names is not None:
+        table_filter = f" AND TABLE_NAME IN ({', '.join(['%s'] * len(table_names))})"
+        params.extend(table_names)
+    cursor.execute(sql.format(filter=table_filter), tuple(params))
+    return cursor.fetchall()
+
+
+def introspect(cursor, database: str, table_names: List[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    读取数据库中所有表（或指定表）的结构
+
+    Args:
+        cursor: 游标
+        database (str): 数据库名
+        table_names (List[str]): 只读取这些表，为空时读取全部表
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 表名 -> {"structure": 字段列表, "indexes": 索引列表,
+        "foreign_keys": 外键列表, "comment": 表注释, "column_comments": 与字段列表对应的字段注释}，
+        字段和索引的格式与 DESCRIBE、SHOW INDEX 的结果一致
+    """
+    if table_names is not None and not table_names:
+        return {}
+
+    schema = {}
+    for row in _query(cursor, _TABLES_SQL, database, table_names):
+        schema[_text(row[0])] = {"structure": [], "indexes": [], "foreign_keys": [],
+                                 "comment": _text(row[1]) or "", "column_comments": []}
+
+    for row in _query(cursor, _COLUMNS_SQL, database, table_names):
+        table = schema.get(_text(row[0]))
+        if table is None:
+            continue
+        table["structure"].append({
+            "Field": _text(row[1]),
+            "Type": _text(row[2]),
+            "Null": _text(row[3]),
+            "Key": _text(row[4]),
+            "Default": _text(row[5]),
+            "Extra": _text(row[6])
+        })
+        table["column_comments"].append(_text(row[7]) or "")
+
+    for row in _query(cursor, _STATISTICS_SQL, database, table_names):
+        table = schema.get(_text(row[0]))
+        if table is None:
+            continue
+        table["indexes"].append({
+            "Table": _text(row[0]),
+            "Non_unique": row[1],
+            "Key_name": _text(row[2]),
+            "Seq_in_index": row[3],
+            "Column_name": _text(row[4]),
+            "Collation": _text(row[5]),
+            "Cardinality": row[6],
+            "Sub_part": row[7],
+            "Packed": _text(row[8]),
+            "Null": _text(row[9]),
+            "Index_type": _text(row[10]),
+            "Comment": _text(row[11])
+        })
+
+    for row in _query(cursor, _FOREIGN_KEYS_SQL, database, table_names):
+        table = schema.get(_text(row[0]))
+        if table is None:
+            continue
+        name = _text(row[1])
+        foreign_keys = table["foreign_keys"]
+        if not foreign_keys or foreign_keys[-1]["name"] != name:
+            foreign_keys.append({
+                "name": name,
+                "columns": [],
+                "referenced_table": _text(row[3]),
+                "referenced_columns": []
+            })
+        foreign_keys[-1]["columns"].append(_text(row[2]))
+        foreign_keys[-1]["referenced_columns"].append(_text(row[4]))
+
+    return schema
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+慢查询日志模块
+记录执行时间超过阈值的语句（来自执行SQL和自定义SQL导出），保存在本地SQLite文件中：
+- 每条记录包含语句指纹、数据库、耗时和行数；SQL中的字面量可能包含敏感数据，默认只保存指纹，
+  开启 store_sql 后才保存执行的SQL原文
+- 记录之后由后台线程在同一数据库上执行 EXPLAIN FORMAT=JSON 并补充到记录中，不增加请求的耗时；
+  同一指纹在 EXPLAIN_INTERVAL 秒内只执行一次
+- 记录数超过上限时删除最早的记录
+- 按指纹汇总，列出总耗时最长或出现次数最多的语句
+"""
+
+import hashlib
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import sql_util
+
+DEFAULT_THRESHOLD = 1.0            # 秒，超过该耗时的语句被记录
+DEFAULT_MAX_ENTRIES = 10000        # 保留的记录数上限
+MAX_SQL_LENGTH = 10000             # 保存的SQL文本最大长度
+EXPLAIN_QUEUE_SIZE = 100           # 等待执行EXPLAIN的记录数上限，超出时不再为新记录执行EXPLAIN
+EXPLAIN_INTERVAL = 300             # 秒，同一指纹两次EXPLAIN之间的最短间隔
+# 支持EXPLAIN的语句类型
+EXPLAINABLE_KINDS = frozenset(["SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "TABLE"])
+
+ORDER_TOTAL_TIME = "total_time"
+ORDER_COUNT = "count"
+_ORDER_COLUMNS = {ORDER_TOTAL_TIME: "total_time", ORDER_COUNT: "count"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS slow_queries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fingerprint_id TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    database TEXT NOT NULL,
+    source TEXT NOT NULL,
+    sql TEXT NOT NULL,
+    duration REAL NOT NULL,
+    rows INTEGER,
+    created_at REAL NOT NULL,
+    explain TEXT,
+    explain_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_slow_queries_fingerprint ON slow_queries (fingerprint_id, database);
+"""
+
+
+def explainable(sql: str) -> bool:
+    """语句是否可以执行 EXPLAIN（单条SELECT/INSERT/UPDATE/DELETE/REPLACE/TABLE）"""
+    analysis = sql_util.analyze_sql(sql)
+    return not analysis.multi_statement and analysis.kind in EXPLAINABLE_KINDS
+
+
+class SlowQueryLog:
+    """
+    线程安全的慢查询记录器
+
+    Args:
+        path (str): SQLite文件路径，":memory:" 表示只保存在内存中
+        threshold (float): 记录阈值（秒），小于等于0时不记录
+        max_entries (int): 保留的记录数上限
+        store_sql (bool): 是否保存SQL原文（包含字面量），为False时 sql 字段保存指纹
+    """
+
+    def __init__(self, path: str, threshold: float = DEFAULT_THRESHOLD, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 store_sql: bool = False):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.store_sql = store_sql
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._explain_queue = queue.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+        # (数据库, 指纹ID) -> 最近一次提交EXPLAIN的时间，按时间顺序排列，超过 EXPLAIN_INTERVAL 的条目被删除
+        self._explained_at = OrderedDict()
+        self._worker = None
+        self._recorded = 0
+        self._explains = 0
+        self._explains_skipped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def record(self, database: str, sql: str, duration: float, rows: Optional[int], source: str,
+               explain: Optional[Callable[[], str]] = None) -> Optional[int]:
+        """
+        记录一次执行，耗时未超过阈值时不做任何处理
+
+        Args:
+            database (str): 数据库配置名称
+            sql (str): 执行的SQL
+            duration (float): 耗时（秒）
+            rows (int): 返回、导出或影响的行数
+            source (str): 来源，如 execute_sql、export_sql_data
+            explain (Callable[[], str]): 返回 EXPLAIN FORMAT=JSON 结果的函数，在后台线程中调用
+
+        Returns:
+            Optional[int]: 记录的ID，未记录时返回None
+        """
+        if not self.enabled or duration < self.threshold:
+            return None
+
+        text = sql_util.fingerprint(sql)
+        fingerprint_id = hashlib.md5(text.encode("utf-8")).hexdigest()[:16]
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO slow_queries (fingerprint_id, fingerprint, database, source, sql, duration, rows, "
+                "created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (fingerprint_id, text, database, source, (sql if self.store_sql else text)[:MAX_SQL_LENGTH],
+                 duration, rows, now))
+            entry_id = cursor.lastrowid
+            # 删除超出上限的最早记录
+            self._db.execute("DELETE FROM slow_queries WHERE id <= ?", (entry_id - self.max_entries,))
+            self._db.commit()
+            self._recorded += 1
+
+            while self._explained_at and now - next(iter(self._explained_at.values())) >= EXPLAIN_INTERVAL:
+                self._explained_at.popitem(last=False)
+            explain_key = (database, fingerprint_id)
+            if explain is not None and explain_key not in self._explained_at:
+                try:
+                    self._explain_queue.put_nowait((entry_id, explain))
+                    self._explained_at[explain_key] = now
+                    self._start_worker()
+                except queue.Full:
+                    self._explains_skipped += 1
+        return entry_id
+
+    def _start_worker(self):
+        """需在持有锁时调用"""
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._explain_loop, name="slow-query-explain", daemon=True)
+            self._worker.start()
+
+    def _explain_loop(self):
+        while True:
+            entry_id, explain = self._explain_queue.get()
+            plan, error = None, None
+            try:
+                plan = explain()
+            except Exception as e:
+                error = str(e)
+            with self._lock:
+                self._db.execute("UPDATE slow_queries SET explain = ?, explain_error = ? WHERE id = ?",
+                                 (plan, error, entry_id))
+                self._db.commit()
+                self._explains += 1
+
+    def top(self, order: str = ORDER_TOTAL_TIME, limit: int = 20, database: str = None,
+            since: float = None) -> List[Dict[str, Any]]:
+        """
+        按指纹汇总，返回总耗时最长或出现次数最多的语句
+
+        Args:
+            order (str): total_time 或 count
+            limit (int): 返回的条数
+            database (str): 只统计该数据库
+            since (float): 只统计该时间戳（秒）之后的记录
+        """
+        conditions, params = [], []
+        if database:
+            conditions.append("database = ?")
+            params.append(database)
+        if since:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(limit)
+
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT fingerprint_id, database, MIN(fingerprint) AS fingerprint, COUNT(*) AS count, "
+                "SUM(duration) AS total_time, AVG(duration) AS avg_time, MAX(duration) AS max_time, "
+                "SUM(rows) AS total_rows, MAX(created_at) AS last_seen, MAX(id) AS last_id "
+                f"FROM slow_queries {where} GROUP BY fingerprint_id, database "
+                f"ORDER BY {_ORDER_COLUMNS[order]} DESC LIMIT ?", params).fetchall()
+        return [{
+            "fingerprint_id": row["fingerprint_id"],
+            "fingerprint": row["fingerprint"],
+            "database": row["database"],
+            "count": row["count"],
+            "total_time": round(row["total_time"], 3),
+            "avg_time": round(row["avg_time"], 3),
+            "max_time": round(row["max_time"], 3),
+            "total_rows": row["total_rows"],
+            "last_seen": row["last_seen"],
+            "last_id": row["last_id"]
+        } for row in rows]
+
+    def recent(self, limit: int = 50, database: str = None) -> List[Dict[str, Any]]:
+        """最近的记录（不包含EXPLAIN结果）"""
+        where, params = ("WHERE database = ?", [database]) if database else ("", [])
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, fingerprint_id, database, source, sql, duration, rows, created_at, "
+                "explain IS NOT NULL AS has_explain "
+                f"FROM slow_queries {where} ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+        return [dict(row, has_explain=bool(row["has_explain"])) for row in rows]
+
+    def get(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        """获取一条记录，包括 EXPLAIN FORMAT=JSON 的结果"""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM slow_queries WHERE id = ?", (entry_id,)).fetchone()
+        return dict(row) if row else None
+
+    def clear(self) -> int:
+        """删除全部记录，返回删除的条数"""
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM slow_queries").rowcount
+            self._db.commit()
+            self._explained_at.clear()
+        return deleted
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取记录器的配置和统计信息"""
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM slow_queries").fetchone()[0]
+            return {
+                "threshold": self.threshold,
+                "max_entries": self.max_entries,
+                "store_sql": self.store_sql,
+                "entries": entries,
+                "recorded": self._recorded,
+                "explains": self._explains,
+                "explains_pending": self._explain_queue.qsize(),
+                "explains_skipped": self._explains_skipped
+            }
@@ -4,9 +4,45 @@ from langchain_openai import ChatOpenAI
 import requests
 from typing import List, Dict, Any
 from langchain.agents import create_agent
+import metrics
 
 db_manager = DatabaseManager()
 
+# 放入第一条提示中的相关表数量（按本地索引的相关度预先筛选）
+RANKED_TABLES = 10
+
+_FIELDS_HEADER = "| 字段名 | 类型 | 是否为空 | 键类型 | 默认值 | 额外信息 |\n|--------|------|----------|--------|--------|-----------|\n"
+
+
+def _table_fields_markdown(table_name: str, structure: List[Dict[str, Any]], comment: str = "") -> str:
+    """把表结构转换为Markdown表格"""
+    title = f"#### 表名：{table_name}（{comment}）" if comment else f"#### 表名：{table_name}"
+    if not structure:
+        return f"{title}\n\n{_FIELDS_HEADER}| 暂无数据 | | | | | |"
+
+    markdown_table = f"{title}\n\n{_FIELDS_HEADER}"
+    for column in structure:
+        field = column['Field']
+        type_ = column['Type']
+        null = column['Null']
+        key = column['Key']
+        default = column['Default'] if column['Default'] is not None else ""
+        extra = column['Extra']
+
+        markdown_table += f"| {field} | {type_} | {null} | {key} | {default} | {extra} |\n"
+    return markdown_table
+
+
+def _ranked_tables_markdown(db_name: str, question: str) -> str:
+    """与问题最相关的表及其结构，没有相关表或读取失败时返回空字符串"""
+    result = db_manager.rank_tables(db_name, question, RANKED_TABLES)
+    if not result["success"]:
+        print(f"rank_tables failed: {result['error']}")
+        return ""
+    return "\n".join(_table_fields_markdown(table["table"], table["structure"], table["comment"])
+                     for table in result["data"])
+
+
 # 保留原有的工具函数
 @tool(parse_docstring=True)
 def get_database_all_tables(db_name: str) -> str:
@@ -45,20 +81,7 @@ def get_table_fields(db_name: str, table_name: str) -> str:
     structure = db_manager.get_table_structure(db_name, table_name)
 
     # 创建Markdown表格格式的输出
-    if not structure:
-        return f"#### 表名：{table_name}\n\n| 字段名 | 类型 | 是否为空 | 键类型 | 默认值 | 额外信息 |\n|--------|------|----------|--------|--------|-----------|\n| 暂无数据 | | | | | |"
-
-    # 构建表头和行内容
-    markdown_table = f"#### 表名：{table_name}\n\n| 字段名 | 类型 | 是否为空 | 键类型 | 默认值 | 额外信息 |\n|--------|------|----------|--------|--------|-----------|\n"
-    for column in structure:
-        field = column['Field']
-        type_ = column['Type']
-        null = column['Null']
-        key = column['Key']
-        default = column['Default'] if column['Default'] is not None else ""
-        extra = column['Extra']
-
-        markdown_table += f"| {field} | {type_} | {null} | {key} | {default} | {extra} |\n"
+    markdown_table = _table_fields_markdown(table_name, structure)
     print(f"get_table_fields markdown_table: {markdown_table}")
 
     return markdown_table
@@ -92,10 +115,10 @@ class SQLAgent:
         你是一个资深的MySQL数据库专家。
 
         你的任务是根据用户的问题，通过调用特定工具来获取信息，并生成准确的SQL语句。你需要：
-        1. 首先使用 get_database_all_tables 工具获取数据库中的所有表
-        2. 然后分析问题与哪些表相关，最多选择10个相关表
-        3. 对于每个相关的表，调用 get_table_fields 获取其结构信息
-        4. 基于这些信息和用户的问题生成SQL语句，并且只能返回一条SQL
+        1. 用户消息中会给出按相关度预先筛选出的表及其结构，如果这些表足以回答问题，直接使用，不要再调用工具
+        2. 如果没有给出表，或者给出的表不足以回答问题，使用 get_database_all_tables 工具获取数据库中的所有表，
+           分析问题与哪些表相关（最多选择10个相关表），再对缺少结构信息的表调用 get_table_fields
+        3. 基于这些信息和用户的问题生成SQL语句，并且只能返回一条SQL
         """
 
         # 创建React agent
@@ -174,6 +197,7 @@ class SQLAgent:
             print("警告: 使用默认模型 'local-model'")
             return "local-model"
 
+    @metrics.timed(metrics.LLM_REQUEST_SECONDS)
     def get_sql_for_question(self, database_name: str, question: str, limit_flag: bool = False, limit: int = 10) -> str:
         """
         根据问题生成SQL语句
@@ -187,6 +211,8 @@ class SQLAgent:
         """
         try:
             limit = f"- SELECT语句必须加上limit {limit}" if limit_flag else ""
+            ranked_tables = _ranked_tables_markdown(database_name, question)
+            ranked_tables = f"按相关度预先筛选出的表及其结构：\n\n{ranked_tables}" if ranked_tables else ""
 
             prompt = f"""
                 已知数据库名称: {database_name}
@@ -196,6 +222,8 @@ class SQLAgent:
                 {limit}
 
                 用户问题: {question}
+
+                {ranked_tables}
             """
 
             # 执行agent并获取结果
@@ -4,11 +4,251 @@ SQL工具模块
 包含用于解析SQL语句并提取相关信息的实用函数
 """
 
+import functools
+import hashlib
+import io
+import logging
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
 try:
     import sqlglot
 except ImportError:
     raise ImportError("请安装sqlglot库: pip install sqlglot")
 
+# sqlglot不支持的语法（如CALL、LOCK TABLES）会退化为Command并输出警告，分析时按开头关键字处理即可
+logging.getLogger("sqlglot").setLevel(logging.ERROR)
+
+# 返回结果集且不修改数据的语句类型
+_ROW_KINDS = frozenset(["SELECT", "SHOW", "DESCRIBE", "EXPLAIN", "TABLE", "VALUES"])
+_KIND_ALIASES = {"DESC": "DESCRIBE"}
+# WITH开头的语句需要根据解析结果确定类型
+_WITH_KINDS = (
+    (sqlglot.expressions.Query, "SELECT"),
+    (sqlglot.expressions.Insert, "INSERT"),
+    (sqlglot.expressions.Update, "UPDATE"),
+    (sqlglot.expressions.Delete, "DELETE"),
+)
+# 语句开头可以跳过的空白、注释和括号；/*! */ 条件注释中的内容会被服务器执行，按正文处理
+_LEADING_NOISE = r"(?:\s+|\(|--(?=\s|$)[^\n]*|#[^\n]*|/\*(?!!).*?\*/|/\*!\d*)*"
+# 开头的空白、注释和括号之后的第一个关键字
+_LEADING_KEYWORD = re.compile(_LEADING_NOISE + r"([A-Za-z_]+)", re.DOTALL)
+
+# 把结果写入服务器上文件的 SELECT ... INTO OUTFILE / DUMPFILE，sqlglot无法解析，按文本识别
+_INTO_FILE = re.compile(r"\bINTO\s+(?:OUTFILE|DUMPFILE)\b", re.IGNORECASE)
+
+ANALYSIS_CACHE_SIZE = 1024
+# 超过该长度（字符数）的SQL不缓存分析结果：这类SQL多为粘贴或导入的大批量INSERT，很少重复执行，
+# 而分析结果中的 cache_key 包含规范化后的SQL文本
+ANALYSIS_CACHE_MAX_SQL_LENGTH = 64 * 1024
+
+
+class StatementAnalysis(NamedTuple):
+    """
+    SQL语句的分析结果，由 analyze_sql 生成并在多个调用方之间共享，调用方不能修改
+
+    - kind: 第一条语句的类型（SELECT、SHOW、INSERT、CREATE等大写关键字），无法识别时为空字符串
+    - kinds: 每条语句的类型
+    - read_only: 所有语句都是不修改数据的查询（不含INTO子句和FOR UPDATE等锁定子句）
+    - returns_rows: 所有语句都返回结果集
+    - tables: 涉及的表名（去重，保持出现顺序）
+    - has_limit: 所有返回结果集的查询都带有最外层的LIMIT
+    - multi_statement: 是否包含多条语句
+    - ddl_tables: 同 ddl_table_names 的返回值
+    - cache_key: 同 cacheable_query 的返回值
+
+    不包含sqlglot的语法树：语法树保留了语句中的所有字面量，缓存后会使大语句长期占用内存
+    """
+    kind: str
+    kinds: Tuple[str, ...]
+    read_only: bool
+    returns_rows: bool
+    tables: Tuple[str, ...]
+    has_limit: bool
+    multi_statement: bool
+    ddl_tables: Optional[Tuple[str, ...]]
+    cache_key: Optional[Tuple[str, Tuple[str, ...]]]
+
+
+class _AnalysisCache:
+    """
+    按SQL的哈希值缓存分析结果的LRU
+
+    键为哈希值，值中不包含语法树；超过 ANALYSIS_CACHE_MAX_SQL_LENGTH 的SQL不进入缓存，
+    超长的SQL不会长期占用内存
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            analysis = self._entries.get(key)
+            if analysis is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return analysis
+
+    def put(self, key, analysis):
+        with self._lock:
+            self._entries[key] = analysis
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses}
+
+
+_analysis_cache = _AnalysisCache(ANALYSIS_CACHE_SIZE)
+
+
+def leading_keyword(sql):
+    """
+    跳过开头的空白、注释和括号，返回第一个关键字的大写形式（DESC记为DESCRIBE）
+
+    Examples:
+        >>> leading_keyword("-- list\n(SELECT 1)")
+        'SELECT'
+    """
+    match = _LEADING_KEYWORD.match(sql or "")
+    if not match:
+        return ""
+    keyword = match.group(1).upper()
+    return _KIND_ALIASES.get(keyword, keyword)
+
+
+def returns_rows(sql):
+    """
+    判断单条语句是否返回结果集
+
+    INSERT、UPDATE等明显不返回结果集的语句只检查开头关键字，不解析SQL，
+    适合逐条判断批量导入的大量语句
+    """
+    keyword = leading_keyword(sql)
+    if keyword not in _ROW_KINDS and keyword != "WITH":
+        return False
+    analysis = analyze_sql(sql)
+    return analysis.returns_rows and not analysis.multi_statement
+
+
+def analyze_sql(sql):
+    """
+    解析SQL并生成结构化的分析结果，同一SQL只解析一次
+
+    结果按SQL的哈希值缓存在LRU中（超长的SQL不缓存）。语句的类型以开头关键字为准（WITH开头时以语法树为准），
+    因此sqlglot无法解析的语句（如LOAD DATA、HANDLER）也能得到正确的类型，只是不能提取表名。
+    以SELECT等查询关键字开头但无法解析的语句（如 SELECT ... INTO OUTFILE）不算只读查询，也不返回结果集。
+
+    Args:
+        sql (str): 要分析的SQL（可以包含多条语句）
+
+    Returns:
+        StatementAnalysis: 分析结果
+
+    Examples:
+        >>> analysis = analyze_sql("SELECT * FROM users LIMIT 10")
+        >>> analysis.kind, analysis.read_only, analysis.tables, analysis.has_limit
+        ('SELECT', True, ('users',), True)
+    """
+    if not sql or not isinstance(sql, str):
+        return _analyze([])
+
+    if len(sql) > ANALYSIS_CACHE_MAX_SQL_LENGTH:
+        return _analyze(split_sql(sql))
+
+    key = hashlib.blake2b(sql.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    analysis = _analysis_cache.get(key)
+    if analysis is None:
+        analysis = _analyze(split_sql(sql))
+        _analysis_cache.put(key, analysis)
+    return analysis
+
+
+def get_analysis_cache_stats():
+    """获取SQL分析缓存的统计信息"""
+    return _analysis_cache.get_stats()
+
+
+def _parse_statement(statement):
+    """解析单条语句，失败时返回None"""
+    try:
+        expressions = [expression for expression in sqlglot.parse(statement, dialect="mysql")
+                       if expression is not None]
+    except Exception:
+        return None
+    if len(expressions) != 1:
+        return None
+    return expressions[0]
+
+
+def _table_names(expression):
+    """语法树中引用的表名，不包括CTE的名称和 SELECT ... INTO 的变量"""
+    cte_names = {cte.alias for cte in expression.find_all(sqlglot.expressions.CTE)}
+    for table in expression.find_all(sqlglot.expressions.Table):
+        if not table.name or table.find_ancestor(sqlglot.expressions.Into):
+            continue
+        if not table.db and table.name in cte_names:
+            continue
+        yield table.name
+
+
+def _analyze(statements):
+    kinds = []
+    expressions = []
+    read_only = returns = limited = bool(statements)
+    for statement in statements:
+        expression = _parse_statement(statement)
+        kind = leading_keyword(statement)
+        if kind == "WITH":
+            kind = next((name for node_type, name in _WITH_KINDS if isinstance(expression, node_type)), kind)
+        kinds.append(kind)
+        expressions.append(expression)
+
+        if kind not in _ROW_KINDS:
+            read_only = returns = limited = False
+            continue
+        if expression is None or _INTO_FILE.search(statement):
+            # 无法解析时不能确认语句不含INTO、锁定子句等，按修改数据的语句处理（不走副本、不缓存）
+            read_only = returns = limited = False
+            continue
+        if isinstance(expression, sqlglot.expressions.Query):
+            for select in expression.find_all(sqlglot.expressions.Select):
+                if select.args.get("into"):
+                    read_only = returns = False
+                if select.args.get("locks"):
+                    read_only = False
+        if not (isinstance(expression, sqlglot.expressions.Query) and expression.args.get("limit")):
+            limited = False
+
+    table_names = []
+    for expression in expressions:
+        if expression is not None and not isinstance(expression, sqlglot.expressions.Command):
+            table_names.extend(_table_names(expression))
+
+    return StatementAnalysis(
+        kind=kinds[0] if kinds else "",
+        kinds=tuple(kinds),
+        read_only=read_only,
+        returns_rows=returns,
+        tables=tuple(dict.fromkeys(table_names)),
+        has_limit=limited and returns,
+        multi_statement=len(statements) > 1,
+        ddl_tables=_ddl_tables(expressions, kinds),
+        cache_key=_cache_key(expressions, read_only)
+    )
+
 def extract_table_names(sql):
     """
     解析SQL语句，提取其中涉及的表名
@@ -26,27 +266,336 @@ def extract_table_names(sql):
         >>> extract_table_names("SELECT u.name, p.title FROM users u JOIN posts p ON u.id = p.user_id")
         ['users', 'posts']
     """
-    if not sql or not isinstance(sql, str):
-        return []
+    return list(analyze_sql(sql).tables)
+
+# 可能是DDL语句的开头关键字（允许前面有注释和优化器提示），用于在解析之前快速过滤
+_DDL_KEYWORD = re.compile(r"(?:^|;)" + _LEADING_NOISE + r"(?:CREATE|DROP|ALTER|RENAME|TRUNCATE)\b",
+                          re.IGNORECASE | re.MULTILINE | re.DOTALL)
+
+def ddl_table_names(sql):
+    """
+    判断SQL中是否包含DDL语句，并提取DDL修改的表名，用于使元数据缓存失效
     
-    try:
-        # 使用sqlglot解析SQL语句
-        parsed = sqlglot.parse_one(sql, dialect="mysql")
+    Args:
+        sql (str): 要检查的SQL（可以包含多条语句）
         
-        # 提取所有表名
-        table_names = []
-        # 遍历所有的表引用
-        for expression in parsed.find_all(sqlglot.expressions.Table):
-            if expression.name:  # 确保表名不为空
+    Returns:
+        list 或 None: 不包含DDL时返回None；包含DDL时返回被修改的表名列表，
+        无法确定具体的表（例如DROP INDEX、CREATE DATABASE、RENAME TABLE或解析失败）时返回空列表，
+        表示整个数据库的元数据都应失效
+        
+    Examples:
+        >>> ddl_table_names("ALTER TABLE users ADD COLUMN age INT")
+        ['users']
+        
+        >>> ddl_table_names("INSERT INTO users VALUES (1)") is None
+        True
+    """
+    if not sql or not isinstance(sql, str) or not _DDL_KEYWORD.search(sql):
+        return None
+    ddl_tables = analyze_sql(sql).ddl_tables
+    return None if ddl_tables is None else list(ddl_tables)
+
+_DDL_KINDS = frozenset(["CREATE", "DROP", "ALTER", "RENAME", "TRUNCATE"])
+
+def _ddl_tables(expressions, kinds):
+    """根据语法树提取DDL修改的表，见 ddl_table_names"""
+    table_names = []
+    found = False
+    for statement, statement_kind in zip(expressions, kinds):
+        if statement_kind not in _DDL_KINDS:
+            continue
+        found = True
+        if isinstance(statement, sqlglot.expressions.TruncateTable):
+            kind = "TABLE"
+        elif isinstance(statement, (sqlglot.expressions.Create, sqlglot.expressions.Drop,
+                                    sqlglot.expressions.Alter)):
+            kind = str(statement.args.get("kind") or "").upper()
+        else:
+            # 解析失败或sqlglot不支持的语法（如RENAME TABLE、DROP TABLE a, b）
+            return ()
+
+        # DROP INDEX解析出的是索引名而不是表名，只有CREATE INDEX能确定表
+        if kind not in ("TABLE", "VIEW") and not (kind == "INDEX" and
+                                                  isinstance(statement, sqlglot.expressions.Create)):
+            return ()
+        for expression in statement.find_all(sqlglot.expressions.Table):
+            if expression.name:
                 table_names.append(expression.name)
-                
-        # 去重并返回结果
-        return list(dict.fromkeys(table_names))  # 保持顺序的去重
+
+    if not found:
+        return None
+    return tuple(dict.fromkeys(table_names))
+
+# 结果随时间、会话或调用而变化的函数，包含这些函数的查询结果不能缓存
+_NON_DETERMINISTIC_FUNCTIONS = frozenset([
+    "NOW", "SYSDATE", "CURRENT_TIMESTAMP", "CURRENT_DATE", "CURRENT_TIME", "CURDATE", "CURTIME",
+    "LOCALTIME", "LOCALTIMESTAMP", "UTC_DATE", "UTC_TIME", "UTC_TIMESTAMP", "UNIX_TIMESTAMP",
+    "RAND", "RANDOM", "UUID", "UUID_SHORT", "CONNECTION_ID", "LAST_INSERT_ID", "FOUND_ROWS",
+    "ROW_COUNT", "USER", "CURRENT_USER", "SESSION_USER", "SYSTEM_USER", "DATABASE", "SCHEMA",
+    "SLEEP", "GET_LOCK", "RELEASE_LOCK", "IS_FREE_LOCK", "IS_USED_LOCK", "BENCHMARK"
+])
+# 系统库中的数据不经过本服务修改，无法失效
+_SYSTEM_SCHEMAS = frozenset(["information_schema", "performance_schema", "mysql", "sys"])
+
+def cacheable_query(sql):
+    """
+    判断查询结果是否可以缓存，并生成规范化的SQL指纹
+    
+    只有单条、确定性的只读查询可以缓存：不能包含NOW()、RAND()等结果会变化的函数、
+    用户变量或系统变量、FOR UPDATE等锁定子句、INTO子句，也不能读取系统库
+    
+    Args:
+        sql (str): 要检查的SQL语句
+        
+    Returns:
+        tuple 或 None: 可以缓存时返回 (SQL指纹, 涉及的表名列表)，否则返回None。
+        空白、关键字大小写和格式不同但语义相同的SQL得到相同的指纹
         
-    except Exception as e:
-        # 如果解析失败，返回空列表
-        print(f"SQL解析错误: {e}")
-        return []
+    Examples:
+        >>> cacheable_query("select  id from users where id = 1")
+        ('SELECT id FROM users WHERE id = 1', ['users'])
+        
+        >>> cacheable_query("SELECT NOW() FROM users") is None
+        True
+    """
+    if not sql or not isinstance(sql, str):
+        return None
+    cache_key = analyze_sql(sql).cache_key
+    return None if cache_key is None else (cache_key[0], list(cache_key[1]))
+
+def _cache_key(expressions, read_only):
+    """根据语法树生成查询结果缓存的指纹，见 cacheable_query"""
+    if len(expressions) != 1 or not read_only or not isinstance(expressions[0], sqlglot.expressions.Query):
+        return None
+    query = expressions[0]
+
+    if query.find(sqlglot.expressions.Parameter, sqlglot.expressions.SessionParameter,
+                  sqlglot.expressions.Placeholder):
+        return None
+    for function in query.find_all(sqlglot.expressions.Func):
+        if isinstance(function, sqlglot.expressions.Anonymous):
+            name = function.name
+        else:
+            name = function.sql_name()
+        if name.upper() in _NON_DETERMINISTIC_FUNCTIONS:
+            return None
+
+    for table in query.find_all(sqlglot.expressions.Table):
+        if table.db and table.db.lower() in _SYSTEM_SCHEMAS:
+            return None
+    table_names = list(_table_names(query))
+    if not table_names:
+        return None
+
+    return query.sql(dialect="mysql"), tuple(dict.fromkeys(table_names))
+
+# 计算语句指纹时识别的词法单元：注释、字符串、带反引号的标识符、数字、空白
+_FINGERPRINT_TOKEN = re.compile(r"""
+    (?P<comment>/\*(?!!).*?\*/|(?:--[ \t]|\#)[^\n]*)
+  | (?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+  | (?P<ident>`(?:[^`]|``)*`)
+  | (?P<number>\b0x[0-9a-f]+\b|\b\d+(?:\.\d*)?(?:e[+-]?\d+)?\b|(?<![\w.])\.\d+\b)
+  | (?P<space>\s+)
+""", re.VERBOSE | re.DOTALL | re.IGNORECASE)
+_FINGERPRINT_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_FINGERPRINT_ROWS = re.compile(r"(\(\?\+\)|\(\?\))(?:\s*,\s*(?:\(\?\+\)|\(\?\)))+")
+
+
+def _fingerprint_token(match):
+    kind = match.lastgroup
+    if kind == "comment":
+        return " "
+    if kind == "space":
+        return " "
+    if kind in ("string", "number"):
+        return "?"
+    return match.group()
+
+
+def fingerprint(sql):
+    """
+    计算语句的指纹：去掉注释，字符串和数字替换为 ?，IN列表和多行VALUES折叠为 (?+)，
+    空白合并为一个空格并转换为小写，只是常量不同的语句得到相同的指纹
+
+    不解析SQL，任意文本（包括sqlglot不支持的语法）都可以计算
+
+    Examples:
+        >>> fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'a'")
+        'select * from t where id in (?+) and name = ?'
+    """
+    text = _FINGERPRINT_TOKEN.sub(_fingerprint_token, sql or "")
+    text = _FINGERPRINT_LIST.sub("(?+)", text)
+    text = _FINGERPRINT_ROWS.sub(r"\1", text)
+    return " ".join(text.split()).rstrip(";").strip().lower()
+
+
+# 语句切分时需要特殊处理的字符：引号、注释起始符
+_SPECIAL_CHARS = "'\"`#/-"
+_WHITESPACE = " \t\r\n\f\v"
+_NON_SPACE = re.compile(r"\S")
+_DELIMITER_COMMAND = re.compile(r"delimiter[ \t]+(\S+)", re.IGNORECASE)
+
+# Python 3.11起支持占有量词，正文各分支的首字符互斥，不需要回溯，使用占有量词可以明显提升速度
+_POSSESSIVE = "+" if sys.version_info >= (3, 11) else ""
+
+# 完整的字符串/标识符字面量（支持反斜杠转义和成对引号转义）
+_QUOTED = {
+    "'": r"'[^'\\]*P(?:(?:\\.|'')[^'\\]*P)*P'".replace("P", _POSSESSIVE),
+    '"': r'"[^"\\]*P(?:(?:\\.|"")[^"\\]*P)*P"'.replace("P", _POSSESSIVE),
+    "`": r"`[^`]*P(?:``[^`]*P)*P`".replace("P", _POSSESSIVE),
+}
+
+
+@functools.lru_cache(maxsize=32)
+def _body_pattern(delimiter, eof):
+    """
+    构建匹配"语句正文"的正则：普通字符和完整的引号字面量，遇到分隔符、注释或未闭合的引号时停止
+
+    非文件末尾时，所有需要向后查看的位置都要求后续字符可见，保证匹配结果不会因为缓冲区截断而出错
+    """
+    first, rest = delimiter[0], delimiter[1:]
+    excluded = _SPECIAL_CHARS + (first if first not in _SPECIAL_CHARS else "")
+    normal = "[^" + "".join("\\" + c if c in "\\]^-" else c for c in excluded) + "]+" + _POSSESSIVE
+
+    alternatives = [normal]
+    for quote, pattern in _QUOTED.items():
+        # 闭合引号后紧跟同一引号表示转义，需要看到下一个字符才能确定字面量结束
+        alternatives.append(pattern + ("(?!" if eof else "(?=[^") + re.escape(quote) + (")" if eof else "])"))
+
+    def lone(char, conditions):
+        # 单独出现、不构成注释或分隔符的特殊字符
+        if char == first and delimiter != char:
+            conditions = conditions + ["(?!" + re.escape(rest) + ")"]
+            if not eof:
+                conditions = ["(?=.{%d})" % len(rest)] + conditions
+        elif not eof:
+            conditions = ["(?=.{2})"] + conditions
+        return re.escape(char) + "".join(conditions)
+
+    alternatives.append(lone("/", [r"(?!\*)"]))
+    alternatives.append(lone("-", [r"(?!-[ \t\r\n\f\v])"]))
+    if first not in _SPECIAL_CHARS and rest:
+        alternatives.append(lone(first, []))
+
+    return re.compile("(?:" + "|".join(alternatives) + ")*" + _POSSESSIVE, re.DOTALL)
+
+
+def split_sql_stream(stream, delimiter=";", chunk_size=1024 * 1024):
+    """
+    从文本流中逐条切分SQL语句
+
+    按MySQL客户端的规则识别字符串和标识符引号（含反斜杠和成对引号转义）、
+    "-- "/"#"/"/* */" 注释以及 DELIMITER 命令，因此引号或注释中的分隔符、
+    存储过程体中的分号都不会导致错误切分。/*! */ 条件注释和 /*+ */ 优化器提示
+    会作为语句内容保留。每次按块读取，内存占用与单条语句的长度相关，与整个脚本的大小无关。
+
+    Args:
+        stream: 支持 read(size) 的文本流
+        delimiter (str): 初始语句分隔符
+        chunk_size (int): 每次读取的字符数
+
+    Yields:
+        str: 去除首尾空白后的SQL语句（不含分隔符），只包含注释的片段会被忽略
+
+    Examples:
+        >>> list(split_sql_stream(io.StringIO("SELECT ';'; -- x;\nSELECT 2")))
+        ["SELECT ';'", '-- x;\nSELECT 2']
+    """
+    buf = ""
+    pos = start = 0
+    parts = []            # 当前语句中已扫描、且已从缓冲区移出的文本
+    has_content = False   # 当前语句是否包含注释以外的内容
+    eof = False
+
+    while True:
+        lookahead = max(3, len(delimiter) + 1)
+        limit = len(buf) if eof else len(buf) - lookahead
+        need_more = False
+
+        if pos < limit:
+            end = _body_pattern(delimiter, eof).match(buf, pos, limit).end()
+            if end > pos and not has_content:
+                first_char = _NON_SPACE.search(buf, pos, end)
+                if first_char:
+                    # DELIMITER 命令只在语句开头识别，且需要读到完整的一行
+                    newline = buf.find("\n", first_char.start())
+                    if newline == -1 and not eof:
+                        need_more = True
+                    else:
+                        line_end = len(buf) if newline == -1 else newline + 1
+                        command = _DELIMITER_COMMAND.match(buf, first_char.start(), line_end)
+                        if command:
+                            delimiter = command.group(1)
+                            pos = start = line_end
+                            parts = []
+                            continue
+                        has_content = True
+            if not need_more:
+                pos = end
+
+        if not need_more and pos < limit:
+            char = buf[pos]
+            if buf.startswith(delimiter, pos):
+                if has_content:
+                    parts.append(buf[start:pos])
+                    yield "".join(parts).strip()
+                parts = []
+                has_content = False
+                pos = start = pos + len(delimiter)
+            elif char in "'\"`":
+                # 引号未闭合：需要继续读取；文件已结束则把剩余内容作为语句的一部分
+                if eof:
+                    pos = len(buf)
+                    has_content = True
+                else:
+                    need_more = True
+            elif char == "#" or (char == "-" and buf.startswith("--", pos) and buf[pos + 2:pos + 3] in _WHITESPACE):
+                # 单行注释（"--"后面必须是空白字符；位于文件末尾时同样视为注释）
+                newline = buf.find("\n", pos)
+                if newline != -1:
+                    pos = newline + 1
+                elif eof:
+                    pos = len(buf)
+                else:
+                    need_more = True
+            elif buf.startswith("/*", pos):
+                comment_end = buf.find("*/", pos + 2)
+                if comment_end != -1 or eof:
+                    # /*! */ 条件注释和 /*+ */ 优化器提示需要发送给服务器
+                    if buf[pos + 2:pos + 3] in ("!", "+"):
+                        has_content = True
+                    pos = len(buf) if comment_end == -1 else comment_end + 2
+                else:
+                    need_more = True
+            else:
+                # 缓冲区边界处无法由正则判断的单个字符，按普通内容处理
+                pos += 1
+                has_content = True
+        elif not need_more:
+            if eof:
+                break
+            need_more = True
+
+        if need_more:
+            # 把已扫描的文本移出缓冲区；未闭合的字面量较长时按其长度加倍读取，避免重复扫描
+            if pos > start:
+                parts.append(buf[start:pos])
+            size = max(chunk_size, len(buf) - pos)
+            chunk = stream.read(size)
+            if not chunk:
+                eof = True
+            buf = buf[pos:] + chunk
+            pos = start = 0
+
+    if has_content:
+        parts.append(buf[start:])
+        yield "".join(parts).strip()
+
+
+def split_sql(sql_content, delimiter=";"):
+    """切分内存中的SQL脚本，规则同 split_sql_stream"""
+    return list(split_sql_stream(io.StringIO(sql_content), delimiter))
 
 # 测试函数（可选）
 if __name__ == "__main__":
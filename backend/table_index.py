@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+表相关度索引模块
+在本地为一个数据库的表建立BM25倒排索引，根据自然语言问题找出最相关的表，供AI生成SQL时
+直接放入提示中，减少模型调用工具查询表名和表结构的往返：
+- 索引的内容为表名、表注释、字段名和字段注释，表名的权重最高
+- 标识符按下划线和驼峰拆分（user_id、orderItems），英文做简单的复数还原；
+  中文按单字和相邻两字切分，不依赖分词库
+- sync 只更新内容发生变化的表，表结构变化后不需要重建整个索引
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+# BM25参数
+K1 = 1.2
+B = 0.75
+
+# 各部分内容的权重（相当于词频的倍数）
+TABLE_NAME_WEIGHT = 3
+TABLE_COMMENT_WEIGHT = 2
+COLUMN_NAME_WEIGHT = 1
+COLUMN_COMMENT_WEIGHT = 1
+
+_CAMEL_BOUNDARY = re.compile(r"([a-z0-9])([A-Z])")
+_TOKEN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]+")
+_STOPWORDS = frozenset([
+    "a", "an", "the", "of", "in", "on", "for", "to", "by", "with", "and", "or", "is", "are", "was",
+    "what", "which", "how", "many", "much", "each", "all", "per", "me", "show", "list", "get", "find",
+    "select", "from", "where", "id",
+    "的", "了", "和", "与", "是", "在", "有", "个", "每", "各", "所", "及", "或", "吗", "呢",
+])
+
+
+def _normalize(word: str) -> str:
+    """英文单词的简单复数还原：categories -> category，orders -> order"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    把标识符、注释或问题切分为索引词
+
+    Examples:
+        >>> tokenize("orderItems 订单明细")
+        ['order', 'item', '订', '单', '明', '细', '订单', '单明', '明细']
+    """
+    if not text:
+        return []
+    tokens = []
+    for part in _TOKEN.findall(_CAMEL_BOUNDARY.sub(r"\1 \2", text).lower()):
+        if part[0] < "\u4e00":
+            if part not in _STOPWORDS and not part.isdigit():
+                tokens.append(_normalize(part))
+        else:
+            tokens.extend(char for char in part if char not in _STOPWORDS)
+            tokens.extend(part[i:i + 2] for i in range(len(part) - 1))
+    return tokens
+
+
+def table_document(table_name: str, table: Dict[str, Any]) -> Tuple:
+    """
+    从 schema_introspection.introspect 的结果中取出参与索引的内容
+
+    Returns:
+        Tuple: (表名, 表注释, 字段名元组, 字段注释元组)，内容不变时结果相等
+    """
+    return (table_name, table.get("comment") or "",
+            tuple(column["Field"] for column in table.get("structure", [])),
+            tuple(table.get("column_comments") or ()))
+
+
+def _term_frequencies(document: Tuple) -> Counter:
+    table_name, comment, columns, column_comments = document
+    frequencies = Counter()
+    for text, weight in ((table_name, TABLE_NAME_WEIGHT), (comment, TABLE_COMMENT_WEIGHT)):
+        for token in tokenize(text):
+            frequencies[token] += weight
+    for column in columns:
+        for token in tokenize(column):
+            frequencies[token] += COLUMN_NAME_WEIGHT
+    for column_comment in column_comments:
+        for token in tokenize(column_comment):
+            frequencies[token] += COLUMN_COMMENT_WEIGHT
+    return frequencies
+
+
+class TableIndex:
+    """单个数据库的表相关度索引（线程安全）"""
+
+    def __init__(self):
+        self._documents = {}    # 表名 -> table_document 的结果
+        self._lengths = {}      # 表名 -> 加权后的词数
+        self._postings = {}     # 词 -> {表名: 加权词频}
+        self._total_length = 0
+        self._schema = None     # 最近一次 sync 的表结构对象
+        self._lock = threading.Lock()
+        self.updates = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def _remove(self, table_name: str):
+        document = self._documents.pop(table_name)
+        self._total_length -= self._lengths.pop(table_name)
+        for term in _term_frequencies(document):
+            postings = self._postings[term]
+            del postings[table_name]
+            if not postings:
+                del self._postings[term]
+
+    def _add(self, table_name: str, document: Tuple):
+        frequencies = _term_frequencies(document)
+        self._documents[table_name] = document
+        self._lengths[table_name] = sum(frequencies.values())
+        self._total_length += self._lengths[table_name]
+        for term, frequency in frequencies.items():
+            self._postings.setdefault(term, {})[table_name] = frequency
+
+    def sync(self, schema: Dict[str, Dict[str, Any]]) -> int:
+        """
+        使索引与表结构一致：新增或内容变化的表重新索引，不存在的表从索引中删除
+
+        Args:
+            schema (Dict[str, Dict[str, Any]]): schema_introspection.introspect 的结果
+
+        Returns:
+            int: 更新的表数
+        """
+        with self._lock:
+            # 缓存的表结构对象不变时内容也不变，不需要比较每个表
+            if schema is self._schema:
+                return 0
+            self._schema = schema
+            documents = {name: table_document(name, table) for name, table in schema.items()}
+            changed = [name for name, document in documents.items() if self._documents.get(name) != document]
+            removed = [name for name in self._documents if name not in documents]
+            for name in removed + [name for name in changed if name in self._documents]:
+                self._remove(name)
+            for name in changed:
+                self._add(name, documents[name])
+            self.updates += len(changed) + len(removed)
+            return len(changed) + len(removed)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        按BM25得分返回与问题最相关的表
+
+        Returns:
+            List[Tuple[str, float]]: (表名, 得分)，按得分从高到低排列，不包含得分为0的表
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            count = len(self._documents)
+            if not count or not terms:
+                return []
+            average_length = self._total_length / count or 1
+            scores = Counter()
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for table_name, frequency in postings.items():
+                    norm = K1 * (1 - B + B * self._lengths[table_name] / average_length)
+                    scores[table_name] += idf * frequency * (K1 + 1) / (frequency + norm)
+        return [(name, round(score, 4)) for name, score in scores.most_common(limit)]
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+# 后端模块按文件名直接导入（与 app.py 相同），测试时把 backend 目录加入导入路径
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
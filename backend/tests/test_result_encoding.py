@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""result_encoding.negotiate 的Accept协商：只有明确请求二进制格式时才返回二进制"""
+
+import pytest
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+import result_encoding
+
+
+def accept(header):
+    return parse_accept_header(header, MIMEAccept)
+
+
+@pytest.mark.parametrize("header", [
+    "",
+    "*/*",
+    "application/json, text/plain, */*",
+    "application/json, application/msgpack",
+    "application/*",
+])
+def test_defaults_to_json(header):
+    assert result_encoding.negotiate(None, accept(header)) == result_encoding.JSON
+
+
+def test_no_accept_mimetypes():
+    assert result_encoding.negotiate(None, None) == result_encoding.JSON
+
+
+@pytest.mark.parametrize("header, encoding", [
+    ("application/msgpack", result_encoding.MSGPACK),
+    ("application/x-msgpack, application/json;q=0.5", result_encoding.MSGPACK),
+    ("application/vnd.apache.arrow.stream, */*;q=0.1", result_encoding.ARROW),
+])
+def test_explicit_binary(monkeypatch, header, encoding):
+    # 只验证协商结果，不要求安装 msgpack / pyarrow
+    monkeypatch.setattr(result_encoding, "msgpack", object())
+    monkeypatch.setattr(result_encoding, "pyarrow", object())
+    assert result_encoding.negotiate(None, accept(header)) == encoding
+
+
+def test_format_parameter_takes_precedence():
+    assert result_encoding.negotiate("columnar", accept("application/msgpack")) == result_encoding.COLUMNAR
+    with pytest.raises(result_encoding.EncodingError):
+        result_encoding.negotiate("xml", None)
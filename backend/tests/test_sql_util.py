@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""sql_util.analyze_sql 对只读查询的判断"""
+
+import pytest
+
+import sql_util
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM t INTO OUTFILE '/tmp/x'",
+    "SELECT * INTO DUMPFILE '/tmp/x' FROM t",
+    "select a, b from t into outfile '/tmp/x' fields terminated by ','",
+    "SELECT a INTO @x FROM t",
+    "SELECT * FROM t FOR UPDATE",
+    # 无法解析的查询不能确认不修改数据
+    "SELECT * FROM t WHERE",
+])
+def test_not_read_only(sql):
+    analysis = sql_util.analyze_sql(sql)
+    assert not analysis.read_only
+    assert analysis.cache_key is None
+
+
+def test_into_file_does_not_return_rows():
+    analysis = sql_util.analyze_sql("SELECT * FROM t INTO OUTFILE '/tmp/x'")
+    assert not analysis.returns_rows
+    assert not analysis.has_limit
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM users LIMIT 10",
+    "SHOW TABLES",
+    "DESC users",
+    "WITH u AS (SELECT * FROM users) SELECT * FROM u",
+])
+def test_read_only(sql):
+    analysis = sql_util.analyze_sql(sql)
+    assert analysis.read_only
+    assert analysis.returns_rows